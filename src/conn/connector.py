@@ -1,16 +1,76 @@
+from typing import Callable, Optional
+
 from fsspec import AbstractFileSystem
 
+from .pool import ConnectionPool
+
 
 class Connector:
+    """Base of the connection types offered in the connect box.
+
+    Subclasses provide an input widget and connection. Connectors of other packages are found through the entry
+    points in conn.registry and constructed with the settings section of their type name, if there is one.
+    """
+
     FS_TYPE = ""
 
+    pool: Optional[ConnectionPool] = None
+    """Shared by all connectors once the tool sets it, filesystems are created anew on every connect without it."""
+    connect_timeout: float = 30
+    """Seconds to wait for the remote side while connecting."""
+
     def __init__(self, input_widget=None, dialog_widget=None):
         self.input_widget = input_widget
         self.dialog_widget = dialog_widget
 
-    def connect(self, **kwargs) -> tuple[AbstractFileSystem, str]:
+    def connection(self) -> Callable[[], tuple[AbstractFileSystem, str]]:
+        """Read the connection target from the input widget and return a function that connects to it.
+
+        Call on the GUI thread. The returned function blocks until the connection is up, it is meant to be run in a
+        worker thread.
+        """
+        raise NotImplementedError
+
+    def connect(self) -> tuple[AbstractFileSystem, str]:
         """Connect to the filesystem and return the filesystem object and the root path."""
+        return self.connection()()
+
+    def on_connect(self, fs: AbstractFileSystem, root: str):
+        """Called on the GUI thread once a tab browses fs, before any listing."""
         pass
 
-    def disconnect(self, **kwargs):
+    def on_disconnect(self, fs: AbstractFileSystem):
+        """Called on the GUI thread when a tab browsing fs is closed, before fs is given back."""
         pass
+
+    def shutdown(self):
+        """Called when the tool closes, after all tabs are closed and the pool is emptied."""
+        pass
+
+    def disconnect(self, fs: AbstractFileSystem):
+        """Give back a filesystem returned by connect."""
+        self.on_disconnect(fs)
+        if self.pool is not None:
+            self.pool.release(fs)
+        else:
+            self.close(fs)
+
+    def acquire(self, key: str, create: Callable[[], AbstractFileSystem]) -> AbstractFileSystem:
+        """Reuse the live filesystem for the connection key from the pool, or create one."""
+        if self.pool is None:
+            return create()
+
+        return self.pool.acquire(key, self, create)
+
+    def is_alive(self, fs: AbstractFileSystem) -> bool:
+        """Health check of an idle pooled filesystem. Blocking, called off the GUI thread."""
+        return True
+
+    def close(self, fs: AbstractFileSystem):
+        """Close the sessions of a filesystem for good."""
+        # fsspec caches instances by their arguments, a closed one must not be handed out again
+        type(fs)._cache.pop(getattr(fs, "_fs_token", None), None)
+
+    def cache_key(self) -> str:
+        """Identify the current connection target (type plus host/profile) for the on-disk caches."""
+        return self.FS_TYPE
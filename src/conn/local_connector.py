@@ -0,0 +1,196 @@
+import functools
+import os
+import threading
+import time
+
+from fsspec import AbstractFileSystem
+from fsspec.implementations.local import LocalFileSystem
+from fsspec.implementations.memory import MemoryFileSystem
+from fsspec.spec import AbstractBufferedFile
+
+from ..ui.local_widgets import LocalInput
+from .connector import Connector
+
+
+class ThrottledFile(AbstractBufferedFile):
+    """Read-only file of a ThrottledFileSystem, every block is a throttled ranged read."""
+
+    def _fetch_range(self, start: int, end: int) -> bytes:
+        return self.fs.cat_file(self.path, start=start, end=end)
+
+
+class ThrottledFileSystem(AbstractFileSystem):
+    """Wraps a filesystem to behave like a remote one, for reproducible offline benchmarks.
+
+    Every listing, info and read waits latency seconds first, reads then take as long as their size needs at
+    bandwidth bytes per second. Concurrent reads share the bandwidth, like they would share a network link.
+    """
+
+    protocol = "throttled"
+    root_marker = "/"
+    cachable = False
+
+    def __init__(self, fs: AbstractFileSystem, latency: float = 0, bandwidth: float = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.fs = fs
+        self.latency = latency
+        """Seconds added to every request."""
+        self.bandwidth = bandwidth
+        """Bytes per second shared by all reads, 0 for unlimited."""
+
+        self._lock = threading.Lock()
+        self._busy_until = 0.0
+
+    def _wait(self, nbytes: int = 0):
+        delay = self.latency
+        if self.bandwidth > 0 and nbytes:
+            with self._lock:
+                now = time.monotonic()
+                self._busy_until = max(self._busy_until, now) + nbytes / self.bandwidth
+                delay += self._busy_until - now
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def ls(self, path, detail=True, **kwargs):
+        self._wait()
+        return self.fs.ls(path, detail=detail, **kwargs)
+
+    def info(self, path, **kwargs):
+        self._wait()
+        return self.fs.info(path, **kwargs)
+
+    def cat_file(self, path, start=None, end=None, **kwargs):
+        data = self.fs.cat_file(path, start=start, end=end, **kwargs)
+        self._wait(len(data))
+        return data
+
+    def _open(self, path, mode="rb", block_size=None, autocommit=True, cache_options=None, **kwargs):
+        if mode != "rb":
+            return self.fs.open(path, mode, block_size=block_size, autocommit=autocommit, **kwargs)
+
+        return ThrottledFile(
+            self,
+            path,
+            mode,
+            block_size=block_size or "default",
+            autocommit=autocommit,
+            cache_options=cache_options,
+            **kwargs,
+        )
+
+
+class LocalConnector(Connector):
+    """Browse the local disk, optionally throttled to the latency and bandwidth of a remote link."""
+
+    FS_TYPE = "local"
+
+    def __init__(
+        self,
+        preferred_root: str = "",
+        preferred_latency: float = 0,
+        preferred_bandwidth: float = 0,
+    ):
+        super().__init__()
+        self.input_widget = LocalInput(preferred_root, preferred_latency, preferred_bandwidth)
+
+    def get_input(self) -> tuple[str, float, float]:
+        root = self.input_widget.root
+        # ms and MB/s in the input, seconds and bytes per second on the filesystem
+        latency = self.input_widget.latency / 1000
+        bandwidth = self.input_widget.bandwidth * 1024**2
+
+        if not root:
+            root = self.default_root()
+
+        return root, latency, bandwidth
+
+    def default_root(self) -> str:
+        return os.path.expanduser("~")
+
+    def connection(self):
+        root, latency, bandwidth = self.get_input()
+        return functools.partial(self.open, self.cache_key(), root, latency, bandwidth)
+
+    def open(self, key: str, root: str, latency: float, bandwidth: float):
+        try:
+            fs = self.acquire(key, self.create_fs)
+        except Exception as e:
+            print(f"Error: {e}")
+            return None, None
+
+        # The throttle is not part of the key, a pooled filesystem takes the latest values
+        fs.latency = latency
+        fs.bandwidth = bandwidth
+        return fs, root
+
+    def create_fs(self) -> ThrottledFileSystem:
+        return ThrottledFileSystem(LocalFileSystem())
+
+
+class MemoryConnector(LocalConnector):
+    """Browse a synthetic tree in memory, to benchmark browsing and transfers without any disk or network.
+
+    The tree below root is generated on the first connect. It is depth levels deep, every directory holds the given
+    number of subdirectories and of files of file_size bytes, and root a single file of large_file_size bytes on top.
+    """
+
+    FS_TYPE = "memory"
+
+    def __init__(
+        self,
+        preferred_root: str = "/benchmark",
+        preferred_latency: float = 50,
+        preferred_bandwidth: float = 10,
+        depth: int = 3,
+        directories: int = 4,
+        files: int = 8,
+        file_size: int = 64 * 1024,
+        large_file_size: int = 64 * 1024**2,
+    ):
+        super().__init__(preferred_root, preferred_latency, preferred_bandwidth)
+        self.depth = depth
+        self.directories = directories
+        self.files = files
+        self.file_size = file_size
+        self.large_file_size = large_file_size
+
+    def default_root(self) -> str:
+        return "/benchmark"
+
+    def open(self, key: str, root: str, latency: float, bandwidth: float):
+        fs, root = super().open(key, root, latency, bandwidth)
+        if fs is None:
+            return None, None
+
+        try:
+            self.populate(fs.fs, root)
+        except Exception as e:
+            print(f"Error: {e}")
+
+        return fs, root
+
+    def create_fs(self) -> ThrottledFileSystem:
+        return ThrottledFileSystem(MemoryFileSystem())
+
+    def populate(self, fs: MemoryFileSystem, root: str):
+        """Generate the synthetic tree below root, unless it exists. The same settings always give the same tree."""
+        if fs.exists(root):
+            return
+
+        print(f"Generating benchmark tree in memory at {root}")
+        pattern = bytes(range(256))
+        data = pattern * (self.file_size // 256) + pattern[: self.file_size % 256]
+
+        level = [root]
+        for depth in range(self.depth + 1):
+            below = []
+            for directory in level:
+                fs.mkdir(directory)
+                for i in range(self.files):
+                    fs.pipe_file(f"{directory}/file_{i:04d}.bin", data)
+                if depth < self.depth:
+                    below += [f"{directory}/dir_{i:04d}" for i in range(self.directories)]
+            level = below
+
+        fs.pipe_file(f"{root}/large.bin", pattern * (self.large_file_size // 256))
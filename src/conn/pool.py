@@ -0,0 +1,108 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from fsspec import AbstractFileSystem
+
+
+class _Connection:
+    def __init__(self, key: str, fs: AbstractFileSystem, connector):
+        self.key = key
+        self.fs = fs
+        self.connector = connector
+        self.users = 0
+        self.idle_since = time.monotonic()
+
+
+class ConnectionPool:
+    """Live filesystem instances, reused by every connect with the same connector parameters.
+
+    A connection is created on the first connect and released, not closed, on disconnect. Released connections stay
+    open for idle_timeout seconds, so connecting again skips credential resolution, TLS handshakes and SSH key
+    exchange. check closes idle connections that expired or fail their connector's health check, close_all closes
+    everything on shutdown.
+    """
+
+    def __init__(self, idle_timeout: float = 600):
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._connections: Dict[str, _Connection] = {}
+
+    def acquire(self, key: str, connector, create: Callable[[], AbstractFileSystem]) -> AbstractFileSystem:
+        """Return the live filesystem for key, calling create for a new one if there is none."""
+        with self._lock:
+            connection = self._connections.get(key)
+            if connection is not None:
+                connection.users += 1
+
+        if connection is not None:
+            print(f"Reusing connection {key}")
+            return connection.fs
+
+        created = _Connection(key, create(), connector)
+        with self._lock:
+            connection = self._connections.setdefault(key, created)
+            connection.users += 1
+
+        if connection is not created:
+            # Another connect for the same key finished first
+            self._close(created)
+        return connection.fs
+
+    def release(self, fs: AbstractFileSystem):
+        """Give back a filesystem returned by acquire. It is closed right away if idle_timeout is 0."""
+        with self._lock:
+            connection = self._find(fs)
+            if connection is None:
+                return
+
+            connection.users = max(connection.users - 1, 0)
+            connection.idle_since = time.monotonic()
+            expired = connection.users == 0 and self.idle_timeout <= 0
+            if expired:
+                del self._connections[connection.key]
+
+        if expired:
+            self._close(connection)
+
+    def _find(self, fs: AbstractFileSystem) -> Optional[_Connection]:
+        return next((c for c in self._connections.values() if c.fs is fs), None)
+
+    def check(self):
+        """Close idle connections that expired or are no longer alive. Blocking, meant to be run off the GUI thread."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [c for c in self._connections.values() if c.users == 0]
+
+        for connection in idle:
+            if now - connection.idle_since <= self.idle_timeout and connection.connector.is_alive(connection.fs):
+                continue
+
+            with self._lock:
+                # Reacquired while being checked
+                if connection.users or self._connections.get(connection.key) is not connection:
+                    continue
+                del self._connections[connection.key]
+
+            self._close(connection)
+
+    @staticmethod
+    def _close(connection: _Connection):
+        print(f"Closing connection {connection.key}")
+        try:
+            connection.connector.close(connection.fs)
+        except Exception as e:
+            print(f"Error: {e}")
+
+    @property
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._connections)
+
+    def close_all(self):
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+
+        for connection in connections:
+            self._close(connection)
@@ -0,0 +1,60 @@
+import importlib
+from importlib.metadata import entry_points
+from typing import Dict, Iterable, Type
+
+from .connector import Connector
+
+ENTRY_POINT_GROUP = "chimerax.remotebrowser.connectors"
+"""Entry point group other packages register Connector subclasses under, the entry point name is the type name."""
+
+BUILTIN = {
+    "s3fs": ".s3fs_connector:S3FSConnector",
+    "sshfs": ".sshfs_connector:SSHFSConnector",
+    "local": ".local_connector:LocalConnector",
+    "memory": ".local_connector:MemoryConnector",
+}
+
+
+def _load_builtin(spec: str) -> Type[Connector]:
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module, __package__), name)
+
+
+def connector_types(disabled: Iterable[str] = ()) -> Dict[str, Type[Connector]]:
+    """Return the available connector classes by type name, built-in ones first, then plugins.
+
+    Connectors whose backend is not installed are skipped, as are plugins that fail to load or clash with the name of
+    a built-in connector.
+    """
+    disabled = set(disabled)
+    types = {}
+
+    for name, spec in BUILTIN.items():
+        if name in disabled:
+            continue
+
+        try:
+            types[name] = _load_builtin(spec)
+        except ImportError as e:
+            print(f"Connector {name} unavailable: {e}")
+
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        if ep.name in disabled:
+            continue
+        if ep.name in BUILTIN:
+            print(f"Connector plugin {ep.value} ignored, {ep.name} is a built-in connector")
+            continue
+
+        try:
+            cls = ep.load()
+        except Exception as e:
+            print(f"Error: {e}")
+            continue
+
+        if not (isinstance(cls, type) and issubclass(cls, Connector)):
+            print(f"Connector plugin {ep.value} ignored, not a Connector subclass")
+            continue
+
+        types[ep.name] = cls
+
+    return types
@@ -25,9 +25,12 @@ class S3FSConnector(Connector):
         self,
         preferred_profile: str = "",
         preferred_root: str = "",
+        max_pool_connections: int = 32,
     ):
         super().__init__()
         self.input_widget = S3FSInput(preferred_profile, preferred_root)
+        self.max_pool_connections = max_pool_connections
+        """Size of the HTTP connection pool each filesystem keeps open to S3."""
 
     def get_input(self) -> tuple[str, str]:
         profile = self.input_widget.profile
@@ -38,25 +41,45 @@ class S3FSConnector(Connector):
 
         return profile, root
 
-    def connect(self):
+    def cache_key(self) -> str:
+        profile, _ = self.get_input()
+        if not profile:
+            profile = os.environ.get("AWS_PROFILE", "anon")
+
+        return f"{self.FS_TYPE}:{profile}"
+
+    def connection(self):
         profile, root = self.get_input()
+        return functools.partial(self.open, self.cache_key(), profile, root)
 
+    def open(self, key: str, profile: str, root: str):
         fs = None
         try:
-            if profile:
-                print(f"Connecting to {root} using AWS profile {profile}")
-                aiosess = aiobotocore.session.AioSession(profile=profile)
-                fs = s3fs.S3FileSystem(session=aiosess)
-            else:
-                if "AWS_PROFILE" in os.environ:
-                    print(f"Connecting to {root} using AWS profile {os.environ['AWS_PROFILE']}")
-                    aiosess = aiobotocore.session.AioSession(profile=os.environ["AWS_PROFILE"])
-                    fs = s3fs.S3FileSystem(session=aiosess)
-                else:
-                    print(f"Connecting to {root} anonymously")
-                    fs = s3fs.S3FileSystem(anon=True)
+            fs = self.acquire(key, functools.partial(self.create_fs, profile, root))
         except Exception as e:
             print(f"Error: {e}")
             return None, None
 
         return fs, root
+
+    def create_fs(self, profile: str, root: str) -> s3fs.S3FileSystem:
+        config_kwargs = {"max_pool_connections": self.max_pool_connections, "connect_timeout": self.connect_timeout}
+
+        if profile:
+            print(f"Connecting to {root} using AWS profile {profile}")
+            aiosess = aiobotocore.session.AioSession(profile=profile)
+            return s3fs.S3FileSystem(session=aiosess, config_kwargs=config_kwargs)
+        elif "AWS_PROFILE" in os.environ:
+            print(f"Connecting to {root} using AWS profile {os.environ['AWS_PROFILE']}")
+            aiosess = aiobotocore.session.AioSession(profile=os.environ["AWS_PROFILE"])
+            return s3fs.S3FileSystem(session=aiosess, config_kwargs=config_kwargs)
+        else:
+            print(f"Connecting to {root} anonymously")
+            return s3fs.S3FileSystem(anon=True, config_kwargs=config_kwargs)
+
+    def close(self, fs: s3fs.S3FileSystem):
+        s3 = getattr(fs, "_s3", None)
+        if s3 is not None:
+            s3fs.S3FileSystem.close_session(fs.loop, s3)
+            fs._s3 = None
+        super().close(fs)
@@ -1,46 +1,97 @@
 import functools
+import os
+from contextlib import suppress
+from typing import List, Optional
 
-import chimerax.core.settings
+import sshfs
 from asyncssh import SSHClient
 from asyncssh.auth import KbdIntPrompts, KbdIntResponse
 from asyncssh.misc import MaybeAwait
-from asyncio import sleep
-import sshfs
-from fsspec.asyn import get_running_loop, sync_wrapper, sync
-from functools import partial
-from superqt import ensure_main_thread, ensure_object_thread
-import asyncio
-
-from typing import Optional, List, Any
-import concurrent.futures
-import qasync
-
-# from time import sleep
+from fsspec.asyn import sync
+from fsspec.spec import AbstractBufferedFile
 
+from ..ui.sshfs_widgets import SSHFSInput
 from .connector import Connector
-from ..ui.sshfs_widgets import SSHFSDialog, SSHFSInput
 
 
 class SimpleClient(SSHClient):
+    """Answers keyboard-interactive challenges from the connect box, without any dialog.
 
-    def __init__(self, kbdint_responses: List[str]):
+    Hidden prompts that ask for a password get the password. Every other prompt, e.g. the verification code of a
+    two-factor login, gets the next of the comma-separated keyboard-interactive responses.
+    """
+
+    def __init__(self, kbdint_responses: List[str], password: Optional[str] = None):
         super().__init__()
-        self.kbdint_responses = kbdint_responses
+        self.kbdint_responses = list(kbdint_responses)
+        self.password = password
 
     def kbdint_auth_requested(self) -> Optional[str]:
-        print("kbdint_auth_requested")
+        # No preference for submethods, the server picks
         return ""
 
     async def kbdint_challenge_received(
         self, name: str, instructions: str, lang: str, prompts: KbdIntPrompts
     ) -> MaybeAwait[Optional[KbdIntResponse]]:
-        print("kbdint_challenge_received")
-        print(name, instructions, lang, prompts)
-        if prompts:
-            result = self.kbdint_responses
-            return result
-        else:
-            return []
+        if instructions:
+            print(instructions)
+
+        responses = []
+        for prompt, echo in prompts:
+            if not echo and self.password and "password" in prompt.lower():
+                responses.append(self.password)
+            elif self.kbdint_responses:
+                responses.append(self.kbdint_responses.pop(0))
+            else:
+                # Out of answers, give up on keyboard-interactive and let the next method try
+                print(f"No response for the prompt {prompt.strip()!r}")
+                return None
+
+        return responses
+
+
+class SFTPFile(AbstractBufferedFile):
+    """Read-only SFTP file with fsspec's buffering and caching, fetching blocks as ranged reads."""
+
+    def _fetch_range(self, start: int, end: int) -> bytes:
+        return sync(self.fs.loop, self.fs._cat_file, self.path, start=start, end=end)
+
+
+class SFTPFileSystem(sshfs.SSHFileSystem):
+    """sshfs with tunable SFTP reads.
+
+    Every read is split into requests of block_size bytes, up to max_requests of which are outstanding at a time, so
+    a single read keeps a high-latency link busy. Unlike sshfs, byte ranges are read without fetching the whole file,
+    and files opened for reading support the block caches of fsspec.
+    """
+
+    def __init__(self, *args, block_size: int = 64 * 1024, max_requests: int = 128, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.block_size = block_size
+        self.max_requests = max_requests
+
+    async def _cat_file(self, path, start=None, end=None, **kwargs):
+        async with self._pool.get() as channel:
+            if (start is not None and start < 0) or (end is not None and end < 0):
+                size = (await channel.stat(path)).size
+                start = start + size if start is not None and start < 0 else start
+                end = end + size if end is not None and end < 0 else end
+
+            start = start or 0
+            async with channel.open(path, "rb", block_size=self.block_size, max_requests=self.max_requests) as f:
+                return await f.read(-1 if end is None else max(end - start, 0), start)
+
+    async def _close_sessions(self):
+        """Close the SFTP channels and then the SSH connection, like the finalizer sshfs registers."""
+        await self._pool.close()
+        with suppress(BrokenPipeError):
+            await self._stack.aclose()
+
+    def _open(self, path, mode="rb", block_size=None, **kwargs):
+        if mode != "rb":
+            return super()._open(path, mode, block_size=block_size, **kwargs)
+
+        return SFTPFile(self, path, mode, block_size=block_size or "default", **kwargs)
 
 
 class SSHFSConnector(Connector):
@@ -52,22 +103,37 @@ class SSHFSConnector(Connector):
         preferred_user: str = "",
         preferred_port: int = 22,
         preferred_root: str = "",
+        preferred_key: str = "",
+        max_sessions: int = 10,
+        block_size: int = 64 * 1024,
+        max_requests: int = 128,
+        compression: bool = False,
+        use_agent: bool = True,
     ):
         super().__init__()
-        self.input_widget = SSHFSInput(
-            preferred_user, preferred_host, preferred_port, preferred_root
-        )
-
-    def create_client(self, kbint_responses: List[str]):
-        return SimpleClient(kbint_responses)
-
-    def get_input(self) -> tuple[str, str, int, str, str, List[str]]:
+        self.input_widget = SSHFSInput(preferred_user, preferred_host, preferred_port, preferred_root, preferred_key)
+        self.max_sessions = max_sessions
+        """Number of SFTP channels each filesystem multiplexes over its SSH connection."""
+        self.block_size = block_size
+        """Size of a single SFTP read request."""
+        self.max_requests = max_requests
+        """Number of SFTP read requests kept outstanding per read."""
+        self.compression = compression
+        """Compress the SSH stream, worth it on slow links with compressible data only."""
+        self.use_agent = use_agent
+        """Offer the keys of a running SSH agent."""
+
+    def create_client(self, kbint_responses: List[str], password: Optional[str] = None):
+        return SimpleClient(kbint_responses, password)
+
+    def get_input(self) -> tuple[str, str, int, str, str, List[str], str]:
         user = self.input_widget.user
         hostname = self.input_widget.host
         port = self.input_widget.port
         root = self.input_widget.root
         password = self.input_widget.password
-        kbint_responses = self.input_widget.kbint_responses
+        kbint_responses = [r.strip() for r in self.input_widget.kbint_responses.split(",") if r.strip()]
+        key = self.input_widget.key
 
         self.input_widget.clear()
 
@@ -76,25 +142,72 @@ class SSHFSConnector(Connector):
         if not port:
             port = 22
 
-        return user, hostname, port, root, password, kbint_responses
+        return user, hostname, port, root, password, kbint_responses, key
 
-    def connect(self):
-        user, host, port, root, pw, kb = self.get_input()
+    def cache_key(self) -> str:
+        user = self.input_widget.user
+        host = self.input_widget.host
+        port = self.input_widget.port or 22
 
-        print(f"Connecting to {user}@{host}:{port}")
+        return f"{self.FS_TYPE}:{user}@{host}:{port}"
 
+    def connection(self):
+        key = self.cache_key()
+        user, host, port, root, pw, kb, client_key = self.get_input()
+        return functools.partial(self.open, key, user, host, port, root, pw, kb, client_key)
+
+    def open(self, key: str, user: str, host: str, port: int, root: str, pw: str, kb: List[str], client_key: str):
         fs = None
         try:
-            fs = sshfs.SSHFileSystem(
-                host,
-                client_factory=functools.partial(self.create_client, kb),
-                username=user,
-                port=port,
-                password=pw,
-                preferred_auth=["password", "kbdint_auth"],
-            )
+            fs = self.acquire(key, functools.partial(self.create_fs, user, host, port, pw, kb, client_key))
         except Exception as e:
             print(f"Error: {e}")
             return None, None
 
         return fs, root
+
+    def create_fs(
+        self,
+        user: str,
+        host: str,
+        port: int,
+        pw: str,
+        kb: List[str],
+        client_key: str = "",
+    ) -> SFTPFileSystem:
+        print(f"Connecting to {user}@{host}:{port}")
+
+        options = {}
+        if client_key:
+            # Without an explicit key, asyncssh tries the default keys in ~/.ssh
+            options["client_keys"] = [os.path.expanduser(client_key)]
+        if not self.use_agent:
+            options["agent_path"] = None
+        if pw:
+            options["password"] = pw
+
+        return SFTPFileSystem(
+            host,
+            client_factory=functools.partial(self.create_client, kb, pw or None),
+            username=user,
+            port=port,
+            preferred_auth=["publickey", "keyboard-interactive", "password"],
+            compression_algs=["zlib@openssh.com", "zlib"] if self.compression else ["none"],
+            max_sessions=self.max_sessions,
+            connect_timeout=self.connect_timeout,
+            block_size=self.block_size,
+            max_requests=self.max_requests,
+            **options,
+        )
+
+    def is_alive(self, fs: SFTPFileSystem) -> bool:
+        try:
+            fs.info(".")
+        except Exception:
+            return False
+        return True
+
+    def close(self, fs: SFTPFileSystem):
+        # sshfs' own _finalize changed its signature between releases
+        sync(fs.loop, fs._close_sessions)
+        super().close(fs)
@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class ChunkCache:
+    """Chunks of remote zarr arrays, shared by all images opened in the session.
+
+    The memory tier keeps the most recently used chunks up to memory_bytes. Every fetched chunk is also written to an
+    SQLite database on disk, bounded by disk_bytes and evicted least recently used first, so opening an image again
+    after a restart skips the network as well. Chunks are keyed by the store URL, the chunk key and the version (ETag)
+    of the image they belong to.
+
+    The version is that of the image metadata, a writer that replaces chunks without touching the metadata does not
+    change it. Chunks are therefore only served for ttl seconds after they were fetched, after that they count as
+    missing and are fetched again.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        memory_bytes: int = 1024**3,
+        disk_bytes: int = 10 * 1024**3,
+        ttl: float = 24 * 3600,
+    ):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[Tuple[str, str, str], Tuple[bytes, float]] = OrderedDict()
+        """Chunk data and when it was fetched, by url, key and version."""
+        self._memory_size = 0
+
+        self._db = None
+        self._disk_size = 0
+        if path is not None and disk_bytes > 0:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._db:
+                columns = [row[1] for row in self._db.execute("PRAGMA table_info(chunks)")]
+                if columns and "fetched" not in columns:
+                    # Written by a version without expiry, the chunks cannot be dated
+                    self._db.execute("DROP TABLE chunks")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS chunks "
+                    "(url TEXT, key TEXT, version TEXT, data BLOB, size INTEGER, used REAL, fetched REAL, "
+                    "PRIMARY KEY (url, key, version))",
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS chunks_used ON chunks (used)")
+                self._disk_size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM chunks").fetchone()[0]
+
+    def get_many(self, url: str, keys: List[str], version: str) -> Dict[str, bytes]:
+        """Return the cached chunks among keys, from memory or else from disk. Disk hits are promoted to memory."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get((url, key, version))
+                if entry is not None and now - entry[1] <= self.ttl:
+                    self._memory.move_to_end((url, key, version))
+                    found[key] = entry[0]
+            self.memory_hits += len(found)
+
+            missing = [key for key in keys if key not in found]
+            if missing and self._db is not None:
+                for key in missing:
+                    row = self._db.execute(
+                        "SELECT data, fetched FROM chunks WHERE url = ? AND key = ? AND version = ? AND fetched >= ?",
+                        (url, key, version, now - self.ttl),
+                    ).fetchone()
+                    if row is not None:
+                        found[key] = row[0]
+                        self.disk_hits += 1
+                        self._remember(url, key, version, row[0], row[1])
+
+                with self._db:
+                    self._db.executemany(
+                        "UPDATE chunks SET used = ? WHERE url = ? AND key = ? AND version = ?",
+                        [(now, url, key, version) for key in missing if key in found],
+                    )
+
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, url: str, chunks: Dict[str, bytes], version: str):
+        if not chunks:
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, data in chunks.items():
+                self._remember(url, key, version, data, now)
+
+            if self._db is None:
+                return
+
+            with self._db:
+                for key, data in chunks.items():
+                    old = self._db.execute(
+                        "SELECT size FROM chunks WHERE url = ? AND key = ? AND version = ?",
+                        (url, key, version),
+                    ).fetchone()
+                    self._disk_size -= old[0] if old else 0
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (url, key, version, data, len(data), now, now),
+                    )
+                    self._disk_size += len(data)
+
+            self._evict_disk()
+
+    def _remember(self, url: str, key: str, version: str, data: bytes, fetched: float):
+        if len(data) > self.memory_bytes:
+            return
+
+        old = self._memory.pop((url, key, version), None)
+        self._memory_size -= len(old[0]) if old is not None else 0
+        self._memory[(url, key, version)] = data, fetched
+        self._memory_size += len(data)
+
+        while self._memory_size > self.memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self):
+        if self._disk_size <= self.disk_bytes:
+            return
+
+        rows = self._db.execute("SELECT rowid, size FROM chunks ORDER BY used").fetchall()
+        evicted = []
+        for rowid, size in rows:
+            if self._disk_size <= self.disk_bytes:
+                break
+            evicted.append((rowid,))
+            self._disk_size -= size
+
+        with self._db:
+            self._db.executemany("DELETE FROM chunks WHERE rowid = ?", evicted)
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / requests if requests else 0.0
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM chunks")
+                self._disk_size = 0
+
+    def close(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            if self._db is not None:
+                self._db.close()
+                self._db = None
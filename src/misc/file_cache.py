@@ -0,0 +1,179 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Optional, Set, Tuple
+
+from .util import info_mtime
+
+
+def file_version(info: dict) -> str:
+    """Identify the remote version of a file from its info dict: the ETag if there is one, else size and mtime.
+
+    Info dicts of the same file come from listings, find and the tree, which keeps only whole seconds. Hex ETags are
+    lower-cased and mtimes are whole seconds since the epoch, so all of them give the same version.
+    """
+    etag = info.get("ETag") or info.get("etag")
+    if etag:
+        etag = str(etag).strip('"')
+        try:
+            return bytes.fromhex(etag).hex()
+        except ValueError:
+            return etag
+
+    mtime = info_mtime(info)
+    return f"{info.get('size') or 0}:{None if mtime is None else int(mtime)}"
+
+
+class FileCache:
+    """Size-bounded local cache of remote files.
+
+    Files are stored under a name derived from the connection key, the remote path and the remote version, so a
+    changed remote file is never mistaken for a cached copy. The index lives in an SQLite database next to the files
+    and survives restarts. When the total size exceeds max_bytes, the least recently used files are evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files "
+                "(hash TEXT PRIMARY KEY, key TEXT, path TEXT, version TEXT, local TEXT, size INTEGER, used REAL)",
+            )
+            rows = self._db.execute("SELECT key, path FROM files").fetchall()
+
+        self._paths: Set[Tuple[str, str]] = set(rows)
+
+    @staticmethod
+    def _hash(key: str, path: str, version: str) -> str:
+        return hashlib.sha256(f"{key}\0{path}\0{version}".encode()).hexdigest()
+
+    def target(self, key: str, path: str, info: dict) -> str:
+        """The local path a remote file is cached at. The basename is kept, ChimeraX picks formats by suffix."""
+        digest = self._hash(key, path, file_version(info))
+        return os.path.join(self.root, digest[:2], digest, os.path.basename(path.rstrip("/")))
+
+    def partial(self, key: str, path: str, info: dict) -> str:
+        """The path to download to before commit. Never opened by ChimeraX, so a half-written file is never read."""
+        local = self.target(key, path, info)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        return local + ".part"
+
+    def contains(self, key: str, path: str) -> bool:
+        """Whether any version of the remote file is cached. Does not validate, see lookup."""
+        return (key, path) in self._paths
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+
+    def lookup(self, key: str, path: str, info: dict) -> Optional[str]:
+        """Return the local copy of the current version of a remote file, or None if it is not cached."""
+        digest = self._hash(key, path, file_version(info))
+
+        with self._lock:
+            row = self._db.execute("SELECT local, size FROM files WHERE hash = ?", (digest,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            local, size = row
+            if not os.path.exists(local) or os.path.getsize(local) != size:
+                self._remove(digest, local)
+                self.misses += 1
+                return None
+
+            with self._db:
+                self._db.execute("UPDATE files SET used = ? WHERE hash = ?", (time.time(), digest))
+            self.hits += 1
+
+        return local
+
+    @property
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "bytes": self.total_bytes,
+        }
+
+    def reserve(self, size: int):
+        """Evict files until size more bytes fit into the budget."""
+        self._evict(self.max_bytes - size)
+
+    def commit(self, key: str, path: str, info: dict, partial: str) -> str:
+        """Atomically move a completed download into the cache and return its final local path."""
+        digest = self._hash(key, path, file_version(info))
+        local = self.target(key, path, info)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        os.replace(partial, local)
+
+        with self._lock:
+            # Older versions of the same remote file are of no further use
+            for old, old_local in self._db.execute(
+                "SELECT hash, local FROM files WHERE key = ? AND path = ? AND hash != ?",
+                (key, path, digest),
+            ).fetchall():
+                self._remove(old, old_local)
+
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (digest, key, path, file_version(info), local, os.path.getsize(local), time.time()),
+                )
+            self._paths.add((key, path))
+
+        self._evict(self.max_bytes, keep=digest)
+        return local
+
+    def clear(self):
+        with self._lock:
+            for digest, local in self._db.execute("SELECT hash, local FROM files").fetchall():
+                self._remove(digest, local)
+
+    def _evict(self, budget: int, keep: Optional[str] = None):
+        with self._lock:
+            total = self.total_bytes
+            if total <= budget:
+                return
+
+            for digest, local, size in self._db.execute("SELECT hash, local, size FROM files ORDER BY used").fetchall():
+                if total <= budget:
+                    break
+                if digest == keep:
+                    continue
+
+                self._remove(digest, local)
+                total -= size
+
+    def _remove(self, digest: str, local: str):
+        with self._lock:
+            row = self._db.execute("SELECT key, path FROM files WHERE hash = ?", (digest,)).fetchone()
+            with self._db:
+                self._db.execute("DELETE FROM files WHERE hash = ?", (digest,))
+
+            if row is not None:
+                remaining = self._db.execute(
+                    "SELECT 1 FROM files WHERE key = ? AND path = ?",
+                    row,
+                ).fetchone()
+                if remaining is None:
+                    self._paths.discard(tuple(row))
+
+        shutil.rmtree(os.path.dirname(local), ignore_errors=True)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
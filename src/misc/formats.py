@@ -0,0 +1,72 @@
+import json
+import os
+from typing import Dict, List, Mapping, Optional
+
+from fsspec import AbstractFileSystem
+
+from .transfer import read_files
+
+DIRECTORY_MARKERS = (".zattrs", ".zarray", ".zgroup", "zarr.json", "attributes.json")
+"""Metadata documents that make a directory a dataset rather than a folder."""
+
+OPENABLE_FORMATS = frozenset({"OME-Zarr", "Zarr array"})
+"""Directory formats the tool opens as volumes. OME-Zarr 0.5 is detected, but its zarr v3 metadata is not read yet."""
+
+
+def _json(data: bytes) -> dict:
+    try:
+        document = json.loads(data)
+    except ValueError:
+        return {}
+
+    return document if isinstance(document, dict) else {}
+
+
+def describe_directory(documents: Dict[str, bytes]) -> str:
+    """Name the format of a directory from the marker documents found in it, empty for a plain folder."""
+    if ".zattrs" in documents and "multiscales" in _json(documents[".zattrs"]):
+        return "OME-Zarr"
+    if ".zarray" in documents:
+        return "Zarr array"
+    if "zarr.json" in documents:
+        meta = _json(documents["zarr.json"])
+        attributes = meta.get("attributes", {})
+        if "multiscales" in attributes.get("ome", attributes):
+            return "OME-Zarr 0.5"
+        return "Zarr v3 array" if meta.get("node_type") == "array" else "Zarr v3 group"
+    if ".zgroup" in documents or ".zattrs" in documents:
+        return "Zarr group"
+    if "attributes.json" in documents and "n5" in _json(documents["attributes.json"]):
+        return "N5"
+
+    return ""
+
+
+def detect_directory_formats(fs: AbstractFileSystem, paths: List[str], concurrency: int = 16) -> Dict[str, str]:
+    """Name the formats of many remote directories, probing all their markers in one concurrent batch.
+
+    Blocking, meant to be run off the GUI thread. Directories whose probes failed for other reasons than missing
+    markers are left out, so they are probed again later.
+    """
+    probes = [(path, marker) for path in paths for marker in DIRECTORY_MARKERS]
+    data = read_files(fs, [f"{path.rstrip('/')}/{marker}" for path, marker in probes], concurrency)
+
+    documents = {path: {} for path in paths}
+    failed = set()
+    for (path, marker), d in zip(probes, data, strict=True):
+        if isinstance(d, FileNotFoundError):
+            continue
+        elif isinstance(d, Exception):
+            failed.add(path)
+        else:
+            documents[path][marker] = d
+
+    return {path: describe_directory(docs) for path, docs in documents.items() if docs or path not in failed}
+
+
+def is_openable_directory(path: str, format: Optional[str], suffixes: Mapping[str, str]) -> bool:
+    """Whether a directory can be opened: by its detected format, or by its suffix until it has been probed."""
+    if format is not None:
+        return format in OPENABLE_FORMATS
+
+    return os.path.splitext(path.rstrip("/"))[1] in suffixes
@@ -0,0 +1,77 @@
+from contextlib import suppress
+from typing import Iterator, List, Optional, Tuple
+
+from fsspec import AbstractFileSystem
+from fsspec.asyn import sync
+
+from .listing_cache import ListingCache
+
+
+async def _next_page(agen, page_size: int) -> Tuple[List[dict], bool]:
+    page = []
+    try:
+        while len(page) < page_size:
+            page.append(await agen.__anext__())
+    except StopAsyncIteration:
+        return page, True
+
+    return page, False
+
+
+def _iter_async_pages(fs: AbstractFileSystem, agen, page_size: int) -> Iterator[List[dict]]:
+    try:
+        done = False
+        while not done:
+            page, done = sync(fs.loop, _next_page, agen, page_size)
+            if page:
+                yield page
+    finally:
+        with suppress(Exception):
+            sync(fs.loop, agen.aclose)
+
+
+def iter_listing(fs: AbstractFileSystem, path: str, page_size: int = 1000) -> Iterator[List[dict]]:
+    """Yield the detailed listing of path in pages of at most page_size entries.
+
+    Filesystems that can iterate a prefix asynchronously (s3fs) are streamed as the ListObjectsV2 pages arrive, all
+    others produce a single page from ls(detail=True). Blocking, meant to be driven from a worker thread.
+    """
+    if page_size and getattr(fs, "async_impl", False) and hasattr(fs, "_iterdir"):
+        bucket, key, _ = fs.split_path(path)
+        if bucket:
+            prefix = key.rstrip("/") + "/" if key else ""
+            yield from _iter_async_pages(fs, fs._iterdir(bucket, prefix=prefix), page_size)
+            return
+
+    yield fs.ls(path, detail=True)
+
+
+def list_all(fs: AbstractFileSystem, path: str, page_size: int = 1000) -> List[dict]:
+    """Return the complete detailed listing of path, bypassing any in-memory listing cache of the filesystem."""
+    with suppress(Exception):
+        fs.invalidate_cache(path)
+
+    return [e for page in iter_listing(fs, path, page_size) for e in page]
+
+
+def cached_listing(
+    fs: AbstractFileSystem,
+    path: str,
+    cache: Optional[ListingCache] = None,
+    key: str = "",
+    page_size: int = 1000,
+    store: bool = True,
+) -> List[dict]:
+    """Return the complete detailed listing of path, from the listing cache if it holds a fresh one.
+
+    Listings that had to be fetched are added to the cache, unless store is False.
+    """
+    if cache is not None:
+        cached = cache.get(key, path)
+        if cached is not None and not cached[1]:
+            return cached[0]
+
+    entries = [e for page in iter_listing(fs, path, page_size) for e in page]
+    if cache is not None and store:
+        cache.put(key, path, entries)
+    return entries
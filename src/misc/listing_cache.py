@@ -0,0 +1,169 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class ListingCache:
+    """Persistent cache of directory listings and info dicts, shared by all connections.
+
+    Entries are keyed by the connection key of the connector (type plus host/profile) and the remote path. Entries
+    older than ttl seconds are still returned, but flagged as stale so they can be revalidated in the background.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS listings "
+                "(key TEXT, path TEXT, entries TEXT, fetched REAL, PRIMARY KEY (key, path))",
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS infos (key TEXT, path TEXT, info TEXT, fetched REAL, PRIMARY KEY (key, path))",
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS previews "
+                "(key TEXT, path TEXT, version TEXT, preview TEXT, PRIMARY KEY (key, path, version))",
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS formats "
+                "(key TEXT, path TEXT, format TEXT, fetched REAL, PRIMARY KEY (key, path))",
+            )
+
+    def get(self, key: str, path: str) -> Optional[Tuple[List[dict], bool]]:
+        """Return the cached listing of path and whether it is stale, or None if it was never cached."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT entries, fetched FROM listings WHERE key = ? AND path = ?",
+                (key, path),
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        entries, fetched = row
+        stale = time.time() - fetched > self.ttl
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return json.loads(entries), stale
+
+    @property
+    def stats(self) -> dict:
+        """Lookups of listings: fresh hits, stale hits (revalidated in the background) and misses."""
+        requests = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / requests if requests else 0.0,
+        }
+
+    def put(self, key: str, path: str, entries: List[dict]):
+        # Info dicts can hold datetimes (e.g. S3 LastModified), those are stored as strings.
+        data = json.dumps(entries, default=str)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?)",
+                (key, path, data, time.time()),
+            )
+
+    def get_info(self, key: str, path: str) -> Optional[dict]:
+        """Return the cached info of path, or None if it was never cached or has expired."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT info, fetched FROM infos WHERE key = ? AND path = ?",
+                (key, path),
+            ).fetchone()
+
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+
+        return json.loads(row[0])
+
+    def put_info(self, key: str, path: str, info: dict):
+        data = json.dumps(info, default=str)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO infos VALUES (?, ?, ?, ?)",
+                (key, path, data, time.time()),
+            )
+
+    def get_previews(self, key: str, versions: Dict[str, str]) -> Dict[str, str]:
+        """Return the cached header previews for the given {path: version}. Previews never expire."""
+        previews = {}
+        with self._lock:
+            for path, version in versions.items():
+                row = self._db.execute(
+                    "SELECT preview FROM previews WHERE key = ? AND path = ? AND version = ?",
+                    (key, path, version),
+                ).fetchone()
+                if row is not None:
+                    previews[path] = row[0]
+
+        return previews
+
+    def put_previews(self, key: str, versions: Dict[str, str], previews: Dict[str, str]):
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO previews VALUES (?, ?, ?, ?)",
+                [(key, path, versions[path], preview) for path, preview in previews.items() if preview is not None],
+            )
+
+    def get_formats(self, key: str, paths: List[str]) -> Dict[str, str]:
+        """Return the cached directory formats of paths, leaving out those older than ttl."""
+        formats = {}
+        with self._lock:
+            for path in paths:
+                row = self._db.execute(
+                    "SELECT format, fetched FROM formats WHERE key = ? AND path = ?",
+                    (key, path),
+                ).fetchone()
+                if row is not None and time.time() - row[1] <= self.ttl:
+                    formats[path] = row[0]
+
+        return formats
+
+    def put_formats(self, key: str, formats: Dict[str, str]):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO formats VALUES (?, ?, ?, ?)",
+                [(key, path, format, now) for path, format in formats.items()],
+            )
+
+    def invalidate(self, key: str, path: Optional[str] = None):
+        """Drop the cached listing and info of path, or everything cached for the connection if path is None.
+
+        The formats of path and of the directories below it are dropped as well, they are probed again.
+        """
+        with self._lock, self._db:
+            if path is None:
+                self._db.execute("DELETE FROM listings WHERE key = ?", (key,))
+                self._db.execute("DELETE FROM infos WHERE key = ?", (key,))
+                self._db.execute("DELETE FROM formats WHERE key = ?", (key,))
+            else:
+                self._db.execute("DELETE FROM listings WHERE key = ? AND path = ?", (key, path))
+                self._db.execute("DELETE FROM infos WHERE key = ? AND path = ?", (key, path))
+                prefix = path.rstrip("/") + "/"
+                self._db.execute(
+                    "DELETE FROM formats WHERE key = ? AND (path = ? OR substr(path, 1, ?) = ?)",
+                    (key, path, len(prefix), prefix),
+                )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
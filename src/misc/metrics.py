@@ -0,0 +1,225 @@
+import bisect
+import contextvars
+import csv
+import functools
+import io
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fsspec import AbstractFileSystem
+from fsspec.asyn import sync_wrapper
+
+LATENCY_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30)
+"""Upper bounds in seconds of the latency histogram buckets, a last bucket holds everything slower."""
+
+OPERATIONS = {
+    "ls": "list",
+    "info": "info",
+    "cat_file": "cat",
+    "get_file": "get",
+}
+"""Filesystem methods recorded, by the operation name they are recorded under."""
+
+_depth = contextvars.ContextVar("remotebrowser_io_depth", default=0)
+
+
+class OperationStats:
+    """Count, errors, bytes and a latency histogram of one operation on one connection."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BOUNDS) + 1)
+
+    def add(self, seconds: float, nbytes: int, error: bool):
+        self.count += 1
+        self.errors += int(error)
+        self.bytes += nbytes
+        self.seconds += seconds
+        self.buckets[bisect.bisect_left(LATENCY_BOUNDS, seconds)] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket the q-th percentile falls into, None without samples or beyond the last bound."""
+        if not self.count:
+            return None
+
+        seen = 0
+        # Beyond the last bound there is no upper bound to give
+        for bound, n in zip(LATENCY_BOUNDS, self.buckets[:-1], strict=True):
+            seen += n
+            if seen >= q / 100 * self.count:
+                return bound
+        return None
+
+    def as_dict(self) -> dict:
+        labels = [f"<={b * 1000:g}ms" for b in LATENCY_BOUNDS] + ["slower"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "mean_ms": 1000 * self.seconds / self.count if self.count else None,
+            "p50_ms": _ms(self.percentile(50)),
+            "p95_ms": _ms(self.percentile(95)),
+            "p99_ms": _ms(self.percentile(99)),
+            "histogram": dict(zip(labels, self.buckets, strict=True)),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else seconds * 1000
+
+
+class IOMetrics:
+    """Remote I/O statistics of all connections, by connection key and operation.
+
+    Filenames are recorded nowhere, only counts, bytes and timings. Cache statistics are not kept here, the caches
+    count their own hits, see snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], OperationStats] = {}
+
+    def record(self, key: str, operation: str, seconds: float, nbytes: int = 0, error: bool = False):
+        with self._lock:
+            stats = self._stats.get((key, operation))
+            if stats is None:
+                stats = self._stats[(key, operation)] = OperationStats()
+            stats.add(seconds, nbytes, error)
+
+    def rows(self) -> List[dict]:
+        """One dict per connection and operation, sorted by connection."""
+        with self._lock:
+            return [
+                {"connection": key, "operation": operation, **stats.as_dict()}
+                for (key, operation), stats in sorted(self._stats.items())
+            ]
+
+    def snapshot(self, caches: Optional[Dict[str, dict]] = None) -> dict:
+        return {"time": time.time(), "operations": self.rows(), "caches": caches or {}}
+
+    def to_json(self, caches: Optional[Dict[str, dict]] = None) -> str:
+        return json.dumps(self.snapshot(caches), indent=2)
+
+    def to_csv(self, caches: Optional[Dict[str, dict]] = None) -> str:
+        """Operations as one row each, followed by one row per cache with its hit statistics."""
+        out = io.StringIO()
+        writer = csv.writer(out)
+        buckets = [f"<={b * 1000:g}ms" for b in LATENCY_BOUNDS] + ["slower"]
+        columns = ["connection", "operation", "count", "errors", "bytes", "mean_ms", "p50_ms", "p95_ms", "p99_ms"]
+        writer.writerow(columns + buckets)
+        for row in self.rows():
+            writer.writerow([row[c] for c in columns] + [row["histogram"][b] for b in buckets])
+
+        if caches:
+            writer.writerow([])
+            writer.writerow(["cache", "statistic", "value"])
+            for name, stats in caches.items():
+                for stat, value in stats.items():
+                    writer.writerow([name, stat, value])
+
+        return out.getvalue()
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def _size(operation: str, result, args) -> int:
+    if operation == "cat" and isinstance(result, (bytes, bytearray)):
+        return len(result)
+    if operation == "get" and len(args) > 1 and isinstance(args[1], str) and os.path.isfile(args[1]):
+        return os.path.getsize(args[1])
+    return 0
+
+
+def _wrap(func, metrics: IOMetrics, key: str, operation: str):
+    # Only the outermost recorded call counts, a get that reads through cat is one get
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _depth.set(_depth.get() + 1)
+        start = time.perf_counter()
+        result, error = None, False
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            _depth.reset(token)
+            if _depth.get() == 0:
+                metrics.record(key, operation, time.perf_counter() - start, _size(operation, result, args), error)
+
+    return wrapper
+
+
+def _wrap_async(func, metrics: IOMetrics, key: str, operation: str):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _depth.set(_depth.get() + 1)
+        start = time.perf_counter()
+        result, error = None, False
+        try:
+            result = await func(*args, **kwargs)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            _depth.reset(token)
+            if _depth.get() == 0:
+                metrics.record(key, operation, time.perf_counter() - start, _size(operation, result, args), error)
+
+    return wrapper
+
+
+def _wrap_iterdir(func, metrics: IOMetrics, key: str):
+    # Paged listings (s3fs) are recorded once they are exhausted or abandoned, unless they are part of a recorded ls
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        outermost = _depth.get() == 0
+        start = time.perf_counter()
+        error = False
+        try:
+            async for entry in func(*args, **kwargs):
+                yield entry
+        except Exception:
+            error = True
+            raise
+        finally:
+            if outermost:
+                metrics.record(key, "list", time.perf_counter() - start, 0, error)
+
+    return wrapper
+
+
+def instrument(fs: AbstractFileSystem, metrics: IOMetrics, key: str) -> AbstractFileSystem:
+    """Record the listings, infos, reads and downloads of fs in metrics under key.
+
+    The methods of the instance are wrapped in place, so the filesystem keeps its type and every code path that holds
+    it is measured. Instrumenting a filesystem twice, e.g. a pooled one, does nothing.
+    """
+    if getattr(fs, "_io_metrics", None) is not None:
+        return fs
+
+    is_async = getattr(fs, "async_impl", False)
+    for method, operation in OPERATIONS.items():
+        if is_async and hasattr(fs, f"_{method}"):
+            wrapped = _wrap_async(getattr(fs, f"_{method}"), metrics, key, operation)
+            setattr(fs, f"_{method}", wrapped)
+            # The blocking methods of async filesystems were bound to the unwrapped coroutines at construction
+            setattr(fs, method, sync_wrapper(wrapped, obj=fs))
+        elif hasattr(fs, method):
+            setattr(fs, method, _wrap(getattr(fs, method), metrics, key, operation))
+
+    if is_async and hasattr(fs, "_iterdir"):
+        fs._iterdir = _wrap_iterdir(fs._iterdir, metrics, key)
+
+    fs._io_metrics = metrics
+    return fs
@@ -0,0 +1,102 @@
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from fsspec import AbstractFileSystem
+
+from .transfer import read_range
+
+MRC_SUFFIXES = (".mrc", ".map", ".rec", ".mrcs", ".st", ".ali")
+"""Suffixes of files in the MRC format."""
+
+MRC_MODES = {
+    0: np.int8,
+    1: np.int16,
+    2: np.float32,
+    6: np.uint16,
+    12: np.float16,
+}
+"""Data types of the MRC modes that can be read voxel by voxel."""
+
+MRC_HEADER_SIZE = 1024
+
+
+class MRCHeader:
+    """The fields of an MRC header needed to locate and interpret the voxel data."""
+
+    def __init__(
+        self,
+        size: Tuple[int, int, int],
+        dtype: np.dtype,
+        voxel_size: Tuple[float, float, float],
+        origin: Tuple[float, float, float],
+        axis_order: Tuple[int, int, int],
+        data_offset: int,
+    ):
+        self.size = size
+        """Grid size in x, y, z."""
+        self.dtype = dtype
+        """Voxel data type, in the byte order of the file."""
+        self.voxel_size = voxel_size
+        self.origin = origin
+        self.axis_order = axis_order
+        """MAPC, MAPR, MAPS: which axis columns, rows and sections run along."""
+        self.data_offset = data_offset
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.size, dtype=np.int64)) * self.dtype.itemsize
+
+    @property
+    def is_xyz_ordered(self) -> bool:
+        return self.axis_order == (1, 2, 3)
+
+
+def parse_mrc_header(data: bytes) -> Optional[MRCHeader]:
+    """Parse the first 1024 bytes of an MRC file, or return None if they are not a usable MRC header."""
+    if len(data) < MRC_HEADER_SIZE:
+        return None
+
+    # The machine stamp is not always set correctly, so accept whichever byte order gives a sane header.
+    for order in "<>":
+        ints = np.frombuffer(data[:MRC_HEADER_SIZE], dtype=f"{order}i4")
+        floats = np.frombuffer(data[:MRC_HEADER_SIZE], dtype=f"{order}f4")
+
+        nx, ny, nz, mode = (int(v) for v in ints[0:4])
+        if mode not in MRC_MODES or not all(0 < n < 10**6 for n in (nx, ny, nz)):
+            continue
+
+        mx, my, mz = (int(v) for v in ints[7:10])
+        cella = floats[10:13]
+        voxel_size = tuple(float(c / m) if m > 0 and c > 0 else 1.0 for c, m in zip(cella, (mx, my, mz), strict=True))
+
+        axis_order = tuple(int(v) for v in ints[16:19])
+        if sorted(axis_order) != [1, 2, 3]:
+            axis_order = (1, 2, 3)
+
+        origin = tuple(float(v) for v in floats[49:52])
+        if not any(origin):
+            nstart = ints[4:7]
+            origin = tuple(float(s * v) for s, v in zip(nstart, voxel_size, strict=True))
+
+        nsymbt = max(int(ints[23]), 0)
+
+        return MRCHeader(
+            size=(nx, ny, nz),
+            dtype=np.dtype(MRC_MODES[mode]).newbyteorder(order),
+            voxel_size=voxel_size,
+            origin=origin,
+            axis_order=axis_order,
+            data_offset=MRC_HEADER_SIZE + nsymbt,
+        )
+
+    return None
+
+
+def is_mrc(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in MRC_SUFFIXES
+
+
+def read_mrc_header(fs: AbstractFileSystem, path: str) -> Optional[MRCHeader]:
+    """Fetch and parse the header of a remote MRC file with a single ranged request."""
+    return parse_mrc_header(read_range(fs, path, 0, MRC_HEADER_SIZE))
@@ -0,0 +1,418 @@
+import itertools
+import json
+import math
+import os
+import threading
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import zarr
+from chimerax.map_data import GridData
+from chimerax.map_data.readarray import allocate_array
+from fsspec import AbstractFileSystem
+from zarr.storage import BaseStore
+
+from .chunk_cache import ChunkCache
+from .file_cache import file_version
+from .transfer import read_files
+
+Region = Tuple[Tuple[int, int, int], Tuple[int, int, int]]
+"""Inclusive (x, y, z) voxel bounds, like the region of a ChimeraX volume."""
+
+
+def _is_metadata(key: str) -> bool:
+    return key.rpartition("/")[2].startswith(".")
+
+
+class ChunkStore(BaseStore):
+    """Read-only zarr store on a remote directory, counting the bytes it fetched.
+
+    All chunks a read of zarr needs are requested at once, served from the chunk cache where possible and otherwise
+    fetched concurrently up to concurrency at a time. Missing chunks are left out, zarr fills them with the fill value.
+    Metadata documents always come from the remote side.
+    """
+
+    def __init__(
+        self,
+        fs: AbstractFileSystem,
+        root: str,
+        concurrency: int = 16,
+        cache: Optional[ChunkCache] = None,
+        url: str = "",
+    ):
+        self.fs = fs
+        self.root = root.rstrip("/")
+        self.concurrency = concurrency
+        self.cache = cache
+        self.url = url or fs.unstrip_protocol(self.root)
+        """Identifies the store in the chunk cache."""
+        self.version = ""
+        """Version of the image metadata, chunks are only cached once it is known."""
+
+        self.bytes_read = 0
+        """Bytes fetched over the network so far."""
+        self.chunks_read = 0
+        """Chunks and metadata documents fetched over the network so far."""
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return f"{self.root}/{key}"
+
+    def getitems(self, keys, **kwargs):
+        keys = list(keys)
+        cached = self.cache is not None and self.version
+
+        found = {}
+        if cached:
+            found = self.cache.get_many(self.url, [key for key in keys if not _is_metadata(key)], self.version)
+
+        missing = [key for key in keys if key not in found]
+        fetched = {}
+        results = read_files(self.fs, [self._path(key) for key in missing], self.concurrency)
+        for key, data in zip(missing, results, strict=True):
+            if isinstance(data, FileNotFoundError):
+                continue
+            if isinstance(data, Exception):
+                raise data
+            fetched[key] = data
+
+        with self._lock:
+            self.bytes_read += sum(len(data) for data in fetched.values())
+            self.chunks_read += len(fetched)
+
+        if cached:
+            self.cache.put_many(
+                self.url,
+                {key: data for key, data in fetched.items() if not _is_metadata(key)},
+                self.version,
+            )
+
+        found.update(fetched)
+        return found
+
+    def __getitem__(self, key: str) -> bytes:
+        found = self.getitems([key])
+        if key not in found:
+            raise KeyError(key)
+        return found[key]
+
+    def __contains__(self, key: str) -> bool:
+        return self.fs.exists(self._path(key))
+
+    def __iter__(self) -> Iterator[str]:
+        for path in self.fs.find(self.root):
+            yield path[len(self.root) :].lstrip("/")
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __setitem__(self, key, value):
+        raise PermissionError("Remote zarr stores are read-only")
+
+    def __delitem__(self, key):
+        raise PermissionError("Remote zarr stores are read-only")
+
+
+class Level:
+    """One resolution level of a multiscale image, with the metadata needed to plan reads of it."""
+
+    def __init__(self, path: str, meta: dict, scale: List[float], translation: List[float]):
+        self.path = path
+        self.shape = tuple(meta["shape"])
+        self.chunks = tuple(meta["chunks"])
+        self.dtype = np.dtype(meta["dtype"])
+        self.separator = meta.get("dimension_separator", ".")
+        self.scale = scale
+        """Voxel size per array axis."""
+        self.translation = translation
+        """Position of the first voxel per array axis."""
+
+
+class Multiscales:
+    """The levels of an OME-Zarr image, finest first, and which array axes are channel and (z, y, x)."""
+
+    def __init__(self, name: str, levels: List[Level], axes: List[dict]):
+        self.name = name
+        self.levels = levels
+        self.axes = axes
+
+        ndim = len(levels[0].shape)
+        types = [a.get("type") for a in axes] if axes else []
+        spatial = [i for i, t in enumerate(types) if t == "space"] or list(range(ndim))[-3:]
+        self.spatial = spatial[-3:]
+        """Array axes of z, y and x, only y and x for 2D images."""
+        self.channel = types.index("channel") if "channel" in types else None
+
+    def size(self, level: Level) -> Tuple[int, int, int]:
+        """(x, y, z) size of a level."""
+        zyx = [level.shape[i] for i in self.spatial]
+        return tuple(reversed([1] * (3 - len(zyx)) + zyx))
+
+    def xyz(self, values: List[float], fill: float) -> Tuple[float, float, float]:
+        zyx = [values[i] for i in self.spatial]
+        return tuple(reversed([fill] * (3 - len(zyx)) + zyx))
+
+    def factor(self, level: Level) -> Tuple[float, float, float]:
+        """How many voxels of the finest level one voxel of level spans, per (x, y, z) axis."""
+        finest = self.xyz(self.levels[0].scale, 1)
+        return tuple(s / f for s, f in zip(self.xyz(level.scale, 1), finest, strict=True))
+
+    def region_at(self, level: Level, region: Optional[Region]) -> Region:
+        """Convert a region of the finest level to the voxels of level that cover it."""
+        size = self.size(level)
+        if region is None:
+            return (0, 0, 0), tuple(s - 1 for s in size)
+
+        factor = self.factor(level)
+        low = tuple(min(max(int(math.floor(r / f)), 0), s - 1) for r, f, s in zip(region[0], factor, size, strict=True))
+        high = tuple(
+            min(max(int(math.floor(r / f)), lo), s - 1)
+            for r, f, s, lo in zip(region[1], factor, size, low, strict=True)
+        )
+        return low, high
+
+    def choose_level(self, region: Optional[Region], max_voxels: int, max_bytes: int) -> Level:
+        """The finest level whose part covering region fits both budgets, the coarsest one if none does."""
+        for level in self.levels:
+            low, high = self.region_at(level, region)
+            voxels = math.prod(h - lo + 1 for lo, h in zip(low, high, strict=True))
+            if voxels <= max_voxels and voxels * level.dtype.itemsize <= max_bytes:
+                return level
+
+        return self.levels[-1]
+
+    def chunk_keys(self, level: Level, region: Optional[Region]) -> List[str]:
+        """Keys of the chunks of level a grid of region reads, of all channels and the first time point."""
+        low, high = self.region_at(level, region)
+        ranges = [range(1)] * len(level.shape)
+        if self.channel is not None:
+            ranges[self.channel] = range(math.ceil(level.shape[self.channel] / level.chunks[self.channel]))
+        # Regions run x, y, z, 2D images have no z axis to read
+        for axis, lo, hi in zip(reversed(self.spatial), low, high, strict=False):
+            ranges[axis] = range(lo // level.chunks[axis], hi // level.chunks[axis] + 1)
+
+        prefix = f"{level.path}/" if level.path else ""
+        return [prefix + level.separator.join(map(str, index)) for index in itertools.product(*ranges)]
+
+
+def _scale_translation(transforms: List[dict], ndim: int) -> Tuple[List[float], List[float]]:
+    scale, translation = [1.0] * ndim, [0.0] * ndim
+    for t in transforms or []:
+        if t.get("type") == "scale":
+            scale = [a * b for a, b in zip(scale, t["scale"], strict=True)]
+        elif t.get("type") == "translation":
+            translation = [a + b for a, b in zip(translation, t["translation"], strict=True)]
+
+    return scale, translation
+
+
+def read_multiscales(store: ChunkStore) -> Multiscales:
+    """Read the multiscales metadata and the array metadata of all levels, in two rounds of requests.
+
+    A plain zarr array without OME metadata is treated as an image with a single level.
+    """
+    name = os.path.basename(store.root)
+    meta = store.getitems([".zattrs", ".zarray"])
+    if ".zarray" not in meta and ".zattrs" not in meta:
+        raise ValueError(f"{store.root} is neither an OME-Zarr image nor a zarr array")
+
+    _read_version(store, ".zarray" if ".zarray" in meta else ".zattrs")
+
+    if ".zarray" in meta:
+        array = json.loads(meta[".zarray"])
+        ndim = len(array["shape"])
+        return Multiscales(name, [Level("", array, [1.0] * ndim, [0.0] * ndim)], [])
+
+    multiscales = json.loads(meta[".zattrs"]).get("multiscales")
+    if not multiscales:
+        raise ValueError(f"{store.root} has no multiscales metadata")
+
+    multiscale = multiscales[0]
+    datasets = multiscale["datasets"]
+    arrays = store.getitems([f"{d['path']}/.zarray" for d in datasets])
+
+    levels = []
+    for d in datasets:
+        array = json.loads(arrays[f"{d['path']}/.zarray"])
+        ndim = len(array["shape"])
+        scale, translation = _scale_translation(d.get("coordinateTransformations"), ndim)
+        # Transformations of the whole multiscale apply on top of those of each level
+        outer_scale, outer_translation = _scale_translation(multiscale.get("coordinateTransformations"), ndim)
+        scale = [a * b for a, b in zip(scale, outer_scale, strict=True)]
+        translation = [a * s + b for a, s, b in zip(translation, outer_scale, outer_translation, strict=True)]
+        levels.append(Level(d["path"], array, scale, translation))
+
+    # Versions before 0.4 list axes as names only
+    axes = [a if isinstance(a, dict) else {"name": a, "type": _axis_type(a)} for a in multiscale.get("axes", [])]
+    levels.sort(key=lambda level: math.prod(level.shape), reverse=True)
+    return Multiscales(multiscale.get("name") or name, levels, axes)
+
+
+def _read_version(store: ChunkStore, document: str):
+    # The version of the metadata stands for the version of every chunk. Writers that replace chunks without touching
+    # the metadata are not noticed, the chunk cache only bounds how long such chunks are served by its ttl
+    if store.cache is None:
+        return
+
+    try:
+        store.version = file_version(store.fs.info(store._path(document)))
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def _axis_type(name: str) -> str:
+    return {"t": "time", "c": "channel"}.get(name, "space")
+
+
+class OMEZarrGrid(GridData):
+    """Region of one level of an OME-Zarr image, read chunk by chunk on demand.
+
+    Only the chunks intersecting what ChimeraX displays are fetched. Reads of the first time point only.
+    """
+
+    def __init__(
+        self,
+        store: ChunkStore,
+        image: Multiscales,
+        level: Level,
+        region: Optional[Region] = None,
+        channel: Optional[int] = None,
+        on_read: Optional[Callable[["OMEZarrGrid"], None]] = None,
+        array: Optional[zarr.Array] = None,
+    ):
+        self.store = store
+        self.image = image
+        self.level = level
+        self.bounds = image.region_at(level, region)
+        """Voxel bounds of the grid in the level."""
+        self.on_read = on_read
+        self.array = array if array is not None else zarr.open_array(store=store, path=level.path, mode="r")
+
+        low, high = self.bounds
+        scale = image.xyz(level.scale, 1)
+        translation = image.xyz(level.translation, 0)
+        name = image.name if level.path in ("", image.levels[0].path) else f"{image.name} {level.path}"
+
+        GridData.__init__(
+            self,
+            tuple(h - lo + 1 for lo, h in zip(low, high, strict=True)),
+            level.dtype.newbyteorder("="),
+            origin=tuple(t + lo * s for t, lo, s in zip(translation, low, scale, strict=True)),
+            step=scale,
+            name=name if channel is None else f"{name} channel {channel}",
+            path=store.root,
+            file_type="omezarr",
+            channel=channel,
+        )
+        self._channel = channel
+
+    def read_matrix(self, ijk_origin, ijk_size, ijk_step, progress):
+        low, _ = self.bounds
+        selection = [0] * len(self.level.shape)
+        if self._channel is not None:
+            selection[self.image.channel] = self._channel
+
+        # Array axes run z, y, x, the grid's run x, y, z. 2D images have no z axis, the grid's z is left out
+        axes = reversed(self.image.spatial)
+        for axis, start, size, step, offset in zip(axes, ijk_origin, ijk_size, ijk_step, low, strict=False):
+            selection[axis] = slice(offset + start, offset + start + size, step)
+
+        m = allocate_array(ijk_size, self.value_type, ijk_step, progress)
+        m[:] = np.asarray(self.array[tuple(selection)]).reshape(m.shape)
+
+        if self.on_read is not None:
+            self.on_read(self)
+
+        return m
+
+    def finest_region(self, ijk_min, ijk_max) -> Region:
+        """Convert a region of this grid, e.g. the one displayed, to the voxels of the finest level it covers."""
+        low, _ = self.bounds
+        factor = self.image.factor(self.level)
+        return (
+            tuple(int(math.floor((lo + i) * f)) for lo, i, f in zip(low, ijk_min, factor, strict=True)),
+            tuple(int(math.ceil((lo + i + 1) * f)) - 1 for lo, i, f in zip(low, ijk_max, factor, strict=True)),
+        )
+
+
+def level_grids(
+    store: ChunkStore,
+    image: Multiscales,
+    level: Level,
+    region: Optional[Region],
+    channels: Sequence[Optional[int]],
+    on_read: Optional[Callable[[OMEZarrGrid], None]] = None,
+) -> List[OMEZarrGrid]:
+    """One grid per channel of level, sharing one array. Blocking, opening the array reads its metadata."""
+    array = zarr.open_array(store=store, path=level.path, mode="r")
+    return [OMEZarrGrid(store, image, level, region, channel, on_read, array) for channel in channels]
+
+
+def prefetch_level(
+    store: ChunkStore,
+    image: Multiscales,
+    level: Level,
+    region: Optional[Region],
+    cancelled: Callable[[], bool],
+) -> bool:
+    """Fetch the chunks of level that cover region into the chunk cache, concurrency at a time.
+
+    Blocking, meant to be run off the GUI thread. Returns whether all chunks were fetched before cancelled was true.
+    """
+    keys = image.chunk_keys(level, region)
+    for start in range(0, len(keys), store.concurrency):
+        if cancelled():
+            return False
+        store.getitems(keys[start : start + store.concurrency])
+
+    return True
+
+
+def replace_grid(session, volume, grid):
+    """Show grid in volume instead of its current data, keeping the display settings. Returns the volume showing it."""
+    if hasattr(volume, "replace_data"):
+        volume.replace_data(grid)
+        volume.new_region((0, 0, 0), tuple(s - 1 for s in grid.size), adjust_step=True)
+        return volume
+
+    from chimerax.map import volume_from_grid_data
+
+    replacement = volume_from_grid_data(grid, session)
+    session.models.close([volume])
+    return replacement
+
+
+def load_omezarr(
+    fs: AbstractFileSystem,
+    path: str,
+    region: Optional[Region] = None,
+    max_voxels: int = 512**3,
+    max_bytes: int = 512 * 1024**2,
+    concurrency: int = 16,
+    on_read: Optional[Callable[[OMEZarrGrid], None]] = None,
+    cache: Optional[ChunkCache] = None,
+    url: str = "",
+    progressive: bool = False,
+) -> Tuple[List[OMEZarrGrid], ChunkStore, Multiscales, List[Level]]:
+    """Read an OME-Zarr image (or region of it) at the finest level that fits the budgets, for showing in ChimeraX.
+
+    region is given in voxels of the finest level. Chunks are shared with every other image through cache, url
+    identifies the image in it, and the chunks of the level shown first are fetched into it already. If progressive,
+    the coarsest level is shown first instead. Blocking, meant to be run off the GUI thread. Returns the grids to show,
+    one per channel, the store and image, and the finer levels up to the chosen one, coarsest first, that the grids
+    are still to be refined to.
+    """
+    store = ChunkStore(fs, path, concurrency=concurrency, cache=cache, url=url)
+    image = read_multiscales(store)
+    target = image.choose_level(region, max_voxels, max_bytes)
+    # Levels are ordered finest first, refine from the coarsest up to the target
+    finer = image.levels[image.levels.index(target) :][::-1]
+    level = finer.pop(0) if progressive else target
+    if not progressive:
+        finer = []
+
+    if store.cache is not None and store.version:
+        prefetch_level(store, image, level, region, lambda: False)
+
+    channels = [None] if image.channel is None else range(level.shape[image.channel])
+    return level_grids(store, image, level, region, channels, on_read), store, image, finer
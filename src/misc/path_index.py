@@ -0,0 +1,292 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional
+
+from fsspec import AbstractFileSystem
+
+from .listing import cached_listing
+from .listing_cache import ListingCache
+from .util import info_mtime
+
+
+def _terms(query: str) -> List[str]:
+    # Glob characters and quotes carry no meaning for the index, they only separate terms
+    return [term.lower() for term in re.split(r"[\s*?\[\]\"]+", query) if term]
+
+
+class PathIndex:
+    """On-disk index of every path below crawled roots, for searching without network round trips.
+
+    Entries are keyed by the connection key, like the listing cache, and searched with an FTS5 trigram index where
+    SQLite supports it, with plain substring matching otherwise. Directories that are still to be crawled are kept in
+    the database as well, so an interrupted crawl continues where it stopped.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, key TEXT, parent TEXT, path TEXT, "
+                "name TEXT, type TEXT, size INTEGER, mtime REAL, UNIQUE (key, path))",
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_parent ON entries (key, parent)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS roots (key TEXT, root TEXT, crawled REAL, PRIMARY KEY (key, root))",
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pending (key TEXT, root TEXT, path TEXT, PRIMARY KEY (key, root, path))",
+            )
+
+            try:
+                self._db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts "
+                    "USING fts5(path, content='entries', content_rowid='id', tokenize='trigram')",
+                )
+                self._db.execute(
+                    "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN "
+                    "INSERT INTO entries_fts (rowid, path) VALUES (new.id, new.path); END",
+                )
+                self._db.execute(
+                    "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN "
+                    "INSERT INTO entries_fts (entries_fts, rowid, path) VALUES ('delete', old.id, old.path); END",
+                )
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite without FTS5 or older than 3.34, which introduced the trigram tokenizer
+                self.fts = False
+
+    @staticmethod
+    def _root(root: str) -> str:
+        return root.rstrip("/") or root
+
+    def crawled(self, key: str, root: str) -> Optional[float]:
+        """When the last complete crawl of root ended, or None if it was never indexed."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT crawled FROM roots WHERE key = ? AND root = ?",
+                (key, self._root(root)),
+            ).fetchone()
+
+        return None if row is None else row[0]
+
+    def is_indexed(self, key: str, root: str) -> bool:
+        """Whether root has been crawled, completely or in part."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM roots WHERE key = ? AND root = ? UNION SELECT 1 FROM pending WHERE key = ? AND root = ?",
+                (key, self._root(root), key, self._root(root)),
+            ).fetchone()
+
+        return row is not None
+
+    def is_interrupted(self, key: str, root: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM pending WHERE key = ? AND root = ? LIMIT 1",
+                (key, self._root(root)),
+            ).fetchone()
+
+        return row is not None
+
+    def begin(self, key: str, root: str):
+        """Queue root for crawling, unless an interrupted crawl of it is still pending."""
+        if not self.is_interrupted(key, root):
+            with self._lock, self._db:
+                self._db.execute("INSERT INTO pending VALUES (?, ?, ?)", (key, self._root(root), self._root(root)))
+
+    def pending(self, key: str, root: str, limit: int) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM pending WHERE key = ? AND root = ? LIMIT ?",
+                (key, self._root(root), limit),
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def add_listing(self, key: str, root: str, path: str, entries: Optional[List[dict]]):
+        """Replace the indexed children of path with a new listing and queue its subdirectories.
+
+        Subtrees of directories that disappeared are dropped. A listing of None only marks path as done.
+        """
+        root = self._root(root)
+        path = path.rstrip("/") or path
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM pending WHERE key = ? AND root = ? AND path = ?", (key, root, path))
+            if entries is None:
+                return
+
+            names = {e["name"].rstrip("/") for e in entries}
+            for (old,) in self._db.execute(
+                "SELECT path FROM entries WHERE key = ? AND parent = ? AND type = 'directory'",
+                (key, path),
+            ).fetchall():
+                if old not in names:
+                    prefix = old + "/"
+                    self._db.execute(
+                        "DELETE FROM entries WHERE key = ? AND substr(path, 1, ?) = ?",
+                        (key, len(prefix), prefix),
+                    )
+
+            self._db.execute("DELETE FROM entries WHERE key = ? AND parent = ?", (key, path))
+
+            rows, directories = [], []
+            for e in entries:
+                name = e["name"].rstrip("/")
+                if name == path:
+                    continue
+
+                kind = e.get("type", "other")
+                mtime = info_mtime(e)
+                rows.append((key, path, name, name.rpartition("/")[2], kind, e.get("size") or 0, mtime))
+                if kind == "directory":
+                    directories.append((key, root, name))
+
+            self._db.executemany(
+                "INSERT OR IGNORE INTO entries (key, parent, path, name, type, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.executemany("INSERT OR IGNORE INTO pending VALUES (?, ?, ?)", directories)
+
+    def finish(self, key: str, root: str):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO roots VALUES (?, ?, ?)", (key, self._root(root), time.time()))
+
+    def search(self, key: str, root: str, query: str, limit: int = 1000) -> List[dict]:
+        """Return the info dicts of indexed entries below root whose path contains every term of query.
+
+        Terms match anywhere in the path and in any order. Entries whose own name matches the first term come first,
+        then shorter paths.
+        """
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        root = self._root(root)
+        prefix = "" if root in ("", "/") else root + "/"
+        sql = "SELECT e.path, e.type, e.size, e.mtime FROM entries AS e"
+        conditions = ["e.key = ?", "substr(e.path, 1, ?) = ?"]
+        params: list = [key, len(prefix), prefix]
+
+        # Trigrams need at least three characters, shorter terms are matched by scanning the candidates
+        fts_terms = [term for term in terms if len(term) >= 3] if self.fts else []
+        if fts_terms:
+            sql += " JOIN entries_fts AS f ON f.rowid = e.id"
+            conditions.append("entries_fts MATCH ?")
+            params.append(" AND ".join('"' + term.replace('"', '""') + '"' for term in fts_terms))
+
+        for term in terms:
+            if term not in fts_terms:
+                conditions.append("instr(lower(e.path), ?) > 0")
+                params.append(term)
+
+        sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY instr(lower(e.name), ?) = 0, length(e.path) LIMIT ?"
+        params += [terms[0], limit]
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+
+        results = []
+        for path, kind, size, mtime in rows:
+            info = {"name": path, "type": kind, "size": size}
+            if mtime is not None:
+                info["mtime"] = mtime
+            results.append(info)
+
+        return results
+
+    def drop(self, key: str, root: str):
+        """Forget that root was crawled. Entries stay, they may be shared with other indexed roots."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM roots WHERE key = ? AND root = ?", (key, self._root(root)))
+            self._db.execute("DELETE FROM pending WHERE key = ? AND root = ?", (key, self._root(root)))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def crawl(
+    fs: AbstractFileSystem,
+    index: PathIndex,
+    key: str,
+    root: str,
+    concurrency: int = 8,
+    cache: Optional[ListingCache] = None,
+    page_size: int = 1000,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    submit: Optional[Callable[..., Future]] = None,
+) -> bool:
+    """Walk everything below root into the index. Blocking, meant to be run off the GUI thread.
+
+    Up to concurrency directories are listed at the same time. The listings are passed to submit, the submit of the
+    connection's runner, or else run on a thread pool of their own. Fresh listings are taken from the listing cache,
+    but crawled listings are not added to it. The index is searchable throughout, an existing index of root is
+    replaced directory by directory. progress is called with the number of directories and entries indexed so far.
+    Returns whether the crawl completed, a crawl stopped by cancel or an error continues on the next call.
+    Directories whose listing failed stay pending, they are not retried before the next call.
+    """
+    index.begin(key, root)
+    directories, entries = 0, 0
+    failed = set()
+
+    executor = None
+    if submit is None:
+        executor = ThreadPoolExecutor(max_workers=max(concurrency, 1))
+        submit = executor.submit
+
+    running = {}
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                return False
+
+            # Enough pending directories to fill the pool, some of them may be running already
+            listing = set(running.values())
+            for path in index.pending(key, root, len(listing) + len(failed) + concurrency):
+                if len(running) >= concurrency:
+                    break
+                if path not in listing and path not in failed:
+                    running[submit(cached_listing, fs, path, cache, key, page_size, store=False)] = path
+
+            if not running:
+                break
+
+            done, _ = wait(running, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = running.pop(future)
+                try:
+                    listed = future.result()
+                except FileNotFoundError:
+                    # Removed since its parent was listed, there is nothing below it to index
+                    listed = None
+                except Exception as e:
+                    print(f"Error: {e}")
+                    failed.add(path)
+                    continue
+
+                index.add_listing(key, root, path, listed)
+                directories += 1
+                entries += len(listed or [])
+                if progress is not None:
+                    progress(directories, entries)
+    finally:
+        for future in running:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    if failed:
+        return False
+
+    index.finish(key, root)
+    return True
@@ -0,0 +1,116 @@
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+
+from fsspec import AbstractFileSystem
+
+from .mrc import MRC_HEADER_SIZE, is_mrc, parse_mrc_header
+from .transfer import read_ranges
+from .util import file_size
+
+PREVIEW_BYTES = 4096
+"""Bytes fetched from the start of each file, enough for an MRC header and most TIFF first IFDs."""
+
+TIFF_SUFFIXES = (".tif", ".tiff")
+
+_TIFF_SAMPLE_FORMATS = {1: "uint", 2: "int", 3: "float"}
+
+
+def is_previewable(path: str) -> bool:
+    return is_mrc(path) or os.path.splitext(path)[1].lower() in TIFF_SUFFIXES
+
+
+def describe_mrc(data: bytes) -> str:
+    header = parse_mrc_header(data)
+    if header is None:
+        return ""
+
+    nx, ny, nz = header.size
+    vx, _, _ = header.voxel_size
+    dtype = header.dtype.newbyteorder("=").name
+    return f"{nx}×{ny}×{nz} · {vx:.3g} Å · {dtype} · {file_size(header.nbytes)}"
+
+
+def _tiff_ifd_offset(data: bytes) -> Tuple[Optional[str], int]:
+    if data[:4] == b"II*\x00":
+        return "<", struct.unpack("<I", data[4:8])[0]
+    elif data[:4] == b"MM\x00*":
+        return ">", struct.unpack(">I", data[4:8])[0]
+    return None, 0
+
+
+def _ifd_within(data: bytes, order: str, offset: int) -> bool:
+    """Whether the image file directory at offset lies entirely within data."""
+    if offset + 2 > len(data):
+        return False
+
+    count = struct.unpack(f"{order}H", data[offset : offset + 2])[0]
+    return offset + 2 + 12 * count <= len(data)
+
+
+def describe_tiff(data: bytes, ifd: bytes) -> str:
+    """Describe the first page of a TIFF file from its header and first image file directory."""
+    order, _ = _tiff_ifd_offset(data)
+    if order is None or len(ifd) < 2:
+        return ""
+
+    count = struct.unpack(f"{order}H", ifd[:2])[0]
+    tags = {}
+    for i in range(count):
+        entry = ifd[2 + 12 * i : 14 + 12 * i]
+        if len(entry) < 12:
+            break
+        tag, kind = struct.unpack(f"{order}HH", entry[:4])
+        if kind == 3:
+            tags[tag] = struct.unpack(f"{order}H", entry[8:10])[0]
+        elif kind == 4:
+            tags[tag] = struct.unpack(f"{order}I", entry[8:12])[0]
+
+    if 256 not in tags or 257 not in tags:
+        return ""
+
+    width, height = tags[256], tags[257]
+    bits = tags.get(258, 8)
+    samples = tags.get(277, 1)
+    dtype = f"{_TIFF_SAMPLE_FORMATS.get(tags.get(339, 1), 'uint')}{bits}"
+    nbytes = width * height * samples * bits // 8
+    return f"{width}×{height} · {dtype} · {file_size(nbytes)} per page"
+
+
+def read_previews(
+    fs: AbstractFileSystem,
+    paths: List[str],
+    concurrency: int = 16,
+) -> Dict[str, str]:
+    """Describe the volume headers of many remote files, fetching only the first few KB of each concurrently.
+
+    Blocking, meant to be run off the GUI thread. Files without a recognisable header map to an empty string, files
+    that could not be read at all map to None.
+    """
+    data = read_ranges(fs, paths, [0] * len(paths), [PREVIEW_BYTES] * len(paths), concurrency)
+
+    previews = {}
+    follow_up = {}
+    for path, d in zip(paths, data, strict=True):
+        if isinstance(d, Exception):
+            previews[path] = None
+        elif is_mrc(path):
+            previews[path] = describe_mrc(d[:MRC_HEADER_SIZE])
+        else:
+            order, offset = _tiff_ifd_offset(d)
+            if order is None:
+                previews[path] = ""
+            elif _ifd_within(d, order, offset):
+                previews[path] = describe_tiff(d, d[offset:])
+            else:
+                follow_up[path] = (d, offset)
+
+    # Writers that put the first directory after the image data need a second, still batched, round trip
+    if follow_up:
+        paths = list(follow_up)
+        starts = [follow_up[p][1] for p in paths]
+        ifds = read_ranges(fs, paths, starts, [s + PREVIEW_BYTES for s in starts], concurrency)
+        for path, ifd in zip(paths, ifds, strict=True):
+            previews[path] = None if isinstance(ifd, Exception) else describe_tiff(follow_up[path][0], ifd)
+
+    return previews
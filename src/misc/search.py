@@ -0,0 +1,112 @@
+import fnmatch
+import re
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, List, Optional
+
+from fsspec import AbstractFileSystem
+
+from .listing import cached_listing
+from .listing_cache import ListingCache
+
+GLOB_CHARS = frozenset("*?[")
+
+
+def name_matcher(pattern: str) -> Callable[[str], bool]:
+    """Return a predicate on paths relative to the search root.
+
+    Patterns with glob characters are matched like fnmatch, others as a substring. Matching is case-insensitive and
+    only looks at the last path component, unless the pattern itself contains a "/".
+    """
+    pattern = pattern.strip()
+    whole_path = "/" in pattern
+
+    if GLOB_CHARS & set(pattern):
+        regex = re.compile(fnmatch.translate(pattern), re.IGNORECASE)
+
+        def match(relpath: str) -> bool:
+            return regex.match(relpath if whole_path else relpath.rpartition("/")[2]) is not None
+
+    else:
+        needle = pattern.lower()
+
+        def match(relpath: str) -> bool:
+            return needle in (relpath if whole_path else relpath.rpartition("/")[2]).lower()
+
+    return match
+
+
+def iter_search(
+    fs: AbstractFileSystem,
+    root: str,
+    pattern: str,
+    max_depth: int = 6,
+    concurrency: int = 16,
+    max_results: int = 10000,
+    cache: Optional[ListingCache] = None,
+    key: str = "",
+    page_size: int = 1000,
+    cancel: Optional[threading.Event] = None,
+    submit: Optional[Callable[..., Future]] = None,
+) -> Iterator[List[dict]]:
+    """Yield the info dicts of entries below root that match pattern, a batch per listed directory.
+
+    Directories are listed breadth first up to max_depth levels below root, up to concurrency of them at the same
+    time. The listings are passed to submit, the submit of the connection's runner, or else run on a thread pool of
+    their own. Fresh listings in the cache are used instead of listing again, new listings are added to it. The search
+    ends after max_results matches or once cancel is set. Blocking, meant to be driven from a worker thread.
+    """
+    match = name_matcher(pattern)
+    root = root.rstrip("/") or root
+    found = 0
+
+    executor = None
+    if submit is None:
+        executor = ThreadPoolExecutor(max_workers=max(concurrency, 1))
+        submit = executor.submit
+
+    waiting = deque([(root, 0)])
+    running = {}
+    try:
+        while waiting or running:
+            if cancel is not None and cancel.is_set():
+                return
+
+            while waiting and len(running) < max(concurrency, 1):
+                path, depth = waiting.popleft()
+                running[submit(cached_listing, fs, path, cache, key, page_size)] = (path, depth)
+
+            # Wake up regularly, a slow listing must not delay a cancellation
+            done, _ = wait(running, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, depth = running.pop(future)
+                try:
+                    entries = future.result()
+                except Exception as e:
+                    print(f"Error: {e}")
+                    continue
+
+                matches = []
+                for entry in entries:
+                    name = entry["name"].rstrip("/")
+                    if name == path or not name.startswith(root):
+                        continue
+
+                    if match(name[len(root) :].lstrip("/")):
+                        matches.append(entry)
+                    if entry.get("type") == "directory" and depth + 1 < max_depth:
+                        waiting.append((name, depth + 1))
+
+                if matches:
+                    matches = matches[: max_results - found]
+                    found += len(matches)
+                    yield matches
+
+                if found >= max_results:
+                    return
+    finally:
+        for future in running:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
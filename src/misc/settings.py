@@ -8,9 +8,80 @@ class RemoteBrowserSettings(Settings):
             "preferred_user": "",
             "preferred_port": 22,
             "preferred_root": "/",
+            "preferred_key": "",
+            "max_sessions": 10,
+            "block_size": 64 * 1024,
+            "max_requests": 128,
+            "compression": False,
+            "use_agent": True,
         },
         "s3fs": {
             "preferred_profile": "",
             "preferred_root": "/",
+            "max_pool_connections": 32,
+        },
+        "local": {
+            "preferred_root": "",
+            "preferred_latency": 0,
+            "preferred_bandwidth": 0,
+        },
+        "memory": {
+            "preferred_root": "/benchmark",
+            "preferred_latency": 50,
+            "preferred_bandwidth": 10,
+            "depth": 3,
+            "directories": 4,
+            "files": 8,
+            "file_size": 64 * 1024,
+            "large_file_size": 64 * 1024**2,
+        },
+        "connectors": {
+            "disabled": ["memory"],
+        },
+        "connections": {
+            "idle_timeout": 600,
+            "check_interval": 60,
+            "network_threads": 16,
+            "threads_per_connection": 8,
+            "connect_timeout": 30,
+        },
+        "listing": {
+            "page_size": 1000,
+            "max_rows": 5000,
+            "prefetch": False,
+            "prefetch_concurrency": 4,
+            "prefetch_max_entries": 100000,
+        },
+        "cache": {
+            "listing_ttl": 3600,
+            "file_cache_bytes": 20 * 1024**3,
+            "chunk_memory_bytes": 1024**3,
+            "chunk_disk_bytes": 10 * 1024**3,
+            "chunk_ttl": 24 * 3600,
+        },
+        "transfer": {
+            "chunk_size": 16 * 1024**2,
+            "concurrency": 8,
+            "max_transfers": 4,
+            "batch_size": 32,
+        },
+        "streaming": {
+            "stream_min_size": 1024**3,
+            "block_size": 8 * 1024**2,
+        },
+        "omezarr": {
+            "max_voxels": 512**3,
+            "max_bytes": 512 * 1024**2,
+            "concurrency": 16,
+            "progressive": True,
+        },
+        "metrics": {
+            "enabled": True,
+        },
+        "search": {
+            "max_depth": 6,
+            "concurrency": 16,
+            "max_results": 10000,
+            "index_max_age": 24 * 3600,
         },
     }
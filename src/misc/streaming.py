@@ -0,0 +1,82 @@
+import os
+import threading
+
+import numpy as np
+from chimerax.map_data import GridData
+from chimerax.map_data.readarray import allocate_array
+from fsspec import AbstractFileSystem
+
+from .mrc import MRCHeader
+
+
+class RemoteMRCGrid(GridData):
+    """MRC volume read plane by plane from a remote file, without a local copy.
+
+    ChimeraX only requests the planes needed for the current display step and region, so a subsampled first display
+    of a large map touches a fraction of the file. Reads go through a single buffered fsspec file object with a block
+    cache, neighbouring planes are served from blocks that were already fetched.
+    """
+
+    def __init__(self, fs: AbstractFileSystem, path: str, header: MRCHeader, block_size: int = 8 * 1024**2):
+        self.fs = fs
+        self.remote_path = path
+        self.header = header
+        self.block_size = block_size
+
+        self._file = None
+        self._lock = threading.Lock()
+
+        GridData.__init__(
+            self,
+            header.size,
+            header.dtype.newbyteorder("="),
+            origin=header.origin,
+            step=header.voxel_size,
+            name=os.path.basename(path),
+            path=path,
+            file_type="mrc",
+        )
+
+    def _open(self):
+        if self._file is None:
+            self._file = self.fs.open(
+                self.remote_path,
+                "rb",
+                block_size=self.block_size,
+                cache_type="blockcache",
+            )
+        return self._file
+
+    def read_matrix(self, ijk_origin, ijk_size, ijk_step, progress):
+        i0, j0, k0 = ijk_origin
+        isz, jsz, ksz = ijk_size
+        istep, jstep, kstep = ijk_step
+        nx, ny, _ = self.header.size
+        itemsize = self.header.dtype.itemsize
+
+        m = allocate_array(ijk_size, self.value_type, ijk_step, progress)
+
+        with self._lock:
+            f = self._open()
+            for out_k, k in enumerate(range(k0, k0 + ksz, kstep)):
+                # Only the rows of the plane that intersect the region are fetched
+                f.seek(self.header.data_offset + (k * ny + j0) * nx * itemsize)
+                rows = np.frombuffer(f.read(jsz * nx * itemsize), dtype=self.header.dtype).reshape(jsz, nx)
+                m[out_k, :, :] = rows[::jstep, i0 : i0 + isz : istep]
+                if progress:
+                    progress.plane(out_k)
+
+        return m
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_remote_mrc(session, fs: AbstractFileSystem, path: str, header: MRCHeader, block_size: int = 8 * 1024**2):
+    """Show a remote MRC file in ChimeraX, streaming the voxel data on demand."""
+    from chimerax.map import volume_from_grid_data
+
+    grid = RemoteMRCGrid(fs, path, header, block_size=block_size)
+    return volume_from_grid_data(grid, session)
@@ -0,0 +1,325 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import BinaryIO, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from fsspec import AbstractFileSystem
+from fsspec.asyn import AsyncFileSystem, sync
+
+from .file_cache import FileCache
+
+
+class TransferCancelledError(Exception):
+    pass
+
+
+def supports_ranges(fs: AbstractFileSystem) -> bool:
+    """Whether byte ranges of a file can be fetched concurrently on the filesystem's event loop."""
+    if not getattr(fs, "async_impl", False):
+        return False
+
+    return type(fs)._cat_file is not AsyncFileSystem._cat_file
+
+
+async def cat_range(fs: AbstractFileSystem, path: str, start: int, end: int) -> bytes:
+    """Fetch bytes [start, end) of a remote file."""
+    return await fs._cat_file(path, start=start, end=end)
+
+
+class _Journal:
+    """Records which chunks of a partial download are complete, so an interrupted download can be resumed.
+
+    The journal lives next to the partial file. Its first line holds the file and chunk size it was written for, a
+    journal for a different size or chunking is discarded together with the partial file.
+    """
+
+    def __init__(self, target: str, size: int, chunk_size: int):
+        self.path = target + ".chunks"
+        self.header = f"{size} {chunk_size}"
+        self.done: Set[int] = set()
+
+        if os.path.exists(self.path) and os.path.exists(target) and os.path.getsize(target) == size:
+            with open(self.path) as f:
+                lines = f.read().splitlines()
+            if lines and lines[0] == self.header:
+                # A trailing line may be torn if the process died while writing it
+                self.done = {int(line) for line in lines[1:] if line.isdigit()}
+
+        if not self.done:
+            with open(target, "wb") as f:
+                f.truncate(size)
+            with open(self.path, "w") as f:
+                f.write(self.header + "\n")
+
+    def mark(self, start: int):
+        # Chunks are megabytes, reopening the journal for each of them costs nothing in comparison
+        with open(self.path, "a") as f:
+            f.write(f"{start}\n")
+
+    def remove(self):
+        os.remove(self.path)
+
+
+async def _ranged_download(
+    fs: AbstractFileSystem,
+    path: str,
+    f: BinaryIO,
+    size: int,
+    starts: List[int],
+    chunk_size: int,
+    concurrency: int,
+    journal: _Journal,
+    progress: Optional[Callable[[int], None]],
+    cancel: Optional[threading.Event],
+):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(start: int):
+        async with semaphore:
+            if cancel is not None and cancel.is_set():
+                raise TransferCancelledError(path)
+            data = await cat_range(fs, path, start, min(start + chunk_size, size))
+
+        # All chunks are written from the event loop thread, so seek/write pairs never interleave.
+        f.seek(start)
+        f.write(data)
+        journal.mark(start)
+        if progress is not None:
+            progress(len(data))
+
+    tasks = [asyncio.ensure_future(fetch(start)) for start in starts]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop the remaining ranges before the target file is closed underneath them
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def _threaded_download(
+    fs: AbstractFileSystem,
+    path: str,
+    f: BinaryIO,
+    size: int,
+    starts: List[int],
+    chunk_size: int,
+    concurrency: int,
+    journal: _Journal,
+    progress: Optional[Callable[[int], None]],
+    cancel: Optional[threading.Event],
+    submit: Optional[Callable[..., Future]],
+):
+    def fetch(start: int) -> Tuple[int, bytes]:
+        if cancel is not None and cancel.is_set():
+            raise TransferCancelledError(path)
+        return start, fs.cat_file(path, start=start, end=min(start + chunk_size, size))
+
+    executor = None
+    if submit is None:
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        submit = executor.submit
+
+    # Ranges are submitted as others complete, a shared submit would otherwise queue them ahead of everything else
+    waiting = deque(starts)
+    running = set()
+    try:
+        while waiting or running:
+            while waiting and len(running) < concurrency:
+                running.add(submit(fetch, waiting.popleft()))
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Chunks are written from this thread only, so seek/write pairs never interleave.
+                start, data = future.result()
+                f.seek(start)
+                f.write(data)
+                journal.mark(start)
+                if progress is not None:
+                    progress(len(data))
+    finally:
+        for future in running:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def download(
+    fs: AbstractFileSystem,
+    path: str,
+    target: str,
+    size: int,
+    chunk_size: int = 16 * 1024**2,
+    concurrency: int = 8,
+    progress: Optional[Callable[[int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    submit: Optional[Callable[..., Future]] = None,
+):
+    """Download a remote file to target. Blocking, meant to be run off the GUI thread.
+
+    The file is split into byte ranges of chunk_size that are written into a preallocated target file, with up to
+    concurrency ranges fetched at the same time: on the event loop of filesystems with an async implementation, on
+    all others through submit, the submit of the connection's runner, or else in threads of their own. A file smaller
+    than chunk_size is a single request. Completed ranges are journaled, so calling download again for the same
+    target after a failure or cancellation only fetches the missing ranges. Setting cancel stops the download between
+    ranges and raises TransferCancelledError.
+    """
+    journal = _Journal(target, size, chunk_size)
+    starts = [start for start in range(0, size, chunk_size) if start not in journal.done]
+    if progress is not None and journal.done:
+        progress(size - sum(min(chunk_size, size - start) for start in starts))
+
+    with open(target, "r+b") as f:
+        args = (fs, path, f, size, starts, chunk_size, max(concurrency, 1), journal, progress, cancel)
+        if supports_ranges(fs):
+            sync(fs.loop, _ranged_download, *args)
+        else:
+            _threaded_download(*args, submit)
+
+    journal.remove()
+
+
+def plan_batch(fs: AbstractFileSystem, files: Dict[str, dict], directories: List[str]) -> Dict[str, dict]:
+    """Expand a selection into the info dicts of all files to fetch, recursing into the directories."""
+    planned = dict(files)
+    for directory in directories:
+        found = fs.find(directory, detail=True)
+        planned.update({path: info for path, info in found.items() if info.get("type") == "file"})
+
+    return planned
+
+
+def _discard(partial: str):
+    try:
+        os.remove(partial)
+        os.rmdir(os.path.dirname(partial))
+    except OSError:
+        pass
+
+
+def fetch_batch(
+    fs: AbstractFileSystem,
+    file_cache: FileCache,
+    key: str,
+    files: Dict[str, dict],
+    batch_size: int = 32,
+    cancel: Optional[threading.Event] = None,
+) -> Tuple[int, int, float]:
+    """Fetch many files into the file cache. Blocking, meant to be run off the GUI thread.
+
+    Files that are already cached are skipped. The rest is fetched with the filesystem's batched get, which on async
+    filesystems runs up to batch_size get_file calls concurrently. Setting cancel stops the batch between groups
+    of files and raises TransferCancelledError. A group that fails raises and leaves no partial files behind. Returns the
+    number of files and bytes fetched and the elapsed time.
+    """
+    todo = [(path, info) for path, info in files.items() if file_cache.lookup(key, path, info) is None]
+    file_cache.reserve(sum(info.get("size", 0) for _, info in todo))
+
+    kwargs = {"batch_size": batch_size} if getattr(fs, "async_impl", False) else {}
+    # Several batches per group keep the filesystem busy while still letting a cancellation through
+    group_size = 4 * batch_size
+
+    start = time.perf_counter()
+    count, nbytes = 0, 0
+    for i in range(0, len(todo), group_size):
+        if cancel is not None and cancel.is_set():
+            raise TransferCancelledError(f"{len(todo) - count} files")
+
+        group = todo[i : i + group_size]
+        partials = [file_cache.partial(key, path, info) for path, info in group]
+        try:
+            fs.get([path for path, _ in group], partials, **kwargs)
+        except Exception:
+            # Batched gets are not journaled and cannot be resumed, partial files would never be indexed or evicted
+            for partial in partials:
+                _discard(partial)
+            raise
+
+        for (path, info), partial in zip(group, partials, strict=True):
+            file_cache.commit(key, path, info, partial)
+            count += 1
+            nbytes += info.get("size", 0)
+
+    return count, nbytes, time.perf_counter() - start
+
+
+def read_range(fs: AbstractFileSystem, path: str, start: int, end: int) -> bytes:
+    """Fetch bytes [start, end) of a remote file. Blocking, meant to be run off the GUI thread."""
+    if supports_ranges(fs):
+        return sync(fs.loop, cat_range, fs, path, start, end)
+
+    return fs.cat_file(path, start=start, end=end)
+
+
+async def _cat_ranges(
+    fs: AbstractFileSystem,
+    paths: List[str],
+    starts: List[int],
+    ends: List[int],
+    concurrency: int,
+) -> List[Union[bytes, Exception]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(path: str, start: int, end: int) -> bytes:
+        async with semaphore:
+            return await cat_range(fs, path, start, end)
+
+    fetches = [fetch(*args) for args in zip(paths, starts, ends, strict=True)]
+    return await asyncio.gather(*fetches, return_exceptions=True)
+
+
+def read_ranges(
+    fs: AbstractFileSystem,
+    paths: List[str],
+    starts: List[int],
+    ends: List[int],
+    concurrency: int = 16,
+) -> List[Union[bytes, Exception]]:
+    """Fetch one byte range from each of many remote files, concurrently where the filesystem allows it.
+
+    Blocking, meant to be run off the GUI thread. Failed reads are returned as the exception instead of raising.
+    """
+    if supports_ranges(fs):
+        return sync(fs.loop, _cat_ranges, fs, paths, starts, ends, concurrency)
+
+    results = []
+    for path, start, end in zip(paths, starts, ends, strict=True):
+        try:
+            results.append(fs.cat_file(path, start=start, end=end))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+async def _cat_files(fs: AbstractFileSystem, paths: List[str], concurrency: int) -> List[Union[bytes, Exception]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(path: str) -> bytes:
+        async with semaphore:
+            return await fs._cat_file(path)
+
+    return await asyncio.gather(*[fetch(path) for path in paths], return_exceptions=True)
+
+
+def read_files(fs: AbstractFileSystem, paths: List[str], concurrency: int = 16) -> List[Union[bytes, Exception]]:
+    """Fetch many small remote files whole, concurrently on the event loop or in threads.
+
+    Blocking. Failed reads are returned as the exception instead of raising, missing files as FileNotFoundError.
+    """
+    if getattr(fs, "async_impl", False):
+        return sync(fs.loop, _cat_files, fs, paths, concurrency)
+
+    with ThreadPoolExecutor(max_workers=max(min(concurrency, len(paths)), 1)) as executor:
+        futures = [executor.submit(fs.cat_file, path) for path in paths]
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
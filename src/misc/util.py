@@ -1,11 +1,47 @@
+from datetime import datetime
+from typing import Dict, Optional
+
 from chimerax.core.session import Session
 
 
-def openable_suffixes(session: Session):
-    formats = session.open_command.open_data_formats
+def openable_suffixes(session: Session) -> Dict[str, str]:
+    """Map every suffix ChimeraX opens to its format name. Built once, rows are checked against it on every paint."""
+    suffixes = {}
+    for fmt in session.open_command.open_data_formats:
+        for suffix in fmt.suffixes:
+            suffixes.setdefault(suffix, fmt.name)
 
-    suffixes = []
-    for fmt in formats:
-        suffixes += fmt.suffixes
+    # OME-Zarr images are read by the tool itself
+    suffixes.setdefault(".zarr", "OME-Zarr")
 
     return suffixes
+
+
+def file_size(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024**2:
+        return f"{round(size / 1024, 2)} KB"
+    elif size < 1024**3:
+        return f"{round(size / 1024**2, 2)} MB"
+    elif size < 1024**4:
+        return f"{round(size / 1024**3, 2)} GB"
+    else:
+        return f"{round(size / 1024**4, 2)} TB"
+
+
+def timestamp(value) -> Optional[float]:
+    """Seconds since the epoch from an fsspec mtime, which is a number, a datetime or an ISO string."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value.timestamp()
+
+
+def info_mtime(info: dict) -> Optional[float]:
+    """Modification time of an fsspec info dict in seconds since the epoch, whichever key the filesystem uses."""
+    return timestamp(info.get("mtime") or info.get("LastModified") or info.get("last_modified") or info.get("created"))
@@ -3,6 +3,7 @@ import os.path
 from sys import platform
 
 # ChimeraX
+from chimerax.core import app_dirs
 from chimerax.core.tools import ToolInstance
 from chimerax.ui import MainToolWindow
 
@@ -12,20 +13,23 @@ from Qt.QtWidgets import (
     QVBoxLayout,
 )
 
-from .conn.s3fs_connector import S3FSConnector
+from .conn.pool import ConnectionPool
+from .conn.registry import connector_types
+from .misc.chunk_cache import ChunkCache
 from .misc.env import env_if_mac
+from .misc.file_cache import FileCache
+from .misc.formats import is_openable_directory
+from .misc.listing_cache import ListingCache
+from .misc.metrics import IOMetrics
+from .misc.mrc import MRCHeader
+from .misc.path_index import PathIndex
 from .misc.settings import RemoteBrowserSettings
-from .misc.util import openable_suffixes
+from .misc.util import file_size, openable_suffixes
 
 # This tool
 from .ui.main_widget import MainWidget
 from .ui.QFSSpecModel import FSTreeItem
 
-FSTYPES = {
-    "s3fs": S3FSConnector,
-    #    "sshfs": SSHFSConnector,
-}
-
 
 class RemoteBrowserTool(ToolInstance):
     # Does this instance persist when session closes
@@ -60,8 +64,40 @@ class RemoteBrowserTool(ToolInstance):
 
         self.settings = RemoteBrowserSettings(session, "RemoteBrowser", version="1")
         """Default values for different file systems."""
-        self.fstypes = {k: clz(**getattr(self.settings, k)) for k, clz in FSTYPES.items()}
+        self.fstypes = {}
         """The available remote file system types."""
+        for name, clz in connector_types(self.settings.connectors["disabled"]).items():
+            try:
+                # Plugin connectors have no settings section of their own
+                self.fstypes[name] = clz(**(getattr(self.settings, name, None) or {}))
+            except Exception as e:
+                print(f"Error: {e}")
+        self.connection_pool = ConnectionPool(idle_timeout=self.settings.connections["idle_timeout"])
+        """Live filesystems, reused across connects and closed on shutdown."""
+        for connector in self.fstypes.values():
+            connector.pool = self.connection_pool
+            connector.connect_timeout = self.settings.connections["connect_timeout"]
+        self.listing_cache = ListingCache(
+            os.path.join(app_dirs.user_cache_dir, "RemoteBrowser", "listings.sqlite"),
+            ttl=self.settings.cache["listing_ttl"],
+        )
+        """Listings and file infos persisted across connections and restarts."""
+        self.file_cache = FileCache(
+            os.path.join(app_dirs.user_cache_dir, "RemoteBrowser", "files"),
+            max_bytes=self.settings.cache["file_cache_bytes"],
+        )
+        """Local copies of remote files, bounded in size."""
+        self.chunk_cache = ChunkCache(
+            os.path.join(app_dirs.user_cache_dir, "RemoteBrowser", "chunks.sqlite"),
+            memory_bytes=self.settings.cache["chunk_memory_bytes"],
+            disk_bytes=self.settings.cache["chunk_disk_bytes"],
+            ttl=self.settings.cache["chunk_ttl"],
+        )
+        """Chunks of remote zarr images, shared by all images opened in the session."""
+        self.path_index = PathIndex(os.path.join(app_dirs.user_cache_dir, "RemoteBrowser", "paths.sqlite"))
+        """Paths below crawled roots, for searching while typing."""
+        self.metrics = IOMetrics() if self.settings.metrics["enabled"] else None
+        """Counts and timings of the remote I/O of all connections."""
 
         # UI
         self.tool_window = MainToolWindow(self, close_destroys=False)
@@ -81,24 +117,161 @@ class RemoteBrowserTool(ToolInstance):
         tw = self.tool_window
 
         self._layout = QVBoxLayout()
-        self._mw = MainWidget(self.fstypes, openable_suffixes=openable_suffixes(self.session))
+        self._mw = MainWidget(
+            self.fstypes,
+            openable_suffixes=openable_suffixes(self.session),
+            listing_cache=self.listing_cache,
+            file_cache=self.file_cache,
+            **self.settings.listing,
+            **self.settings.transfer,
+            stream_min_size=self.settings.streaming["stream_min_size"],
+            search_depth=self.settings.search["max_depth"],
+            search_concurrency=self.settings.search["concurrency"],
+            max_results=self.settings.search["max_results"],
+            path_index=self.path_index,
+            index_max_age=self.settings.search["index_max_age"],
+            connection_pool=self.connection_pool,
+            check_interval=self.settings.connections["check_interval"],
+            network_threads=self.settings.connections["network_threads"],
+            threads_per_connection=self.settings.connections["threads_per_connection"],
+            connect_timeout=self.settings.connections["connect_timeout"],
+            metrics=self.metrics,
+            chunk_cache=self.chunk_cache,
+        )
         self._layout.addWidget(self._mw)
 
         tw.ui_area.setLayout(self._layout)
         tw.manage("left")
 
         self._mw.file_caching_finished.connect(self.open_file)
+        self._mw.file_stream_requested.connect(self.open_stream)
         self._mw.openable_directory_clicked.connect(self.open_dir)
+        self._mw.directory_region_requested.connect(self.open_region)
+
+    def delete(self):
+        self._mw.shutdown()
+        self.connection_pool.close_all()
+        for connector in self.fstypes.values():
+            connector.shutdown()
+        self.listing_cache.close()
+        self.file_cache.close()
+        self.chunk_cache.close()
+        self.path_index.close()
+        super().delete()
 
     def open_file(self, path: str):
         from chimerax.core.commands import run
 
         run(self.session, f"open {path}")
 
-    def open_dir(self, item: FSTreeItem):
-        if self.can_read_omezarr and os.path.splitext(item.path)[1] == ".zarr":
+    def open_stream(self, item: FSTreeItem, header: MRCHeader):
+        from .misc.streaming import open_remote_mrc
+
+        open_remote_mrc(self.session, item.fs, item.path, header, block_size=self.settings.streaming["block_size"])
+
+    def open_dir(self, item: FSTreeItem, region=None):
+        # Directories that were not probed yet go by their suffix
+        if not is_openable_directory(item.path, item.format, {".zarr": "OME-Zarr"}):
+            return
+
+        self._mw.runner.start_coroutine(self._open_omezarr(item, region))
+
+    async def _open_omezarr(self, item: FSTreeItem, region=None):
+        """Read the metadata and the first chunks of the image at item in the background, then show it."""
+        from chimerax.map import volume_from_grid_data
+
+        from .misc.omezarr import load_omezarr
+
+        try:
+            grids, store, image, finer = await self._mw.runner.run(
+                load_omezarr,
+                item.fs,
+                item.path,
+                region=region,
+                on_read=self._report_transfer,
+                cache=self.chunk_cache,
+                url=f"{self._mw.cache_key(item.fs)}:{item.path.rstrip('/')}",
+                **self.settings.omezarr,
+            )
+        except ValueError as e:
+            # Not metadata this reader understands, the OME-Zarr bundle may know better
+            print(f"Error: {e}")
+            self._open_with_bundle(item)
+            return
+        except Exception as e:
+            print(f"Error: {e}")
+            return
+
+        level = grids[0].level
+        size = image.size(level)
+        message = (
+            f"Opening level {level.path or 0} of {image.name} ({size[0]}×{size[1]}×{size[2]}), "
+            f"{len(image.levels)} levels available"
+        )
+        self.session.logger.info(message)
+
+        volumes = [volume_from_grid_data(grid, self.session) for grid in grids]
+        if finer:
+            await self._refine(volumes, store, image, region, finer)
+
+    def _open_with_bundle(self, item: FSTreeItem):
+        if self.can_read_omezarr:
             from chimerax.ome_zarr.open import open_ome_zarr_from_fs
 
             models, msg = open_ome_zarr_from_fs(self.session, item.fs, item.path, initial_step=(4, 4, 4))
 
             self.session.models.add(models)
+
+    def open_region(self, item: FSTreeItem):
+        """Open the region of the image at item that an open, e.g. coarse, view of it is cropped to."""
+        from chimerax.map import Volume
+
+        from .misc.omezarr import OMEZarrGrid
+
+        for volume in reversed(self.session.models.list(type=Volume)):
+            grid = volume.data
+            if isinstance(grid, OMEZarrGrid) and grid.store.fs is item.fs and grid.store.root == item.path.rstrip("/"):
+                ijk_min, ijk_max, _ = volume.region
+                self.open_dir(item, grid.finest_region(ijk_min, ijk_max))
+                return
+
+        message = f"Open {item.name} and crop it with the volume region tools first"
+        self.session.logger.warning(message)
+
+    async def _refine(self, volumes, store, image, region, levels):
+        """Fetch the finer levels one by one in the background, showing each in the volumes once it is complete."""
+        from .misc.omezarr import level_grids, prefetch_level, replace_grid
+
+        channels = [volume.data.channel for volume in volumes]
+        on_read = volumes[0].data.on_read
+        for level in levels:
+            try:
+                complete = await self._mw.runner.run(
+                    prefetch_level,
+                    store,
+                    image,
+                    level,
+                    region,
+                    lambda: all(v.deleted for v in volumes),
+                )
+                if not complete:
+                    return
+
+                # Opening the level's array reads its metadata, keep that off the GUI thread as well
+                grids = await self._mw.runner.run(level_grids, store, image, level, region, channels, on_read)
+            except Exception as e:
+                print(f"Error: {e}")
+                return
+
+            for i, (volume, grid) in enumerate(zip(volumes, grids, strict=True)):
+                if not volume.deleted:
+                    volumes[i] = replace_grid(self.session, volume, grid)
+
+            size = image.size(level)
+            self.session.logger.status(f"{image.name}: showing level {level.path} ({size[0]}×{size[1]}×{size[2]})")
+
+    def _report_transfer(self, grid):
+        self.session.logger.status(
+            f"{grid.name}: {file_size(grid.store.bytes_read)} in {grid.store.chunks_read} chunks transferred, "
+            f"chunk cache hit rate {self.chunk_cache.hit_rate:.0%}",
+        )
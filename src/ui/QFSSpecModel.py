@@ -1,97 +1,362 @@
-from Qt.QtCore import Qt, QAbstractItemModel, QModelIndex
-from Qt.QtWidgets import QFileIconProvider, QStyle, QApplication
-from Qt.QtGui import QMovie, QIcon
-
+import os
+import sys
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import suppress
 from pathlib import Path, PurePosixPath
-from fsspec import AbstractFileSystem
-from typing import Union, Any, List
+from typing import Any, Dict, List, Optional, Set, Union
+
 from fonticon_mdi7 import MDI7
+from fsspec import AbstractFileSystem
+from Qt.QtCore import QAbstractItemModel, QModelIndex, QPersistentModelIndex, Qt
+from Qt.QtGui import QIcon, QMovie
+from Qt.QtWidgets import QApplication, QFileIconProvider, QStyle
 from superqt.fonticon import icon
 
+from ..misc.file_cache import FileCache, file_version
+from ..misc.formats import detect_directory_formats
+from ..misc.listing import cached_listing, iter_listing, list_all
+from ..misc.listing_cache import ListingCache
+from ..misc.preview import is_previewable, read_previews
+from ..misc.util import file_size, info_mtime
+from .runner import ConnectionRunner
 
-def file_size(size: int) -> str:
-    if size < 1024:
-        return f"{size} B"
-    elif size < 1024**2:
-        return f"{round(size / 1024, 2)} KB"
-    elif size < 1024**3:
-        return f"{round(size / 1024**2, 2)} MB"
-    elif size < 1024**4:
-        return f"{round(size / 1024**3, 2)} GB"
-    else:
-        return f"{round(size / 1024**4, 2)} TB"
 
+def _listing_signature(entries: List[dict]):
+    return sorted((e["name"], e.get("type"), e.get("size")) for e in entries)
 
-class FSTreeItem:
-    def __init__(self, fs: AbstractFileSystem, path: PurePosixPath, parent=None):
+
+def _split_path(path: str):
+    dirname, sep, name = path.rstrip("/").rpartition("/")
+    if (sep or path.startswith("/")) and not dirname:
+        dirname = "/"
+    # Siblings share a single parent path string
+    return sys.intern(dirname), name
+
+
+_LOADING = 1
+_FETCHING = 2
+_CACHED = 4
+_KIND_SHIFT = 3
+_KINDS = ("other", "file", "directory", "link")
+
+_SIZE_BITS = 48
+_SIZE_MASK = (1 << _SIZE_BITS) - 1
+
+
+def _pack_etag(etag: Optional[str]):
+    if etag is None:
+        return None
+
+    etag = etag.strip('"')
+    try:
+        # Plain MD5 ETags take half the space as bytes
+        return bytes.fromhex(etag)
+    except ValueError:
+        return etag
+
+
+class _ItemExtra:
+    """State only a few nodes need at any time: directories being listed or probed, files being fetched or previewed."""
+
+    __slots__ = ("placeholder", "pages", "pending", "listed", "fetched_bytes", "preview", "format")
+
+    def __init__(self):
+        self.placeholder = None
+        self.pages = None
+        self.pending = None
+        self.listed = None
+        self.fetched_bytes = 0
+        self.preview = None
+        self.format = None
+
+
+def _extra_property(name: str, default=None):
+    def getter(self):
+        return default if self._extra is None else getattr(self._extra, name)
+
+    def setter(self, value):
+        if self._extra is None:
+            if value == default:
+                return
+            self._extra = _ItemExtra()
+        setattr(self._extra, name, value)
+
+    return property(getter, setter)
+
+
+def load_root_info(
+    fs: AbstractFileSystem,
+    path: str,
+    cache: Optional[ListingCache] = None,
+    cache_key: str = "",
+) -> Optional[dict]:
+    """The info of the root of a tree, from the listing cache if possible. Blocking, it may be a network call."""
+    info = cache.get_info(cache_key, path) if cache is not None else None
+    if info is None:
         try:
-            self.fs = fs
-            self._path = path
-            self._children = None
-            self.parent = parent
-            # print(f"Path on init: {self.path}")
-            self.info = fs.info(self.path)
-            self.being_fetched = False
-            self.is_cached = False
+            info = fs.info(path)
+            if cache is not None:
+                cache.put_info(cache_key, path, info)
         except Exception as e:
             print(f"Error: {e}")
 
+    return info
+
+
+class FSTreeItem:
+    """A node of the remote tree.
+
+    Nodes are kept compact, expanded prefixes can hold hundreds of thousands of them. Each node has the name, the
+    interned path of its parent directory, size and modification time packed into one integer, the ETag and a few
+    flags. The filesystem is held once by the root of the tree, rarely needed state lives in a separate object that
+    is only allocated when used. An fsspec-style info dict is rebuilt on demand.
+    """
+
+    __slots__ = ("name", "_dirname", "parent", "_row", "_stat", "_etag", "_flags", "_children", "_extra")
+
+    is_placeholder = False
+
+    def __init__(
+        self,
+        path: str,
+        parent=None,
+        kind: str = "file",
+        size: int = 0,
+        mtime: Optional[float] = None,
+        etag: Optional[str] = None,
+    ):
+        self._dirname, self.name = _split_path(path)
+        self.parent = parent
+        self._row = 0
+        mtime = 0 if mtime is None else int(mtime) + 1
+        self._stat = (mtime << _SIZE_BITS) | (size & _SIZE_MASK)
+        self._etag = _pack_etag(etag)
+        self._flags = (_KINDS.index(kind) if kind in _KINDS else 0) << _KIND_SHIFT
+        self._children = None
+        self._extra = None
+
+    _placeholder = _extra_property("placeholder")
+    _pages = _extra_property("pages")
+    _pending = _extra_property("pending")
+    _listed = _extra_property("listed")
+    fetched_bytes = _extra_property("fetched_bytes", 0)
+    preview = _extra_property("preview")
+    format = _extra_property("format")
+    """Format of a directory as detected from its metadata, empty for a plain folder, None until probed."""
+
+    @property
+    def kind(self) -> str:
+        return _KINDS[self._flags >> _KIND_SHIFT]
+
+    @property
+    def size(self) -> int:
+        return self._stat & _SIZE_MASK
+
+    @property
+    def mtime(self) -> Optional[int]:
+        mtime = self._stat >> _SIZE_BITS
+        return mtime - 1 if mtime else None
+
+    @property
+    def etag(self) -> Optional[str]:
+        if isinstance(self._etag, bytes):
+            return self._etag.hex()
+        return self._etag
+
+    @classmethod
+    def from_info(cls, info: dict, parent=None):
+        return cls(
+            info["name"],
+            parent,
+            kind=info.get("type", "other"),
+            size=info.get("size") or 0,
+            mtime=info_mtime(info),
+            etag=info.get("ETag") or info.get("etag"),
+        )
+
+    @property
+    def fs(self) -> AbstractFileSystem:
+        item = self
+        while item.parent is not None:
+            item = item.parent
+        return item._fs
+
     @property
     def path(self):
-        return str(self._path)
+        if not self._dirname:
+            return self.name
+        elif self._dirname.endswith("/"):
+            return self._dirname + self.name
+        else:
+            return f"{self._dirname}/{self.name}"
+
+    @property
+    def info(self) -> dict:
+        info = {"name": self.path, "type": self.kind, "size": self.size}
+        if self.mtime is not None:
+            info["mtime"] = self.mtime
+        if self.etag is not None:
+            info["ETag"] = self.etag
+        return info
+
+    def _flag(self, flag: int) -> bool:
+        return bool(self._flags & flag)
+
+    def _set_flag(self, flag: int, value: bool):
+        if value:
+            self._flags |= flag
+        else:
+            self._flags &= ~flag
+
+    is_loading = property(lambda self: self._flag(_LOADING), lambda self, v: self._set_flag(_LOADING, v))
+    being_fetched = property(lambda self: self._flag(_FETCHING), lambda self, v: self._set_flag(_FETCHING, v))
+    is_cached = property(lambda self: self._flag(_CACHED), lambda self, v: self._set_flag(_CACHED, v))
 
     @property
     def children(self):
-        if self.is_file:
+        """The children fetched so far. Never touches the network, see make_children."""
+        if self.is_file or self._children is None:
             return []
 
-        if self._children is None:
-            items = [PurePosixPath(p) for p in self.fs.ls(self.path)]
-            items = [p for p in items if not p == self._path]
-            items = sorted(items, key=lambda x: x.name)
-            self._children = [FSTreeItem(self.fs, p, self) for p in items]
-
         return self._children
 
+    @property
+    def children_loaded(self):
+        return self.is_file or self._children is not None
+
+    @property
+    def has_more(self):
+        """Whether listed entries are waiting to be shown or further listing pages are available."""
+        return bool(self._pending) or self._pages is not None
+
+    def make_children(self, entries: List[dict]) -> List["FSTreeItem"]:
+        """Build child items from one page of a detailed listing."""
+        own = self.path.rstrip("/")
+        children = [FSTreeItem.from_info(e, self) for e in entries if e["name"].rstrip("/") != own]
+        children.sort(key=lambda x: x.name)
+        return children
+
     @property
     def is_dir(self):
-        return self.info["type"] == "directory"
+        return self.kind == "directory"
 
     @property
     def is_file(self):
-        return self.info["type"] == "file"
+        return self.kind == "file"
 
     @property
     def extension(self):
         if self.is_file:
-            return self._path.suffix
+            return os.path.splitext(self.name)[1]
         else:
             return None
 
     def child(self, row):
-        if self.children:
+        if 0 <= row < len(self.children):
             return self.children[row]
+        elif self.is_loading and row == len(self.children):
+            return self._placeholder
         else:
             return None
 
     def childCount(self):
-        return len(self.children)
+        # The placeholder is always the last row
+        return len(self.children) + int(self.is_loading)
 
     def childIndex(self):
+        # Kept in sync by the model whenever rows are inserted, Qt asks for it on every paint.
         if self.parent is not None:
-            return self.parent.children.index(self)
+            return self._row
+
+    def start_loading(self):
+        self.is_loading = True
+        self._placeholder = FSPlaceholderItem(self)
+
+    def finish_loading(self):
+        self.is_loading = False
+        self._placeholder = None
+        self.compact()
+
+    def compact(self):
+        """Drop the extra state once nothing in it is in use any more."""
+        extra = self._extra
+        if extra is None:
+            return
+
+        if (
+            extra.placeholder is None
+            and extra.pages is None
+            and not extra.pending
+            and not extra.listed
+            and not extra.fetched_bytes
+            and extra.preview is None
+            and extra.format is None
+        ):
+            self._extra = None
 
     def data(self, column):
         if column == 0:
-            return self._path.name
+            return self.name
         elif column == 1:
-            if self.is_file:
-                return file_size(self.info["size"])
+            if self.is_file and self.being_fetched and self.size:
+                percent = int(100 * self.fetched_bytes / self.size)
+                return f"{percent}% of {file_size(self.size)}"
+            elif self.is_file:
+                return file_size(self.size)
             else:
                 return None
+        elif column == 2:
+            return self.preview if self.is_file else self.format
 
     def columnCount(self):
-        return 2
+        return 3
+
+
+class FSRootItem(FSTreeItem):
+    """The root of the tree, holding the filesystem shared by all nodes."""
+
+    __slots__ = ("_fs",)
+
+    def __init__(self, fs: AbstractFileSystem, path: str, info: Optional[dict] = None):
+        self._fs = fs
+        try:
+            # Children are built from the parent's detailed listing, only the root needs its own info() call.
+            info = info if info is not None else fs.info(path)
+        except Exception as e:
+            print(f"Error: {e}")
+            info = {"type": "directory"}
+
+        super().__init__(path, kind=info.get("type", "directory"), size=info.get("size") or 0)
+
+
+class FSPlaceholderItem:
+    """Stand-in row shown while the children of a directory are being listed."""
+
+    __slots__ = ("parent",)
+
+    is_placeholder = True
+    is_dir = False
+    is_file = False
+
+    def __init__(self, parent: FSTreeItem):
+        self.parent = parent
+
+    @property
+    def path(self):
+        return self.parent.path
+
+    def childCount(self):
+        return 0
+
+    def childIndex(self):
+        return len(self.parent.children)
+
+    def data(self, column):
+        if column == 0:
+            return "Loading…"
+        else:
+            return None
 
 
 class QFSSpecModel(QAbstractItemModel):
@@ -99,12 +364,49 @@ class QFSSpecModel(QAbstractItemModel):
         self,
         fs: AbstractFileSystem,
         root_path: Union[str, PurePosixPath],
-        openable_types: List[str],
+        openable_types: Dict[str, str],
+        runner: ConnectionRunner,
+        page_size: int = 1000,
+        max_rows: int = 5000,
+        cache: Optional[ListingCache] = None,
+        cache_key: str = "",
+        file_cache: Optional[FileCache] = None,
+        prefetch: bool = False,
+        prefetch_concurrency: int = 4,
+        prefetch_max_entries: int = 100000,
+        root_info: Optional[dict] = None,
         parent=None,
     ):
         super().__init__(parent)
-        self._root = FSTreeItem(fs, PurePosixPath(root_path))
+        self._cache = cache
+        self._cache_key = cache_key
+        self._file_cache = file_cache
+        if root_info is None:
+            root_info = load_root_info(fs, str(root_path), cache, cache_key)
+        self._root = FSRootItem(fs, str(root_path), info=root_info)
         self._openable_types = openable_types
+        self._runner = runner
+        self._page_size = page_size
+        """Number of listing entries requested from a worker thread at a time."""
+        self._max_rows = max_rows
+        """Number of rows materialised per directory until the user scrolls further."""
+        self._closed = False
+
+        self._prefetch = prefetch
+        """List the subdirectories of an expanded directory in the background, before they are expanded."""
+        self._prefetch_concurrency = prefetch_concurrency
+        self._prefetch_max_entries = prefetch_max_entries
+        """Number of prefetched listing entries held in memory, the oldest listings are dropped beyond this."""
+        self._prefetched: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._prefetched_entries = 0
+        self._prefetch_queue: "deque[FSTreeItem]" = deque(maxlen=256)
+        self._prefetch_running = set()
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        self._loaded: Dict[FSTreeItem, Future] = {}
+        """Resolved once the listing in flight for a directory has landed, for reveal to wait on."""
+        self._probing: Set[FSTreeItem] = set()
+        """Directories whose format probe is in flight."""
 
         self._icon_provider = QFileIconProvider()
         self._loading_icon = icon(
@@ -113,21 +415,27 @@ class QFSSpecModel(QAbstractItemModel):
         )
         # print(self._loading_icon.actualSize())
 
-    def index(
-        self, row: int, column: int, parent=QModelIndex()
-    ) -> Union[QModelIndex, None]:
-        if not self.hasIndex(row, column, parent):
-            return None
+    def close(self):
+        """Stop applying listings that are still in flight. Call before discarding the model."""
+        self._closed = True
+        for loaded in self._loaded.values():
+            loaded.set_result(None)
+        self._loaded.clear()
 
-        if not parent.isValid():
-            parentItem = self._root
+    def _item(self, index: QModelIndex):
+        if not index.isValid():
+            return self._root
         else:
-            parentItem = parent.internalPointer()
+            return index.internalPointer()
 
-        childItem = parentItem.child(row)
+    def index(self, row: int, column: int, parent=QModelIndex()) -> Union[QModelIndex, None]:
+        if not self.hasIndex(row, column, parent):
+            return None
+
+        child_item = self._item(parent).child(row)
 
-        if childItem:
-            return self.createIndex(row, column, childItem)
+        if child_item:
+            return self.createIndex(row, column, child_item)
         else:
             return None
 
@@ -135,25 +443,484 @@ class QFSSpecModel(QAbstractItemModel):
         if not index.isValid():
             return None
 
-        childItem = index.internalPointer()
-        parentItem = childItem.parent
+        parent_item = index.internalPointer().parent
 
-        if parentItem != self._root:
-            return self.createIndex(parentItem.childIndex(), 0, parentItem)
+        if parent_item != self._root:
+            return self.createIndex(parent_item.childIndex(), 0, parent_item)
         else:
             return QModelIndex()
 
     def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
-        if not parent.isValid():
-            parentItem = self._root
-        else:
-            parentItem = parent.internalPointer()
-
-        return parentItem.childCount()
+        return self._item(parent).childCount()
 
     def columnCount(self, parent: QModelIndex = QModelIndex()):
         return self._root.columnCount()
 
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        item = self._item(parent)
+        if item.is_placeholder or not item.is_dir or item.is_loading:
+            return False
+
+        return not item.children_loaded or item.has_more
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        if self._start_fetch(parent):
+            self._runner.start_coroutine(self._fetch_children(self._item(parent), QPersistentModelIndex(parent)))
+
+    def _start_fetch(self, parent: QModelIndex) -> bool:
+        """Show more children of parent. Returns whether a listing has to be fetched by _fetch_children for that."""
+        if not self.canFetchMore(parent):
+            return False
+
+        item = self._item(parent)
+
+        # Entries that were listed but held back by the row cap are shown without another round trip
+        if item._pending:
+            rows, item._pending = item._pending[: self._max_rows], item._pending[self._max_rows :] or None
+            self._append_rows(parent, item, rows)
+            if item._pending or item._pages is None:
+                return False
+
+        if not item.children_loaded:
+            item._pages = iter_listing(item.fs, item.path, self._page_size)
+            item._listed = []
+
+        # Show a placeholder row until the listing lands
+        row = len(item.children)
+        self.beginInsertRows(parent, row, row)
+        item.start_loading()
+        self.endInsertRows()
+        return True
+
+    def _append_rows(self, parent: QModelIndex, item: FSTreeItem, rows: List[FSTreeItem]):
+        if item._children is None:
+            item._children = []
+
+        if not rows:
+            return
+
+        if self._file_cache is not None:
+            for row in rows:
+                row.is_cached = row.is_file and self._file_cache.contains(self._cache_key, row.path)
+
+        first = len(item._children)
+        for row, child in enumerate(rows, first):
+            child._row = row
+
+        self.beginInsertRows(parent, first, first + len(rows) - 1)
+        item._children.extend(rows)
+        self.endInsertRows()
+
+    def _show_entries(self, parent: QModelIndex, item: FSTreeItem, entries: List[dict], budget: int) -> int:
+        """Append rows for entries, holding back everything beyond budget. Returns the remaining budget."""
+        rows = item.make_children(entries)
+        rows, pending = rows[:budget], (item._pending or []) + rows[budget:]
+        item._pending = pending or None
+        self._append_rows(parent, item, rows)
+        return budget - len(rows)
+
+    def _valid_parent(self, item: FSTreeItem, parent: QPersistentModelIndex) -> Optional[QModelIndex]:
+        """Resolve parent after an await, or None if the model was closed or the item has been removed."""
+        if self._closed:
+            return None
+
+        # The root is represented by an invalid index, any other parent must still be part of the model.
+        index = QModelIndex(parent)
+        if item is not self._root and not index.isValid():
+            return None
+
+        return index
+
+    def _finish_loading(self, index: QModelIndex, item: FSTreeItem):
+        row = len(item.children)
+        self.beginRemoveRows(index, row, row)
+        item.finish_loading()
+        self.endRemoveRows()
+
+        if item._children is None:
+            item._children = []
+
+    def _reset_children(self, index: QModelIndex, item: FSTreeItem):
+        """Forget a listing that failed, so that expanding the directory again lists it from scratch."""
+        item._pages = None
+        item._pending = None
+        item._listed = None
+
+        count = len(item.children)
+        if count:
+            self.beginRemoveRows(index, 0, count - 1)
+            item._children = []
+            self.endRemoveRows()
+
+        self._finish_loading(index, item)
+        item._children = None
+
+    async def _fetch_children(self, item: FSTreeItem, parent: QPersistentModelIndex):
+        try:
+            await self._list_children(item, parent)
+        finally:
+            # Wake up reveal, also when the listing was abandoned
+            loaded = self._loaded.pop(item, None)
+            if loaded is not None:
+                loaded.set_result(None)
+
+    async def _list_children(self, item: FSTreeItem, parent: QPersistentModelIndex):
+        budget = self._max_rows
+
+        # A listing prefetched while the parent was open is shown without any round trip
+        if not item.children_loaded and self._prefetch:
+            entries = self._take_prefetched(item.path)
+            if entries is not None:
+                self.prefetch_hits += 1
+                index = self._valid_parent(item, parent)
+                if index is None:
+                    return
+
+                item._pages = None
+                item._listed = None
+                self._show_entries(index, item, entries, budget)
+                self._finish_loading(index, item)
+                self._schedule_prefetch(item)
+                return
+
+            self.prefetch_misses += 1
+
+        # Serve a cached listing instantly, revalidating it in the background if it is stale.
+        if not item.children_loaded and self._cache is not None:
+            try:
+                cached = await self._runner.run(self._cache.get, self._cache_key, item.path)
+            except Exception as e:
+                print(f"Error: {e}")
+                cached = None
+
+            if cached is not None:
+                index = self._valid_parent(item, parent)
+                if index is None:
+                    return
+
+                entries, stale = cached
+                item._pages = None
+                self._show_entries(index, item, entries, budget)
+                self._finish_loading(index, item)
+                self._schedule_prefetch(item)
+
+                if stale:
+                    self._runner.start_coroutine(self._revalidate(item, parent, entries))
+                return
+
+        while budget > 0 and item._pages is not None:
+            try:
+                page = await self._runner.run(next, item._pages, None)
+            except Exception as e:
+                print(f"Error: {e}")
+                index = self._valid_parent(item, parent)
+                if index is not None:
+                    self._reset_children(index, item)
+                return
+
+            index = self._valid_parent(item, parent)
+            if index is None:
+                return
+
+            if page is None:
+                item._pages = None
+                break
+
+            if item._listed is not None:
+                item._listed.extend(page)
+            budget = self._show_entries(index, item, page, budget)
+
+        index = self._valid_parent(item, parent)
+        if index is None:
+            return
+
+        self._finish_loading(index, item)
+        self._schedule_prefetch(item)
+
+        # Only complete listings are worth persisting
+        if item._pages is None and item._listed and self._cache is not None:
+            entries, item._listed = item._listed, None
+            item.compact()
+            try:
+                await self._runner.run(self._cache.put, self._cache_key, item.path, entries)
+            except Exception as e:
+                print(f"Error: {e}")
+
+    async def _revalidate(self, item: FSTreeItem, parent: QPersistentModelIndex, cached: List[dict]):
+        try:
+            entries = await self._runner.run(list_all, item.fs, item.path, self._page_size)
+            await self._runner.run(self._cache.put, self._cache_key, item.path, entries)
+        except Exception as e:
+            print(f"Error: {e}")
+            return
+
+        index = self._valid_parent(item, parent)
+        if index is None or item.is_loading:
+            return
+
+        if _listing_signature(entries) != _listing_signature(cached):
+            self._replace_children(index, item, entries)
+
+    def _replace_children(self, index: QModelIndex, item: FSTreeItem, entries: List[dict]):
+        count = len(item.children)
+        if count:
+            self.beginRemoveRows(index, 0, count - 1)
+            item._children = []
+            self.endRemoveRows()
+
+        item._pending = None
+        self._show_entries(index, item, entries, self._max_rows)
+
+    @property
+    def prefetch_stats(self) -> Dict[str, int]:
+        """Expansions served from prefetched listings (hits) and expansions that had to be listed (misses)."""
+        return {
+            "hits": self.prefetch_hits,
+            "misses": self.prefetch_misses,
+            "listings": len(self._prefetched),
+            "entries": self._prefetched_entries,
+        }
+
+    def _take_prefetched(self, path: str) -> Optional[List[dict]]:
+        entries = self._prefetched.pop(path, None)
+        if entries is not None:
+            self._prefetched_entries -= len(entries)
+        return entries
+
+    def _schedule_prefetch(self, item: FSTreeItem):
+        """Queue the listed subdirectories of item for prefetching, ahead of those of earlier expansions."""
+        if not self._prefetch:
+            return
+
+        directories = [
+            child
+            for child in item.children
+            if child.is_dir and not child.children_loaded and child.path not in self._prefetched
+        ]
+        self._prefetch_queue.extendleft(reversed(directories[: self._prefetch_queue.maxlen]))
+        self._pump_prefetch()
+
+    def _pump_prefetch(self):
+        while self._prefetch_queue and len(self._prefetch_running) < self._prefetch_concurrency and not self._closed:
+            item = self._prefetch_queue.popleft()
+            if item.children_loaded or item.path in self._prefetched or item.path in self._prefetch_running:
+                continue
+
+            self._prefetch_running.add(item.path)
+            self._runner.start_coroutine(self._prefetch_listing(item))
+
+    async def _prefetch_listing(self, item: FSTreeItem):
+        path = item.path
+        try:
+            entries = await self._runner.run(
+                cached_listing,
+                item.fs,
+                path,
+                self._cache,
+                self._cache_key,
+                self._page_size,
+            )
+        except Exception:
+            # Prefetching is best effort, the expansion reports the error if it happens again
+            entries = None
+        finally:
+            self._prefetch_running.discard(path)
+
+        if entries is not None and not self._closed and not item.children_loaded:
+            self._store_prefetched(path, entries)
+
+        self._pump_prefetch()
+
+    def _store_prefetched(self, path: str, entries: List[dict]):
+        if len(entries) > self._prefetch_max_entries:
+            return
+
+        self._take_prefetched(path)
+        self._prefetched[path] = entries
+        self._prefetched_entries += len(entries)
+        while self._prefetched_entries > self._prefetch_max_entries:
+            _, dropped = self._prefetched.popitem(last=False)
+            self._prefetched_entries -= len(dropped)
+
+    def request_previews(self, indices: List[QModelIndex]):
+        """Fetch header previews for the files at indices that do not have one yet, all in one concurrent batch.
+
+        Directories at indices are probed for the metadata of directory formats in a batch of their own.
+        """
+        items, persistent = [], []
+        directories, directory_indices = [], []
+        for index in indices:
+            item = index.internalPointer()
+            if item.is_placeholder:
+                continue
+
+            if item.is_dir and item.format is None:
+                # The format stays None while the probe is in flight, so the directory still opens by its suffix
+                if item not in self._probing:
+                    self._probing.add(item)
+                    directories.append(item)
+                    directory_indices.append(QPersistentModelIndex(self.createIndex(index.row(), 2, item)))
+                continue
+
+            if not item.is_file or item.preview is not None or not is_previewable(item.path):
+                continue
+
+            # An empty preview marks the request as in flight
+            item.preview = ""
+            items.append(item)
+            persistent.append(QPersistentModelIndex(self.createIndex(index.row(), 2, item)))
+
+        if items:
+            self._runner.start_coroutine(self._fetch_previews(items, persistent))
+        if directories:
+            self._runner.start_coroutine(self._fetch_formats(directories, directory_indices))
+
+    def _load_previews(self, items: List[FSTreeItem]) -> Dict[str, str]:
+        versions = {item.path: file_version(item.info) for item in items}
+        previews = {}
+        if self._cache is not None:
+            previews = self._cache.get_previews(self._cache_key, versions)
+
+        missing = [path for path in versions if path not in previews]
+        if missing:
+            fetched = read_previews(self._root.fs, missing)
+            if self._cache is not None:
+                self._cache.put_previews(self._cache_key, versions, fetched)
+            previews.update(fetched)
+
+        return previews
+
+    async def _fetch_previews(self, items: List[FSTreeItem], indices: List[QPersistentModelIndex]):
+        try:
+            previews = await self._runner.run(self._load_previews, items)
+        except Exception as e:
+            print(f"Error: {e}")
+            return
+
+        if self._closed:
+            return
+
+        for item, index in zip(items, indices, strict=True):
+            item.preview = previews.get(item.path) or ""
+            if index.isValid():
+                self.dataChanged.emit(QModelIndex(index), QModelIndex(index))
+
+    def _load_formats(self, items: List[FSTreeItem]) -> Dict[str, str]:
+        paths = [item.path for item in items]
+        formats = {}
+        if self._cache is not None:
+            formats = self._cache.get_formats(self._cache_key, paths)
+
+        missing = [path for path in paths if path not in formats]
+        if missing:
+            detected = detect_directory_formats(self._root.fs, missing)
+            if self._cache is not None:
+                self._cache.put_formats(self._cache_key, detected)
+            formats.update(detected)
+
+        return formats
+
+    async def _fetch_formats(self, items: List[FSTreeItem], indices: List[QPersistentModelIndex]):
+        try:
+            formats = await self._runner.run(self._load_formats, items)
+        except Exception as e:
+            print(f"Error: {e}")
+            formats = {}
+        finally:
+            self._probing.difference_update(items)
+
+        if self._closed:
+            return
+
+        for item, index in zip(items, indices, strict=True):
+            # Directories that could not be probed are tried again the next time they are shown
+            item.format = formats.get(item.path)
+            if index.isValid():
+                self.dataChanged.emit(QModelIndex(index), QModelIndex(index))
+
+    async def reveal(self, path: str) -> QModelIndex:
+        """Load the directories leading to path and return its index, or an invalid index if it cannot be found."""
+        root = self._root.path.rstrip("/")
+        path = path.rstrip("/")
+        if (root and not path.startswith(root + "/")) or not path[len(root) :].strip("/"):
+            return QModelIndex()
+
+        index, item = QPersistentModelIndex(), self._root
+        for name in path[len(root) :].strip("/").split("/"):
+            while True:
+                child = next((c for c in item.children if c.name == name), None)
+                if child is not None:
+                    break
+
+                parent = QModelIndex(index)
+                if item.is_loading:
+                    # Listed on behalf of the view already, wait for it to land
+                    await self._runner.run_waiting(self._loaded.setdefault(item, Future()).result)
+                elif self.canFetchMore(parent):
+                    if self._start_fetch(parent):
+                        await self._fetch_children(item, index)
+                else:
+                    return QModelIndex()
+
+                if self._closed or (item is not self._root and not index.isValid()):
+                    return QModelIndex()
+
+            item = child
+            index = QPersistentModelIndex(self.createIndex(child.childIndex(), 0, child))
+
+        return QModelIndex(index)
+
+    def update_cached(self):
+        """Re-read the cached state of all listed files from the file cache."""
+        if self._file_cache is None:
+            return
+
+        stack = [self._root]
+        while stack:
+            item = stack.pop()
+            changed = []
+            for row, child in enumerate(item.children):
+                if child.is_file:
+                    cached = self._file_cache.contains(self._cache_key, child.path)
+                    if cached != child.is_cached:
+                        child.is_cached = cached
+                        changed.append(row)
+                elif child.children_loaded:
+                    stack.append(child)
+
+            if changed:
+                first, last = min(changed), max(changed)
+                self.dataChanged.emit(
+                    self.createIndex(first, 0, item.children[first]),
+                    self.createIndex(last, 1, item.children[last]),
+                )
+
+    def refresh(self, index: QModelIndex):
+        """Drop the cached listing of a directory and list it again."""
+        item = self._item(index)
+        if item.is_placeholder or not item.is_dir or item.is_loading:
+            return
+
+        if self._cache is not None:
+            self._cache.invalidate(self._cache_key, item.path)
+        self._take_prefetched(item.path)
+        item.format = None
+
+        with suppress(Exception):
+            item.fs.invalidate_cache(item.path)
+
+        count = len(item.children)
+        if count:
+            self.beginRemoveRows(index, 0, count - 1)
+            item._children = None
+            self.endRemoveRows()
+
+        item._children = None
+        item._pages = None
+        item._pending = None
+        item._listed = []
+        self.fetchMore(index)
+
     def data(self, index: QModelIndex, role: int = ...) -> Any:
         if not index.isValid():
             return None
@@ -175,9 +942,7 @@ class QFSSpecModel(QAbstractItemModel):
                 elif item.is_cached:
                     app = QApplication.instance()
 
-                    icon = app.style().standardIcon(
-                        QStyle.StandardPixmap.SP_DialogApplyButton
-                    )
+                    icon = app.style().standardIcon(QStyle.StandardPixmap.SP_DialogApplyButton)
                     return icon
                 else:
                     return self._icon_provider.icon(QFileIconProvider.IconType.File)
@@ -185,22 +950,16 @@ class QFSSpecModel(QAbstractItemModel):
             return None
 
     def hasChildren(self, parent: QModelIndex = ...) -> bool:
-        if not parent.isValid():
-            parentItem = self._root
-        else:
-            parentItem = parent.internalPointer()
+        parent_item = self._item(parent)
 
-        return parentItem.is_dir
+        if parent_item.is_placeholder:
+            return False
+
+        return parent_item.is_dir
 
     def headerData(self, section, orientation, role=...):
-        if (
-            orientation == Qt.Orientation.Horizontal
-            and role == Qt.ItemDataRole.DisplayRole
-        ):
-            if section == 0:
-                return "Name"
-            elif section == 1:
-                return "Size"
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return {0: "Name", 1: "Size", 2: "Details"}.get(section)
 
     def flags(self, index: QModelIndex) -> Union[Qt.ItemFlag, None]:
         if not index.isValid():
@@ -208,6 +967,9 @@ class QFSSpecModel(QAbstractItemModel):
 
         item = index.internalPointer()
 
+        if item.is_placeholder:
+            return Qt.ItemFlag.ItemIsEnabled
+
         if item.is_dir:
             return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
 
@@ -0,0 +1,596 @@
+import functools
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fsspec import AbstractFileSystem
+from Qt.QtCore import QModelIndex, QObject, QPersistentModelIndex, Qt, QTimer, Signal
+from Qt.QtWidgets import (
+    QAbstractItemView,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QMenu,
+    QPushButton,
+    QStackedLayout,
+    QTreeView,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ..conn.connector import Connector
+from ..misc.file_cache import FileCache
+from ..misc.formats import is_openable_directory
+from ..misc.listing_cache import ListingCache
+from ..misc.mrc import is_mrc, read_mrc_header
+from ..misc.path_index import PathIndex, crawl
+from ..misc.search import iter_search
+from .QFSSpecModel import FSTreeItem, QFSSpecModel
+from .runner import ConnectionRunner
+from .search_model import SearchResultsModel
+from .transfers import Transfer, TransferManager
+
+
+class BrowserTab(QWidget):
+    """Browser of one connection: the remote tree, search and index, and the downloads from it."""
+
+    file_caching_finished = Signal(str)
+    file_stream_requested = Signal(FSTreeItem, object)
+    openable_directory_clicked = Signal(FSTreeItem)
+    directory_region_requested = Signal(FSTreeItem)
+    _index_progress = Signal(int, int)
+
+    def __init__(
+        self,
+        fs: AbstractFileSystem,
+        root: str,
+        connector: Connector,
+        runner: ConnectionRunner,
+        openable_suffixes: Dict[str, str] = None,
+        page_size: int = 1000,
+        max_rows: int = 5000,
+        prefetch: bool = False,
+        prefetch_concurrency: int = 4,
+        prefetch_max_entries: int = 100000,
+        listing_cache: Optional[ListingCache] = None,
+        file_cache: Optional[FileCache] = None,
+        chunk_size: int = 16 * 1024**2,
+        concurrency: int = 8,
+        max_transfers: int = 4,
+        batch_size: int = 32,
+        stream_min_size: int = 1024**3,
+        search_depth: int = 6,
+        search_concurrency: int = 16,
+        max_results: int = 10000,
+        path_index: Optional[PathIndex] = None,
+        index_max_age: float = 24 * 3600,
+        root_info: Optional[dict] = None,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent=parent)
+        self.fs = fs
+        self.root = str(root)
+        self.connector = connector
+        self.cache_key = connector.cache_key()
+        self.runner = runner
+        """Runs the blocking calls of this connection, see ConnectionRunner."""
+        self.openable_suffixes = openable_suffixes
+        self.page_size = page_size
+        self.listing_cache = listing_cache
+        self.file_cache = file_cache
+        self.stream_min_size = stream_min_size
+        """MRC files at least this large are streamed instead of cached on double click, 0 disables this."""
+        self.search_depth = search_depth
+        """Number of directory levels below the root a search descends."""
+        self.search_concurrency = search_concurrency
+        self.max_results = max_results
+        self.path_index = path_index
+        self.index_max_age = index_max_age
+        """Indexed roots are crawled again in the background on connect once their index is older than this."""
+
+        self.transfers = TransferManager(
+            file_cache,
+            runner,
+            max_transfers=max_transfers,
+            chunk_size=chunk_size,
+            concurrency=concurrency,
+            batch_size=batch_size,
+            parent=self,
+        )
+
+        self.model = QFSSpecModel(
+            fs,
+            self.root,
+            self.openable_suffixes,
+            self.runner,
+            page_size=page_size,
+            max_rows=max_rows,
+            cache=listing_cache,
+            cache_key=self.cache_key,
+            file_cache=file_cache,
+            prefetch=prefetch,
+            prefetch_concurrency=prefetch_concurrency,
+            prefetch_max_entries=prefetch_max_entries,
+            root_info=root_info,
+        )
+        self.results = None
+        self._search_cancel = None
+        self._crawl_cancel = None
+
+        self._build()
+        self._connect()
+        self._resume_crawl()
+
+    def _build(self):
+        self._layout = QVBoxLayout()
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self._layout)
+
+        # Tree View
+        self._tree_view = QTreeView(parent=self)
+        # Header previews are requested once scrolling or expanding settles
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(200)
+        self._tree_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self._tree_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+
+        # Search box
+        self._search_layout = QHBoxLayout()
+        self._search_edit = QLineEdit()
+        self._search_edit.setPlaceholderText("Search names, e.g. TS_01 or *.mrc")
+        self._search_edit.setClearButtonEnabled(True)
+        self._search_button = QPushButton("Search")
+        self._index_button = QPushButton("Index")
+        self._index_button.setToolTip("Crawl the connected root into a local index, for instant search while typing")
+        self._index_button.setEnabled(self.path_index is not None)
+        self._search_status = QLabel()
+        self._index_status = QLabel()
+        self._search_layout.addWidget(self._search_edit)
+        self._search_layout.addWidget(self._search_button)
+        self._search_layout.addWidget(self._index_button)
+
+        # Indexed roots are searched while typing, once typing pauses
+        self._index_timer = QTimer(self)
+        self._index_timer.setSingleShot(True)
+        self._index_timer.setInterval(150)
+
+        # Search results, shown instead of the tree while there is a search
+        self._results_view = QTreeView()
+        self._results_view.setRootIsDecorated(False)
+        self._results_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self._results_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+
+        self._view_layout = QStackedLayout()
+        self._view_layout.addWidget(self._tree_view)
+        self._view_layout.addWidget(self._results_view)
+
+        self._tree_view.setModel(self.model)
+        self._tree_view.resizeColumnToContents(0)
+
+        self._layout.addLayout(self._search_layout)
+        self._layout.addWidget(self._search_status)
+        self._layout.addWidget(self._index_status)
+        self._layout.addLayout(self._view_layout)
+        self._search_status.hide()
+        self._index_status.hide()
+
+    def _connect(self):
+        self.model.rowsInserted.connect(self._resize_name_column)
+        self.model.rowsInserted.connect(self._schedule_previews)
+
+        self._tree_view.expanded.connect(functools.partial(self._tree_view.resizeColumnToContents, 0))
+        self._tree_view.expanded.connect(self._schedule_previews)
+        self._tree_view.verticalScrollBar().valueChanged.connect(self._schedule_previews)
+        self._preview_timer.timeout.connect(self._request_previews)
+        self._tree_view.doubleClicked.connect(self.runner.to_sync(self._cache_file))
+        self._tree_view.customContextMenuRequested.connect(self._show_context_menu)
+
+        self._search_edit.returnPressed.connect(self._start_search)
+        self._search_edit.textChanged.connect(self._on_search_text_changed)
+        self._search_button.clicked.connect(self._on_search_clicked)
+        self._results_view.doubleClicked.connect(self.runner.to_sync(self._open_result))
+        self._results_view.customContextMenuRequested.connect(self._show_results_menu)
+        self._index_button.clicked.connect(self._toggle_index)
+        self._index_timer.timeout.connect(self._search_index)
+        self._index_progress.connect(self._on_index_progress)
+
+        self.transfers.transfer_updated.connect(self._on_transfer_updated)
+        self.transfers.transfer_finished.connect(self._on_transfer_finished)
+        self.transfers.batch_finished.connect(self._on_batch_finished)
+
+    def close_connection(self):
+        """Stop everything running for this connection and give the filesystem back to its connector."""
+        self._clear_search()
+        self._stop_crawl()
+        self.transfers.close()
+        self._tree_view.setModel(None)
+        self.model.close()
+        self.model.deleteLater()
+        self.runner.close()
+
+        # Pooled connections stay open for the next connect to the same target
+        self.connector.disconnect(self.fs)
+
+    def _show_context_menu(self, pos):
+        index = self._tree_view.indexAt(pos)
+        if self.model is None or not index.isValid():
+            return
+
+        item = index.internalPointer()
+        if item.is_placeholder:
+            return
+
+        selected = self.selected_items()
+        menu = QMenu(self._tree_view)
+
+        if item.is_dir:
+            refresh = menu.addAction("Refresh")
+            refresh.triggered.connect(functools.partial(self.model.refresh, index))
+
+        if item.is_dir and self.file_cache is not None:
+            folder = menu.addAction("Download folder")
+            folder.triggered.connect(functools.partial(self.transfers.enqueue_batch, self.fs, self.cache_key, [item]))
+
+        if item.is_dir and self.readable_directory(item):
+            region = menu.addAction("Open cropped region")
+            region.setToolTip("Open the region an open view of this image is cropped to, at the finest level that fits")
+            region.triggered.connect(functools.partial(self.directory_region_requested.emit, item))
+
+        if item.is_file and is_mrc(item.path):
+            stream = menu.addAction("Stream into ChimeraX")
+            stream.triggered.connect(functools.partial(self.runner.to_sync(self._stream_file), item))
+
+        if item.is_file and self.transfers.is_active(self.cache_key, item.path):
+            cancel = menu.addAction("Cancel download")
+            cancel.triggered.connect(functools.partial(self.transfers.cancel, self.cache_key, item.path))
+
+        if len(selected) > 1 and self.file_cache is not None:
+            batch = menu.addAction(f"Download selected ({len(selected)})")
+            batch.triggered.connect(functools.partial(self.transfers.enqueue_batch, self.fs, self.cache_key, selected))
+
+        if menu.isEmpty():
+            return
+
+        menu.exec(self._tree_view.viewport().mapToGlobal(pos))
+
+    def selected_items(self) -> List[FSTreeItem]:
+        indices = self._tree_view.selectionModel().selectedRows(0) if self.model else []
+        return [i.internalPointer() for i in indices if not i.internalPointer().is_placeholder]
+
+    def _on_batch_finished(self):
+        if self.model is not None:
+            self.model.update_cached()
+
+    def _schedule_previews(self, *args):
+        self._preview_timer.start()
+
+    def visible_indices(self) -> List[QModelIndex]:
+        viewport = self._tree_view.viewport()
+        index = self._tree_view.indexAt(viewport.rect().topLeft())
+
+        indices = []
+        while index.isValid() and self._tree_view.visualRect(index).top() < viewport.height():
+            indices.append(index)
+            index = self._tree_view.indexBelow(index)
+
+        return indices
+
+    def _request_previews(self):
+        if self.model is not None:
+            self.model.request_previews(self.visible_indices())
+
+    def _resize_name_column(self, *args):
+        self._tree_view.resizeColumnToContents(0)
+
+    def readable_directory(self, item: FSTreeItem) -> bool:
+        return is_openable_directory(item.path, item.format, self.openable_suffixes)
+
+    async def _cache_file(self, index: QModelIndex):
+        if not index.isValid():
+            return
+
+        item = index.internalPointer()
+
+        if item.is_placeholder:
+            return
+
+        if not item.is_file and not self.readable_directory(item):
+            return
+
+        if not item.is_file and self.readable_directory(item):
+            self.openable_directory_clicked.emit(item)
+            return
+
+        if self.transfers.is_active(self.cache_key, item.path):
+            return
+
+        if self.should_stream(item) and await self._stream_file(item):
+            return
+
+        if self.file_cache is None:
+            print(f"Cannot cache {item.path}, no file cache is configured.")
+            return
+
+        cached = await self.runner.run(self.file_cache.lookup, self.cache_key, item.path, item.info)
+
+        if cached is not None:
+            print(f"File already cached at {cached}")
+            item.is_cached = True
+            index.model().dataChanged.emit(index, index)
+            self.file_caching_finished.emit(cached)
+        else:
+            self.transfers.enqueue(item.fs, self.cache_key, item, QPersistentModelIndex(index))
+
+    def should_stream(self, item: FSTreeItem) -> bool:
+        if not self.stream_min_size or not is_mrc(item.path):
+            return False
+
+        return item.size >= self.stream_min_size
+
+    async def _stream_file(self, item: FSTreeItem) -> bool:
+        try:
+            header = await self.runner.run(read_mrc_header, item.fs, item.path)
+        except Exception as e:
+            print(f"Error: {e}")
+            header = None
+
+        if header is None or not header.is_xyz_ordered:
+            print(f"Cannot stream {item.path}, caching it instead.")
+            return False
+
+        self.file_stream_requested.emit(item, header)
+        return True
+
+    def _on_transfer_updated(self, transfer: Transfer):
+        if self.model is None:
+            return
+
+        index = QModelIndex(transfer.index)
+        if index.isValid():
+            # The transfer may have been started from the search results
+            index.model().dataChanged.emit(index.siblingAtColumn(0), index.siblingAtColumn(1))
+
+    def _on_search_clicked(self):
+        if self._search_cancel is not None:
+            self._search_cancel.set()
+        else:
+            self._start_search()
+
+    def _on_search_text_changed(self, text: str):
+        if not text.strip():
+            self._clear_search()
+        elif self.has_index():
+            self._index_timer.start()
+
+    def _clear_search(self):
+        if self._search_cancel is not None:
+            self._search_cancel.set()
+            self._search_cancel = None
+
+        self._results_view.setModel(None)
+        if self.results is not None:
+            self.results.deleteLater()
+            self.results = None
+
+        self._search_button.setText("Search")
+        self._search_status.hide()
+        self._view_layout.setCurrentWidget(self._tree_view)
+
+    def _show_results(self) -> SearchResultsModel:
+        self._clear_search()
+        self.results = SearchResultsModel(
+            self.fs,
+            self.root,
+            self.openable_suffixes,
+            file_cache=self.file_cache,
+            cache_key=self.cache_key,
+            parent=self,
+        )
+        self.results.rowsInserted.connect(self._resize_results_column)
+        self._results_view.setModel(self.results)
+        self._view_layout.setCurrentWidget(self._results_view)
+        self._search_status.show()
+        return self.results
+
+    def _start_search(self):
+        pattern = self._search_edit.text().strip()
+        self._clear_search()
+        if not pattern or self.fs is None:
+            return
+
+        results = self._show_results()
+        cancelled = threading.Event()
+        self._search_cancel = cancelled
+        self._search_button.setText("Cancel")
+        self._search_status.setText("Searching…")
+
+        self.runner.start_coroutine(self._search(pattern, results, cancelled))
+
+    async def _search(self, pattern: str, results: SearchResultsModel, cancelled: threading.Event):
+        matches = iter_search(
+            self.fs,
+            self.root,
+            pattern,
+            max_depth=self.search_depth,
+            concurrency=self.search_concurrency,
+            max_results=self.max_results,
+            cache=self.listing_cache,
+            key=self.cache_key,
+            page_size=self.page_size,
+            cancel=cancelled,
+            submit=self.runner.submit,
+        )
+
+        try:
+            while not cancelled.is_set():
+                page = await self.runner.run_waiting(next, matches, None)
+                if page is None or cancelled.is_set():
+                    break
+
+                results.add_results(page)
+                self._search_status.setText(f"Searching… {results.rowCount()} matches")
+        except Exception as e:
+            print(f"Error: {e}")
+        finally:
+            await self.runner.run_waiting(matches.close)
+
+        # A newer search or a disconnect has taken over
+        if self._search_cancel is not cancelled:
+            return
+
+        self._search_cancel = None
+        self._search_button.setText("Search")
+        count = results.rowCount()
+        suffix = " (cancelled)" if cancelled.is_set() else " (limit reached)" if count >= self.max_results else ""
+        self._search_status.setText(f"{count} matches{suffix}")
+
+    def _resize_results_column(self, *args):
+        self._results_view.resizeColumnToContents(0)
+
+    def has_index(self) -> bool:
+        if self.path_index is None or self.fs is None:
+            return False
+
+        return self.path_index.is_indexed(self.cache_key, self.root)
+
+    def _search_index(self):
+        pattern = self._search_edit.text().strip()
+        if not pattern or not self.has_index():
+            return
+
+        start = time.perf_counter()
+        matches = self.path_index.search(self.cache_key, self.root, pattern, limit=self.max_results)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        results = self._show_results()
+        results.add_results(matches)
+
+        crawled = self.path_index.crawled(self.cache_key, self.root)
+        if crawled is None:
+            state = "partial index"
+        else:
+            state = f"index of {time.strftime('%Y-%m-%d %H:%M', time.localtime(crawled))}"
+        self._search_status.setText(f"{len(matches)} matches in {elapsed:.0f} ms ({state}), Enter searches remotely")
+
+    def _toggle_index(self):
+        if self._crawl_cancel is not None:
+            self._stop_crawl()
+        elif self.fs is not None and self.path_index is not None:
+            self._start_crawl()
+
+    def _resume_crawl(self):
+        """Continue an interrupted crawl of the connected root, or refresh its index once it is too old."""
+        if self.path_index is None:
+            return
+
+        crawled = self.path_index.crawled(self.cache_key, self.root)
+        if self.path_index.is_interrupted(self.cache_key, self.root) or (
+            crawled is not None and time.time() - crawled > self.index_max_age
+        ):
+            self._start_crawl()
+
+    def _start_crawl(self):
+        cancelled = threading.Event()
+        self._crawl_cancel = cancelled
+        self._index_button.setText("Stop indexing")
+        self._index_status.setText(f"Indexing {self.root}…")
+        self._index_status.show()
+
+        self.runner.start_coroutine(self._crawl(self.fs, self.cache_key, self.root, cancelled))
+
+    def _stop_crawl(self):
+        if self._crawl_cancel is not None:
+            self._crawl_cancel.set()
+            self._crawl_cancel = None
+
+        self._index_button.setText("Index")
+        self._index_status.hide()
+
+    async def _crawl(self, fs, key: str, root: str, cancelled: threading.Event):
+        completed = False
+        try:
+            completed = await self.runner.run_waiting(
+                crawl,
+                fs,
+                self.path_index,
+                key,
+                root,
+                concurrency=self.search_concurrency,
+                cache=self.listing_cache,
+                page_size=self.page_size,
+                progress=self._index_progress.emit,
+                cancel=cancelled,
+                submit=self.runner.submit,
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+
+        if completed:
+            print(f"Indexed {root}")
+        else:
+            print(f"Indexing of {root} stopped, it continues on the next connection.")
+
+        # Stopped by a disconnect, or a newer crawl has taken over
+        if self._crawl_cancel is not cancelled:
+            return
+
+        self._crawl_cancel = None
+        self._index_button.setText("Index")
+        self._index_status.hide()
+
+    def _on_index_progress(self, directories: int, entries: int):
+        if self._crawl_cancel is not None:
+            self._index_status.setText(f"Indexing {self.root}… {directories} folders, {entries} entries")
+
+    def _show_results_menu(self, pos):
+        index = self._results_view.indexAt(pos)
+        if self.results is None or not index.isValid():
+            return
+
+        item = index.internalPointer()
+        menu = QMenu(self._results_view)
+
+        reveal = menu.addAction("Show in tree")
+        reveal.triggered.connect(functools.partial(self.runner.to_sync(self._show_in_tree), item))
+
+        if item.is_file and self.transfers.is_active(self.cache_key, item.path):
+            cancel = menu.addAction("Cancel download")
+            cancel.triggered.connect(functools.partial(self.transfers.cancel, self.cache_key, item.path))
+
+        menu.exec(self._results_view.viewport().mapToGlobal(pos))
+
+    async def _open_result(self, index: QModelIndex):
+        if not index.isValid():
+            return
+
+        item = index.internalPointer()
+        if item.is_dir and not self.readable_directory(item):
+            await self._show_in_tree(item)
+        else:
+            await self._cache_file(index)
+
+    async def _show_in_tree(self, item: FSTreeItem):
+        """Switch to the tree and select item, listing the directories leading to it where needed."""
+        if self.model is None:
+            return
+
+        self._view_layout.setCurrentWidget(self._tree_view)
+        index = await self.model.reveal(item.path)
+        if not index.isValid():
+            print(f"Cannot find {item.path} below {self.root}.")
+            return
+
+        ancestors = []
+        parent = index.parent()
+        while parent.isValid():
+            ancestors.append(parent)
+            parent = parent.parent()
+        for parent in reversed(ancestors):
+            self._tree_view.expand(parent)
+
+        self._tree_view.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtCenter)
+        self._tree_view.setCurrentIndex(index)
+
+    def _on_transfer_finished(self, transfer: Transfer, target: str):
+        self.file_caching_finished.emit(target)
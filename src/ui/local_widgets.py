@@ -0,0 +1,80 @@
+from typing import Optional
+
+from Qt.QtCore import QObject
+from Qt.QtWidgets import (
+    QDoubleSpinBox,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QVBoxLayout,
+    QWidget,
+)
+
+
+class LocalInput(QWidget):
+    def __init__(
+        self,
+        preferred_root: str = "",
+        preferred_latency: float = 0,
+        preferred_bandwidth: float = 0,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self._build(
+            root=preferred_root,
+            latency=preferred_latency,
+            bandwidth=preferred_bandwidth,
+        )
+
+    @property
+    def root(self):
+        return self._edit_root.text()
+
+    @property
+    def latency(self):
+        """Added delay per request in milliseconds."""
+        return self._edit_latency.value()
+
+    @property
+    def bandwidth(self):
+        """Simulated bandwidth in MB/s, 0 for unlimited."""
+        return self._edit_bandwidth.value()
+
+    def _build(self, root: str = "/", latency: float = 0, bandwidth: float = 0):
+        # Top level layout
+        self._layout = QVBoxLayout()
+        self._layout.setContentsMargins(0, 0, 0, 0)
+
+        self._upper = QHBoxLayout()
+        self._middle = QHBoxLayout()
+
+        # Labels
+        self._label_root = QLabel("Root:")
+        self._label_latency = QLabel("Latency (ms):")
+        self._label_bandwidth = QLabel("Bandwidth (MB/s):")
+
+        self._edit_root = QLineEdit(root)
+        self._edit_latency = QDoubleSpinBox()
+        self._edit_latency.setRange(0, 10000)
+        self._edit_latency.setValue(latency)
+        self._edit_bandwidth = QDoubleSpinBox()
+        self._edit_bandwidth.setRange(0, 100000)
+        self._edit_bandwidth.setValue(bandwidth)
+        self._edit_bandwidth.setSpecialValueText("Unlimited")
+
+        self._upper.addStretch()
+        self._upper.addWidget(self._label_root)
+        self._upper.addWidget(self._edit_root)
+        self._upper.addStretch()
+
+        self._middle.addStretch()
+        self._middle.addWidget(self._label_latency)
+        self._middle.addWidget(self._edit_latency)
+        self._middle.addWidget(self._label_bandwidth)
+        self._middle.addWidget(self._edit_bandwidth)
+        self._middle.addStretch()
+
+        self._layout.addLayout(self._upper)
+        self._layout.addLayout(self._middle)
+
+        self.setLayout(self._layout)
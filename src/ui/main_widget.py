@@ -1,9 +1,10 @@
 import functools
+import threading
+import time
 from typing import Dict, Optional, List
 from qt_async_threads import QtAsyncRunner
-import os
 
-from Qt.QtCore import Qt, QObject, QModelIndex, Signal
+from Qt.QtCore import QObject, QTimer, Signal
 from Qt.QtGui import QFont, QKeySequence
 from Qt.QtWidgets import (
     QWidget,
@@ -13,49 +14,151 @@ from Qt.QtWidgets import (
     QVBoxLayout,
     QSizePolicy,
     QComboBox,
-    QTreeView,
-    QLineEdit,
-    QLabel,
+    QTabWidget,
     QStackedLayout,
+    QLabel,
 )
 
 from .util import QHLine
-from ..misc.util import openable_suffixes
+from ..misc.listing_cache import ListingCache
+from ..misc.file_cache import FileCache
+from ..misc.path_index import PathIndex
+from ..misc.chunk_cache import ChunkCache
+from ..misc.metrics import IOMetrics, instrument
 from ..conn.connector import Connector
-from ..conn.sshfs_connector import SSHFSConnector
-from .sshfs_widgets import SSHFSDialog
-from .QFSSpecModel import QFSSpecModel, FSTreeItem
+from ..conn.pool import ConnectionPool
+from .QFSSpecModel import FSTreeItem, load_root_info
+from .browser_tab import BrowserTab
+from .runner import ConnectionRunner
+from .metrics_panel import MetricsPanel
 from fonticon_mdi7 import MDI7
 from superqt.fonticon import icon
 
 
+class _Attempt:
+    """A connection being set up in a worker. Once cancelled, its result is given back as soon as it arrives."""
+
+    def __init__(self, connector: Connector, key: str):
+        self.connector = connector
+        self.key = key
+        self.started = time.monotonic()
+        self.cancelled = False
+
+
 class MainWidget(QWidget):
     file_caching_finished = Signal(str)
+    file_stream_requested = Signal(FSTreeItem, object)
     openable_directory_clicked = Signal(FSTreeItem)
+    directory_region_requested = Signal(FSTreeItem)
 
     def __init__(
         self,
         fstypes: Dict[str, Connector],
-        openable_suffixes: List[str] = None,
+        openable_suffixes: Dict[str, str] = None,
+        page_size: int = 1000,
+        max_rows: int = 5000,
+        prefetch: bool = False,
+        prefetch_concurrency: int = 4,
+        prefetch_max_entries: int = 100000,
+        listing_cache: Optional[ListingCache] = None,
+        file_cache: Optional[FileCache] = None,
+        chunk_size: int = 16 * 1024**2,
+        concurrency: int = 8,
+        max_transfers: int = 4,
+        batch_size: int = 32,
+        stream_min_size: int = 1024**3,
+        search_depth: int = 6,
+        search_concurrency: int = 16,
+        max_results: int = 10000,
+        path_index: Optional[PathIndex] = None,
+        index_max_age: float = 24 * 3600,
+        connection_pool: Optional[ConnectionPool] = None,
+        check_interval: float = 60,
+        network_threads: int = 16,
+        threads_per_connection: int = 8,
+        connect_timeout: float = 30,
+        metrics: Optional[IOMetrics] = None,
+        chunk_cache: Optional[ChunkCache] = None,
         parent: Optional[QObject] = None,
     ):
         super().__init__(parent=parent)
         self.fstypes = fstypes
         self.openable_suffixes = openable_suffixes
+        self.tab_options = dict(
+            openable_suffixes=openable_suffixes,
+            page_size=page_size,
+            max_rows=max_rows,
+            prefetch=prefetch,
+            prefetch_concurrency=prefetch_concurrency,
+            prefetch_max_entries=prefetch_max_entries,
+            listing_cache=listing_cache,
+            file_cache=file_cache,
+            chunk_size=chunk_size,
+            concurrency=concurrency,
+            max_transfers=max_transfers,
+            batch_size=batch_size,
+            stream_min_size=stream_min_size,
+            search_depth=search_depth,
+            search_concurrency=search_concurrency,
+            max_results=max_results,
+            path_index=path_index,
+            index_max_age=index_max_age,
+        )
+        """Passed on to the BrowserTab of every connection."""
+        self.connection_pool = connection_pool
+        self.threads_per_connection = threads_per_connection
+        self.connect_timeout = connect_timeout
+        """Seconds until a connection that is still being set up is given up."""
+        self.metrics = metrics
+        """Records the remote I/O of every connection, None to not instrument filesystems."""
+        self.chunk_cache = chunk_cache
+        self._attempt: Optional[_Attempt] = None
 
         self.runner = QtAsyncRunner()
+        self._network_slots = threading.BoundedSemaphore(network_threads)
+        """Bounds the blocking network calls of all connections together, see ConnectionRunner."""
 
-        self.fs = None
-        self.model = None
-
-        self._build()
+        self._build(check_interval)
         self._connect()
 
     @property
     def connection_type(self):
         return self._type_combo.currentText()
 
-    def _build(self):
+    @property
+    def tabs(self) -> List[BrowserTab]:
+        return [self._tabs.widget(i) for i in range(self._tabs.count())]
+
+    @property
+    def current_tab(self) -> Optional[BrowserTab]:
+        return self._tabs.currentWidget()
+
+    def cache_stats(self) -> Dict[str, dict]:
+        """Hit statistics of the caches, for the metrics panel and its exports."""
+        stats = {}
+        if self.tab_options["listing_cache"] is not None:
+            stats["listings"] = self.tab_options["listing_cache"].stats
+        if self.tab_options["file_cache"] is not None:
+            stats["files"] = self.tab_options["file_cache"].stats
+        if self.chunk_cache is not None:
+            stats["chunks"] = self.chunk_cache.stats
+
+        prefetch = [tab.model.prefetch_stats for tab in self.tabs if tab.model is not None]
+        if prefetch:
+            hits, misses = sum(p["hits"] for p in prefetch), sum(p["misses"] for p in prefetch)
+            stats["prefetch"] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+
+        return stats
+
+    def cache_key(self, fs) -> str:
+        """The connection key of the tab browsing fs, empty if no tab does."""
+        return next((tab.cache_key for tab in self.tabs if tab.fs is fs), "")
+
+    def _build(self, check_interval: float):
         # Top level layout
         self._layout = QVBoxLayout()
         self.setLayout(self._layout)
@@ -84,6 +187,11 @@ class MainWidget(QWidget):
         self._button_layout.addWidget(self._connect_button)
         self._button_layout.addWidget(self._disconnect_button)
 
+        self._metrics_button = QPushButton("Metrics", parent=self._connectbox)
+        self._metrics_button.setCheckable(True)
+        self._metrics_button.setVisible(self.metrics is not None)
+        self._button_layout.addWidget(self._metrics_button)
+
         self._combo_layout.addWidget(self._type_combo)
         self._combo_layout.addLayout(self._button_layout)
 
@@ -95,106 +203,173 @@ class MainWidget(QWidget):
         self._input_layout.setCurrentIndex(0)
 
         # Connection Box layout
+        self._connect_status = QLabel(parent=self._connectbox)
+        self._connect_status.hide()
+
+        # Elapsed time while connecting, and the timeout
+        self._connect_clock = QTimer(self)
+        self._connect_clock.setInterval(1000)
+        self._connect_timer = QTimer(self)
+        self._connect_timer.setSingleShot(True)
+        self._connect_timer.setInterval(int(self.connect_timeout * 1000))
+
         self._box_layout.addLayout(self._combo_layout)
         self._box_layout.addLayout(self._input_layout)
+        self._box_layout.addWidget(self._connect_status)
         self._box_layout.addWidget(QHLine())
         self._connectbox.setLayout(self._box_layout)
 
-        # Tree View
-        self._tree_view = QTreeView(parent=self._connectbox)
+        # One tab per connection
+        self._tabs = QTabWidget(parent=self)
+        self._tabs.setTabsClosable(True)
+        self._tabs.setDocumentMode(True)
+
+        # Idle pooled connections are health-checked in the background
+        self._pool_timer = QTimer(self)
+        self._pool_timer.setInterval(int(check_interval * 1000))
+
+        # Remote I/O statistics, shown on demand
+        self._metrics_panel = None
+        if self.metrics is not None:
+            self._metrics_panel = MetricsPanel(self.metrics, self.cache_stats, self.runner, parent=self)
+            self._metrics_panel.hide()
 
         # Main layout
         self._layout.addWidget(self._connectbox)
-        self._layout.addWidget(self._tree_view)
+        self._layout.addWidget(self._tabs)
+        if self._metrics_panel is not None:
+            self._layout.addWidget(self._metrics_panel)
 
     def _connect(self):
-        self._connect_button.clicked.connect(self._attempt_connection)
+        self._connect_button.clicked.connect(self._on_connect_clicked)
+        self._connect_clock.timeout.connect(self._show_connect_progress)
+        self._connect_timer.timeout.connect(functools.partial(self._cancel_connection, "timed out"))
         self._disconnect_button.clicked.connect(self._disconnect)
-
-        self._tree_view.expanded.connect(
-            functools.partial(self._tree_view.resizeColumnToContents, 0)
-        )
-        self._tree_view.doubleClicked.connect(self.runner.to_sync(self._cache_file))
+        self._tabs.tabCloseRequested.connect(self._close_tab)
+        if self._metrics_panel is not None:
+            self._metrics_button.toggled.connect(self._metrics_panel.setVisible)
 
         self._type_combo.currentIndexChanged.connect(self._switch_fs)
 
+        if self.connection_pool is not None:
+            self._pool_timer.timeout.connect(self.runner.to_sync(self._check_connections))
+            self._pool_timer.start()
+
     def _switch_fs(self, index: int):
         self._input_layout.setCurrentIndex(index)
-        self._disconnect()
 
     def _disconnect(self):
-        self._tree_view.setModel(None)
-
-        if self.model:
-            self.model.deleteLater()
-            self.model = None
-
-        if self.fs:
-            del self.fs
-            self.fs = None
-
-    def _attempt_connection(self):
-        # Remove old if any
-        if self.model:
-            self._disconnect()
-
-        # try:
-        fs, root = self.fstypes[self.connection_type].connect()
-
-        if fs is None and root is None:
-            print("Connection failed.")
-            return
-
-        if fs:
-            self.fs = fs
-            self.model = QFSSpecModel(
-                fs,
-                root,
-                self.openable_suffixes,
-            )
-            self._tree_view.setModel(self.model)
-            self._tree_view.resizeColumnToContents(0)
-
-    def readable_directory(self, name: str):
-        ext = os.path.splitext(name)[1]
-        if not ext:
-            return
-
-        if ext in self.openable_suffixes:
-            return True
+        if self._tabs.count():
+            self._close_tab(self._tabs.currentIndex())
+
+    def _close_tab(self, index: int):
+        tab = self._tabs.widget(index)
+        self._tabs.removeTab(index)
+        tab.close_connection()
+        tab.deleteLater()
+
+    def shutdown(self):
+        """Close all connections, for when the tool is deleted."""
+        self._cancel_connection("cancelled")
+        while self._tabs.count():
+            self._close_tab(0)
+        self.runner.close()
+
+    def _on_connect_clicked(self):
+        # The connect button cancels while a connection is being set up
+        if self._attempt is not None:
+            self._cancel_connection("cancelled")
         else:
-            return False
-
-    async def _cache_file(self, index: QModelIndex):
-        if not index.isValid():
+            self.runner.start_coroutine(self._attempt_connection())
+
+    def _open_connection(self, connection, key: str):
+        fs, root = connection()
+        if fs is None:
+            return None, None, None
+
+        return fs, root, load_root_info(fs, str(root), self.tab_options["listing_cache"], key)
+
+    async def _attempt_connection(self):
+        connector = self.fstypes[self.connection_type]
+        # The connection target is read from the input widgets here, on the GUI thread
+        connection = connector.connection()
+        attempt = _Attempt(connector, connector.cache_key())
+        self._set_connecting(attempt)
+
+        fs, root, info, error = None, None, None, None
+        try:
+            fs, root, info = await self.runner.run(self._open_connection, connection, attempt.key)
+        except Exception as e:
+            error = e
+
+        if attempt.cancelled:
+            # The user has moved on, a late connection goes straight back to the pool
+            if fs is not None:
+                connector.disconnect(fs)
             return
 
-        item = index.internalPointer()
-
-        if not item.is_file and not self.readable_directory(item.path):
-            return
+        self._set_connecting(None)
+        if error is not None:
+            print(f"Error: {error}")
+            self._show_connect_status(f"Connection to {attempt.key} failed: {error}")
+        elif fs is None:
+            print("Connection failed.")
+            self._show_connect_status(f"Connection to {attempt.key} failed.")
+        else:
+            self._add_tab(connector, fs, root, info)
 
-        if not item.is_file and self.readable_directory(item.path):
-            self.openable_directory_clicked.emit(item)
+    def _cancel_connection(self, reason: str):
+        attempt = self._attempt
+        if attempt is None:
             return
 
-        target = "/tmp/" + item.path.lstrip("/")
-
-        if item.is_cached and os.path.exists(target):
-            print(f"File already cached at {target}")
-            self._tree_view.model().dataChanged.emit(index, index)
-            self.file_caching_finished.emit(target)
+        attempt.cancelled = True
+        self._set_connecting(None)
+        print(f"Connection to {attempt.key} {reason}.")
+        self._show_connect_status(f"Connection to {attempt.key} {reason}.")
+
+    def _set_connecting(self, attempt: Optional[_Attempt]):
+        self._attempt = attempt
+        self._type_combo.setEnabled(attempt is None)
+        self._input_layout.currentWidget().setEnabled(attempt is None)
+
+        if attempt is not None:
+            self._connect_button.setText("Cancel")
+            self._show_connect_progress()
+            self._connect_clock.start()
+            self._connect_timer.start()
         else:
-            print(f"Start Caching {item.path}")
-            item.being_fetched = True
-            self._tree_view.model().dataChanged.emit(index, index)
-
-            os.makedirs(os.path.dirname(target), exist_ok=True)
-            await self.runner.run(item.fs.get_file, *(item.path, target))
-
-            item.being_fetched = False
-            item.is_cached = True
-            self._tree_view.model().dataChanged.emit(index, index)
-
-            self.file_caching_finished.emit(target)
-            print(f"Cached file to {target}")
+            self._connect_button.setText("Connect")
+            self._connect_status.hide()
+            self._connect_clock.stop()
+            self._connect_timer.stop()
+
+    def _show_connect_progress(self):
+        if self._attempt is not None:
+            elapsed = int(time.monotonic() - self._attempt.started)
+            self._show_connect_status(f"Connecting to {self._attempt.key}… {elapsed} s")
+
+    def _show_connect_status(self, text: str):
+        self._connect_status.setText(text)
+        self._connect_status.show()
+
+    def _add_tab(self, connector: Connector, fs, root: str, root_info: Optional[dict] = None):
+        runner = ConnectionRunner(self._network_slots, max_threads=self.threads_per_connection)
+        if self.metrics is not None:
+            instrument(fs, self.metrics, connector.cache_key())
+        connector.on_connect(fs, root)
+        tab = BrowserTab(fs, root, connector, runner, root_info=root_info, parent=self._tabs, **self.tab_options)
+        tab.file_caching_finished.connect(self.file_caching_finished)
+        tab.file_stream_requested.connect(self.file_stream_requested)
+        tab.openable_directory_clicked.connect(self.openable_directory_clicked)
+        tab.directory_region_requested.connect(self.directory_region_requested)
+
+        index = self._tabs.addTab(tab, f"{connector.FS_TYPE}: {tab.root}")
+        self._tabs.setTabToolTip(index, f"{tab.cache_key} {tab.root}")
+        self._tabs.setCurrentIndex(index)
+
+    async def _check_connections(self):
+        try:
+            await self.runner.run(self.connection_pool.check)
+        except Exception as e:
+            print(f"Error: {e}")
@@ -0,0 +1,142 @@
+from typing import Callable, Dict, Optional
+
+from Qt.QtCore import QObject, QTimer
+from Qt.QtWidgets import (
+    QFileDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+from qt_async_threads import QtAsyncRunner
+
+from ..misc.metrics import IOMetrics
+from ..misc.util import file_size
+
+_COLUMNS = ("Connection", "Operation", "Count", "Errors", "Bytes", "Mean ms", "p50 ms", "p95 ms")
+
+
+def _number(value: Optional[float]) -> str:
+    return "" if value is None else f"{value:.3g}"
+
+
+class MetricsPanel(QWidget):
+    """Remote I/O statistics per connection and operation, and the hit rates of the caches, refreshed while shown.
+
+    Cache statistics can take a query of a cache database, they are gathered on a thread of runner.
+    """
+
+    def __init__(
+        self,
+        metrics: IOMetrics,
+        cache_stats: Callable[[], Dict[str, dict]],
+        runner: QtAsyncRunner,
+        interval: float = 2,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self.metrics = metrics
+        self.cache_stats = cache_stats
+        self.runner = runner
+        self._refreshing = False
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(interval * 1000))
+        self._build()
+        self._connect()
+
+    def _build(self):
+        self._layout = QVBoxLayout()
+        self._layout.setContentsMargins(0, 0, 0, 0)
+
+        self._table = QTableWidget(0, len(_COLUMNS), parent=self)
+        self._table.setHorizontalHeaderLabels(_COLUMNS)
+        self._table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self._table.verticalHeader().hide()
+        self._table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+
+        self._caches = QLabel(parent=self)
+        self._caches.setWordWrap(True)
+
+        self._buttons = QHBoxLayout()
+        self._json_button = QPushButton("Export JSON", parent=self)
+        self._csv_button = QPushButton("Export CSV", parent=self)
+        self._reset_button = QPushButton("Reset", parent=self)
+        self._buttons.addWidget(self._json_button)
+        self._buttons.addWidget(self._csv_button)
+        self._buttons.addStretch()
+        self._buttons.addWidget(self._reset_button)
+
+        self._layout.addWidget(self._table)
+        self._layout.addWidget(self._caches)
+        self._layout.addLayout(self._buttons)
+        self.setLayout(self._layout)
+
+    def _connect(self):
+        self._timer.timeout.connect(self.refresh)
+        self._json_button.clicked.connect(lambda: self._export("JSON files (*.json)", self.metrics.to_json))
+        self._csv_button.clicked.connect(lambda: self._export("CSV files (*.csv)", self.metrics.to_csv))
+        self._reset_button.clicked.connect(self._reset)
+
+    def showEvent(self, event):
+        self.refresh()
+        self._timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        # A refresh still waiting for the cache statistics covers this one
+        if not self._refreshing:
+            self._refreshing = True
+            self.runner.start_coroutine(self._refresh())
+
+    async def _refresh(self):
+        try:
+            cache_stats = await self.runner.run(self.cache_stats)
+        except Exception as e:
+            print(f"Error: {e}")
+            cache_stats = {}
+        finally:
+            self._refreshing = False
+
+        rows = self.metrics.rows()
+        self._table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            values = (
+                row["connection"],
+                row["operation"],
+                str(row["count"]),
+                str(row["errors"]),
+                file_size(row["bytes"]),
+                _number(row["mean_ms"]),
+                _number(row["p50_ms"]),
+                _number(row["p95_ms"]),
+            )
+            for j, value in enumerate(values):
+                self._table.setItem(i, j, QTableWidgetItem(value))
+
+        self._caches.setText(
+            " · ".join(f"{name}: {stats.get('hit_rate', 0):.0%} hits" for name, stats in cache_stats.items()),
+        )
+
+    def _export(self, filter: str, render: Callable[[Dict[str, dict]], str]):
+        path, _ = QFileDialog.getSaveFileName(self, "Export metrics", "", filter)
+        if not path:
+            return
+
+        try:
+            with open(path, "w", newline="") as f:
+                f.write(render(self.cache_stats()))
+        except OSError as e:
+            print(f"Error: {e}")
+
+    def _reset(self):
+        self.metrics.reset()
+        self.refresh()
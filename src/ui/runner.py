@@ -0,0 +1,42 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from qt_async_threads import QtAsyncRunner
+
+
+class ConnectionRunner(QtAsyncRunner):
+    """Runner of one connection, whose blocking calls draw from network slots shared by all connections.
+
+    Calls run on max_threads workers of the connection, each holding one of the slots while it runs. The slots bound
+    the network work of all connections together, and a slow host never holds more than max_threads of them, so the
+    other connections keep going. The threads of the runner itself only wait for the workers, or for calls that fan
+    out to them through submit, like searches and crawls.
+    """
+
+    def __init__(self, slots: threading.BoundedSemaphore, max_threads: int = 8):
+        super().__init__(max_threads=2 * max_threads)
+        self._slots = slots
+        self._workers = ThreadPoolExecutor(max_workers=max_threads)
+
+    async def run(self, func, *args, **kwargs):
+        return await super().run(self.call, func, *args, **kwargs)
+
+    async def run_waiting(self, func, *args, **kwargs):
+        """Run func off the GUI thread without taking a slot, for calls that only wait on work passed to submit."""
+        return await super().run(func, *args, **kwargs)
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        """Run func on a worker of the connection, in one of the slots. Can be called from any thread."""
+        return self._workers.submit(self._in_slot, func, *args, **kwargs)
+
+    def call(self, func, *args, **kwargs):
+        """Run func on a worker of the connection, in one of the slots, and wait for its result. Blocking."""
+        return self.submit(func, *args, **kwargs).result()
+
+    def close(self):
+        self._workers.shutdown(wait=False, cancel_futures=True)
+        super().close()
+
+    def _in_slot(self, func, *args, **kwargs):
+        with self._slots:
+            return func(*args, **kwargs)
@@ -0,0 +1,116 @@
+from typing import Any, Dict, List, Optional, Union
+
+from fsspec import AbstractFileSystem
+from Qt.QtCore import QAbstractItemModel, QModelIndex, Qt
+from Qt.QtWidgets import QApplication, QFileIconProvider, QStyle
+
+from ..misc.file_cache import FileCache
+from .QFSSpecModel import FSRootItem, FSTreeItem
+
+_TOP_LEVEL = QModelIndex()
+"""The invalid index Qt uses as the parent of the top level rows."""
+
+
+class SearchResultsModel(QAbstractItemModel):
+    """Flat list of search matches below a root path, filled while the search is running.
+
+    Matches are regular tree nodes hanging off a root of their own, so they can be opened, cached and streamed just
+    like the nodes of the tree.
+    """
+
+    def __init__(
+        self,
+        fs: AbstractFileSystem,
+        root_path: str,
+        openable_types: Dict[str, str],
+        file_cache: Optional[FileCache] = None,
+        cache_key: str = "",
+        parent=None,
+    ):
+        super().__init__(parent)
+        self._root = FSRootItem(fs, root_path, info={"type": "directory"})
+        self._root._children = []
+        self._openable_types = openable_types
+        self._file_cache = file_cache
+        self._cache_key = cache_key
+        self._icon_provider = QFileIconProvider()
+
+    @property
+    def results(self) -> List[FSTreeItem]:
+        return self._root.children
+
+    def add_results(self, entries: List[dict]):
+        rows = [FSTreeItem.from_info(entry, self._root) for entry in entries]
+        if not rows:
+            return
+
+        first = len(self.results)
+        for row, item in enumerate(rows, first):
+            item._row = row
+            if self._file_cache is not None:
+                item.is_cached = item.is_file and self._file_cache.contains(self._cache_key, item.path)
+
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.results.extend(rows)
+        self.endInsertRows()
+
+    def location(self, item: FSTreeItem) -> str:
+        """The directory of a match, relative to the search root."""
+        root = self._root.path.rstrip("/")
+        dirname = item._dirname
+        return dirname[len(root) :].lstrip("/") if dirname.startswith(root) else dirname
+
+    def index(self, row: int, column: int, parent: QModelIndex = _TOP_LEVEL) -> Union[QModelIndex, None]:
+        if parent.isValid() or not self.hasIndex(row, column, parent):
+            return QModelIndex()
+
+        return self.createIndex(row, column, self.results[row])
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        return QModelIndex()
+
+    def rowCount(self, parent: QModelIndex = _TOP_LEVEL) -> int:
+        return 0 if parent.isValid() else len(self.results)
+
+    def columnCount(self, parent: QModelIndex = _TOP_LEVEL) -> int:
+        return 3
+
+    def hasChildren(self, parent: QModelIndex = _TOP_LEVEL) -> bool:
+        return not parent.isValid()
+
+    def data(self, index: QModelIndex, role: int = ...) -> Any:
+        if not index.isValid():
+            return None
+
+        item = index.internalPointer()
+
+        if role == 0:
+            if index.column() == 2:
+                return self.location(item)
+            return item.data(index.column())
+
+        if role == 1 and index.column() == 0:
+            if item.is_dir:
+                return self._icon_provider.icon(QFileIconProvider.IconType.Folder)
+            elif item.being_fetched:
+                return QApplication.instance().style().standardIcon(QStyle.StandardPixmap.SP_ArrowDown)
+            elif item.is_cached:
+                return QApplication.instance().style().standardIcon(QStyle.StandardPixmap.SP_DialogApplyButton)
+            else:
+                return self._icon_provider.icon(QFileIconProvider.IconType.File)
+
+        return None
+
+    def headerData(self, section, orientation, role=...):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return ("Name", "Size", "Location")[section]
+
+    def flags(self, index: QModelIndex) -> Union[Qt.ItemFlag, None]:
+        if not index.isValid():
+            return None
+
+        item = index.internalPointer()
+        if item.is_dir or item.extension in self._openable_types:
+            return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        else:
+            return Qt.ItemFlag.ItemIsSelectable
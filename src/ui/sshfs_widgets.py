@@ -100,6 +100,7 @@ class SSHFSInput(QWidget):
         preferred_host: str = "",
         preferred_port: int = 22,
         preferred_root: str = "",
+        preferred_key: str = "",
         parent: Optional[QObject] = None,
     ):
         super().__init__(parent)
@@ -108,6 +109,7 @@ class SSHFSInput(QWidget):
             host=preferred_host,
             port=preferred_port,
             root=preferred_root,
+            key=preferred_key,
         )
 
     @property
@@ -137,10 +139,15 @@ class SSHFSInput(QWidget):
     def kbint_responses(self):
         return self._edit_kbint.text()
 
+    @property
+    def key(self):
+        return self._edit_key.text()
+
     def clear(self):
         self._edit_pw.clear()
+        self._edit_kbint.clear()
 
-    def _build(self, user: str = "", host: str = "", port: int = 22, root: str = "/"):
+    def _build(self, user: str = "", host: str = "", port: int = 22, root: str = "/", key: str = ""):
         # Top level layout
         self._layout = QVBoxLayout()
         self._layout.setContentsMargins(0, 0, 0, 0)
@@ -156,6 +163,7 @@ class SSHFSInput(QWidget):
         self._label_root = QLabel("Root:")
         self._label_pw = QLabel("Password:")
         self._label_kbint = QLabel("KB int.:")
+        self._label_key = QLabel("Key:")
 
         self._edit_user = QLineEdit(user)
         self._edit_host = QLineEdit(host)
@@ -164,6 +172,11 @@ class SSHFSInput(QWidget):
         self._edit_pw = QLineEdit()
         self._edit_pw.setEchoMode(QLineEdit.EchoMode.Password)
         self._edit_kbint = QLineEdit()
+        self._edit_kbint.setEchoMode(QLineEdit.EchoMode.Password)
+        self._edit_kbint.setToolTip("Responses to keyboard-interactive prompts other than the password, comma-separated")
+        self._edit_key = QLineEdit(key)
+        self._edit_key.setPlaceholderText("~/.ssh/id_ed25519")
+        self._edit_key.setToolTip("Private key file, empty for the SSH agent and the default keys")
 
         self._upper.addStretch()
         self._upper.addWidget(self._label_user)
@@ -177,6 +190,8 @@ class SSHFSInput(QWidget):
         self._middle.addStretch()
         self._middle.addWidget(self._label_root)
         self._middle.addWidget(self._edit_root)
+        self._middle.addWidget(self._label_key)
+        self._middle.addWidget(self._edit_key)
         self._middle.addStretch()
 
         self._lower.addStretch()
@@ -0,0 +1,214 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fsspec import AbstractFileSystem
+from Qt.QtCore import QObject, QPersistentModelIndex, QTimer, Signal
+
+from ..misc.file_cache import FileCache
+from ..misc.transfer import TransferCancelledError, download, fetch_batch, plan_batch, supports_ranges
+from ..misc.util import file_size
+from .QFSSpecModel import FSTreeItem
+from .runner import ConnectionRunner
+
+
+class Transfer:
+    """A single file download, as tracked by the TransferManager."""
+
+    def __init__(self, fs: AbstractFileSystem, key: str, item: FSTreeItem, index: QPersistentModelIndex):
+        self.fs = fs
+        self.key = key
+        self.item = item
+        self.index = index
+        self.path = item.path
+        self.info = item.info
+        self.size = item.size
+        self.done = 0
+        self.cancelled = threading.Event()
+
+    def add_progress(self, nbytes: int):
+        # Called from worker threads, only ever read by the GUI thread.
+        self.done += nbytes
+        self.item.fetched_bytes = self.done
+
+
+class TransferManager(QObject):
+    """Queue of downloads into the file cache, running at most max_transfers at a time.
+
+    Downloads run on the runner of their connection, so they share its network slots with listings and previews.
+    """
+
+    transfer_updated = Signal(object)
+    """Emitted with the Transfer when it starts, makes progress or ends."""
+    transfer_finished = Signal(object, str)
+    """Emitted with the Transfer and the local path once a download has been committed to the cache."""
+    batch_finished = Signal()
+    """Emitted when a batch download ends, successful or not."""
+
+    def __init__(
+        self,
+        file_cache: FileCache,
+        runner: ConnectionRunner,
+        max_transfers: int = 4,
+        chunk_size: int = 16 * 1024**2,
+        concurrency: int = 8,
+        batch_size: int = 32,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self.file_cache = file_cache
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+
+        self.runner = runner
+        self.max_transfers = max_transfers
+        self._active: Dict[Tuple[str, str], Transfer] = {}
+        self._queued: Deque[Transfer] = deque()
+        self._running = 0
+        self._batches: List[threading.Event] = []
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(250)
+        self._timer.timeout.connect(self._report_progress)
+
+    def is_active(self, key: str, path: str) -> bool:
+        return (key, path) in self._active
+
+    def enqueue(self, fs: AbstractFileSystem, key: str, item: FSTreeItem, index: QPersistentModelIndex):
+        if self.is_active(key, item.path):
+            return
+
+        transfer = Transfer(fs, key, item, index)
+        self._active[(key, item.path)] = transfer
+
+        item.being_fetched = True
+        item.fetched_bytes = 0
+        self.transfer_updated.emit(transfer)
+        self._timer.start()
+
+        self._queued.append(transfer)
+        self._start_queued()
+
+    def _start_queued(self):
+        while self._queued and self._running < self.max_transfers:
+            self._running += 1
+            self.runner.start_coroutine(self._run(self._queued.popleft()))
+
+    def cancel(self, key: str, path: str):
+        transfer = self._active.get((key, path))
+        if transfer is not None:
+            transfer.cancelled.set()
+
+    def cancel_all(self):
+        for transfer in self._active.values():
+            transfer.cancelled.set()
+        for cancelled in self._batches:
+            cancelled.set()
+
+    def enqueue_batch(self, fs: AbstractFileSystem, key: str, items: List[FSTreeItem]):
+        """Fetch the selected files and everything below the selected directories into the cache."""
+        files = {item.path: item.info for item in items if item.is_file}
+        directories = [item.path for item in items if item.is_dir]
+
+        cancelled = threading.Event()
+        self._batches.append(cancelled)
+        self.runner.start_coroutine(self._run_batch(fs, key, files, directories, cancelled))
+
+    async def _run_batch(
+        self,
+        fs: AbstractFileSystem,
+        key: str,
+        files: Dict[str, dict],
+        directories: List[str],
+        cancelled: threading.Event,
+    ):
+        try:
+            planned = await self.runner.run(plan_batch, fs, files, directories)
+            total = sum(info.get("size", 0) for info in planned.values())
+            print(f"Start Caching {len(planned)} files ({file_size(total)})")
+
+            count, nbytes, elapsed = await self.runner.run(
+                fetch_batch,
+                fs,
+                self.file_cache,
+                key,
+                planned,
+                batch_size=self.batch_size,
+                cancel=cancelled,
+            )
+        except TransferCancelledError as e:
+            print(f"Cancelled caching {e}")
+        except Exception as e:
+            print(f"Error: {e}")
+        else:
+            elapsed = max(elapsed, 1e-6)
+            print(
+                f"Cached {count} files ({file_size(nbytes)}) in {elapsed:.1f} s: "
+                f"{file_size(int(nbytes / elapsed))}/s, {count / elapsed:.1f} files/s",
+            )
+        finally:
+            self._batches.remove(cancelled)
+            self.batch_finished.emit()
+
+    def _download(self, transfer: Transfer, submit=None) -> str:
+        if transfer.cancelled.is_set():
+            raise TransferCancelledError(transfer.path)
+
+        # The partial file is kept on failure or cancellation, the next attempt resumes from it.
+        partial = self.file_cache.partial(transfer.key, transfer.path, transfer.info)
+        self.file_cache.reserve(transfer.size)
+        download(
+            transfer.fs,
+            transfer.path,
+            partial,
+            transfer.size,
+            chunk_size=self.chunk_size,
+            concurrency=self.concurrency,
+            progress=transfer.add_progress,
+            cancel=transfer.cancelled,
+            submit=submit,
+        )
+        return self.file_cache.commit(transfer.key, transfer.path, transfer.info, partial)
+
+    async def _run(self, transfer: Transfer):
+        print(f"Start Caching {transfer.path}")
+        target = None
+        try:
+            if supports_ranges(transfer.fs):
+                # The ranges are fetched on the event loop of the filesystem, the download holds one slot
+                target = await self.runner.run(self._download, transfer)
+            else:
+                # Every range takes a slot of its own while it is fetched
+                target = await self.runner.run_waiting(self._download, transfer, self.runner.submit)
+        except TransferCancelledError:
+            print(f"Cancelled caching {transfer.path}")
+        except Exception as e:
+            print(f"Error: {e}")
+
+        self._running -= 1
+        self._start_queued()
+
+        del self._active[(transfer.key, transfer.path)]
+        if not self._active:
+            self._timer.stop()
+
+        transfer.item.being_fetched = False
+        if target is not None:
+            transfer.item.is_cached = True
+        self.transfer_updated.emit(transfer)
+
+        if target is not None:
+            print(f"Cached file to {target}")
+            self.transfer_finished.emit(transfer, target)
+
+    def _report_progress(self):
+        for transfer in self._active.values():
+            self.transfer_updated.emit(transfer)
+
+    def close(self):
+        """Cancel all transfers. Queued transfers never start, running ones end before the connection's runner closes."""
+        for transfer in self._queued:
+            del self._active[(transfer.key, transfer.path)]
+        self._queued.clear()
+        self.cancel_all()
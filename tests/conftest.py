@@ -0,0 +1,53 @@
+import os
+import time
+from collections import Counter
+
+import pytest
+from fsspec.implementations.memory import MemoryFileSystem
+
+
+class CountingFileSystem(MemoryFileSystem):
+    """In-memory filesystem that counts listing and info calls, with a store of its own."""
+
+    protocol = "countingmemory"
+    cachable = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store = {}
+        self.pseudo_dirs = [""]
+        self.calls = Counter()
+
+    def ls(self, path, detail=True, **kwargs):
+        self.calls["ls"] += 1
+        return super().ls(path, detail=detail, **kwargs)
+
+    def info(self, path, **kwargs):
+        self.calls["info"] += 1
+        return super().info(path, **kwargs)
+
+
+@pytest.fixture
+def memfs():
+    return CountingFileSystem()
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from Qt.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def wait(qapp):
+    """Process Qt events until condition() holds or timeout seconds have passed."""
+
+    def wait(condition, timeout: float = 5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            qapp.processEvents()
+            time.sleep(0.01)
+
+    return wait
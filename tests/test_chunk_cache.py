@@ -0,0 +1,94 @@
+import sqlite3
+from types import SimpleNamespace
+
+from chimerax.RemoteBrowser.misc import chunk_cache
+from chimerax.RemoteBrowser.misc.chunk_cache import ChunkCache
+
+URL = "memory:/image.zarr"
+
+
+def _chunks(n: int, size: int = 100):
+    return {f"0/0.0.{i}": bytes([i]) * size for i in range(n)}
+
+
+def test_memory_evicts_least_recently_used():
+    cache = ChunkCache(None, memory_bytes=300)
+    cache.put_many(URL, _chunks(3), "v1")
+
+    # Using the first chunk makes the second the oldest
+    assert cache.get_many(URL, ["0/0.0.0"], "v1")
+    cache.put_many(URL, {"0/0.0.3": b"x" * 100}, "v1")
+
+    assert set(cache.get_many(URL, list(_chunks(4)), "v1")) == {"0/0.0.0", "0/0.0.2", "0/0.0.3"}
+    assert cache.stats["memory_bytes"] == 300
+
+    # Chunks larger than the memory tier are not kept
+    cache.put_many(URL, {"0/1.0.0": b"x" * 400}, "v1")
+    assert not cache.get_many(URL, ["0/1.0.0"], "v1")
+
+
+def test_disk_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "chunks.sqlite")
+    cache = ChunkCache(path, memory_bytes=0, disk_bytes=250)
+    cache.put_many(URL, _chunks(2), "v1")
+    cache.put_many(URL, {"0/0.0.2": b"x" * 100}, "v1")
+
+    assert cache.stats["disk_bytes"] == 200
+    assert set(cache.get_many(URL, list(_chunks(3)), "v1")) == {"0/0.0.1", "0/0.0.2"}
+    cache.close()
+
+    # The disk tier outlives the session, and its size is known again
+    reopened = ChunkCache(path, memory_bytes=0, disk_bytes=250)
+    assert reopened.stats["disk_bytes"] == 200
+    assert set(reopened.get_many(URL, list(_chunks(3)), "v1")) == {"0/0.0.1", "0/0.0.2"}
+    assert reopened.disk_hits == 2
+    reopened.close()
+
+
+def test_chunks_of_another_version_are_not_served(tmp_path):
+    cache = ChunkCache(str(tmp_path / "chunks.sqlite"))
+    cache.put_many(URL, _chunks(2), "v1")
+
+    assert not cache.get_many(URL, list(_chunks(2)), "v2")
+    assert cache.misses == 2
+    cache.close()
+
+
+def test_chunks_expire_after_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(chunk_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    memory = ChunkCache(None, ttl=60)
+    disk = ChunkCache(str(tmp_path / "chunks.sqlite"), memory_bytes=0, ttl=60)
+    for cache in (memory, disk):
+        cache.put_many(URL, _chunks(2), "v1")
+
+    now[0] += 60
+    for cache in (memory, disk):
+        assert len(cache.get_many(URL, list(_chunks(2)), "v1")) == 2
+
+    # Expired chunks are fetched again, which dates them anew
+    now[0] += 1
+    for cache in (memory, disk):
+        assert not cache.get_many(URL, list(_chunks(2)), "v1")
+        cache.put_many(URL, _chunks(1), "v1")
+        assert set(cache.get_many(URL, list(_chunks(2)), "v1")) == {"0/0.0.0"}
+    disk.close()
+
+
+def test_undated_chunks_are_dropped(tmp_path):
+    path = str(tmp_path / "chunks.sqlite")
+    db = sqlite3.connect(path)
+    with db:
+        db.execute(
+            "CREATE TABLE chunks (url TEXT, key TEXT, version TEXT, data BLOB, size INTEGER, used REAL, "
+            "PRIMARY KEY (url, key, version))",
+        )
+        db.execute("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?)", (URL, "0/0.0.0", "v1", b"x" * 100, 100, 0))
+    db.close()
+
+    cache = ChunkCache(path)
+    assert cache.stats["disk_bytes"] == 0
+    assert not cache.get_many(URL, ["0/0.0.0"], "v1")
+    cache.put_many(URL, _chunks(1), "v1")
+    assert cache.get_many(URL, ["0/0.0.0"], "v1")
+    cache.close()
@@ -0,0 +1,66 @@
+import threading
+
+from chimerax.RemoteBrowser.conn.local_connector import MemoryConnector
+from chimerax.RemoteBrowser.ui.main_widget import MainWidget
+
+
+class _BlockingConnector(MemoryConnector):
+    """Connects only once release is set, like a host that does not answer."""
+
+    def __init__(self):
+        super().__init__(preferred_root="/connect", depth=0, files=1, file_size=16, large_file_size=256)
+        self.release = threading.Event()
+        self.given_back = []
+
+    def create_fs(self):
+        self.release.wait(10)
+        return super().create_fs()
+
+    def disconnect(self, fs):
+        self.given_back.append(fs)
+        super().disconnect(fs)
+
+
+def _connect(wait, **kwargs):
+    connector = _BlockingConnector()
+    widget = MainWidget({"memory": connector}, **kwargs)
+    widget._on_connect_clicked()
+    wait(lambda: widget._attempt is not None)
+    assert widget._connect_button.text() == "Cancel"
+    return connector, widget
+
+
+def test_connect_times_out(wait):
+    connector, widget = _connect(wait, connect_timeout=0.2)
+
+    wait(lambda: widget._attempt is None)
+    assert "timed out" in widget._connect_status.text()
+    assert widget._connect_button.text() == "Connect"
+
+    # The connection that arrives after the timeout is given back instead of opening a tab
+    connector.release.set()
+    wait(lambda: connector.given_back)
+    assert len(connector.given_back) == 1
+    assert not widget.tabs
+
+    widget.shutdown()
+
+
+def test_cancelled_connection_is_discarded(wait):
+    connector, widget = _connect(wait)
+
+    widget._on_connect_clicked()
+    assert widget._attempt is None
+    assert "cancelled" in widget._connect_status.text()
+
+    connector.release.set()
+    wait(lambda: connector.given_back)
+    assert not widget.tabs
+
+    # The next attempt connects normally
+    widget._on_connect_clicked()
+    wait(lambda: widget.tabs)
+    assert len(widget.tabs) == 1
+    assert len(connector.given_back) == 1
+
+    widget.shutdown()
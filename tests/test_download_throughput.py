@@ -0,0 +1,58 @@
+"""Download throughput of misc.transfer.download by concurrency, over a throttled in-memory filesystem.
+
+Run directly with the Python of ChimeraX for the full benchmark, by default on a 256 MB file:
+    chimerax -m tests.test_download_throughput [MB] [latency in ms] [bandwidth in MB/s]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from chimerax.RemoteBrowser.conn.local_connector import ThrottledFileSystem
+from chimerax.RemoteBrowser.misc.transfer import download
+from fsspec.implementations.memory import MemoryFileSystem
+
+CONCURRENCY = (1, 2, 4, 8, 16)
+
+
+def megabytes_per_second(fs, path: str, size: int, chunk_size: int, concurrency: int, directory: str) -> float:
+    """Download path once and return the throughput in MB/s. The partial file is removed afterwards."""
+    target = os.path.join(directory, f"download_{concurrency}")
+    start = time.perf_counter()
+    download(fs, path, target, size, chunk_size=chunk_size, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+
+    with open(target, "rb") as f:
+        assert f.read() == fs.cat_file(path)
+    os.remove(target)
+    return size / 1024**2 / elapsed
+
+
+def _throttled(size: int, latency: float, bandwidth: float = 0) -> ThrottledFileSystem:
+    memory = MemoryFileSystem()
+    memory.store = {}
+    memory.pipe_file("/data/large.bin", bytes(range(256)) * (size // 256))
+    return ThrottledFileSystem(memory, latency=latency, bandwidth=bandwidth)
+
+
+def test_concurrent_ranges_hide_latency(tmp_path):
+    size = 8 * 1024**2
+    fs = _throttled(size, latency=0.02)
+
+    sequential = megabytes_per_second(fs, "/data/large.bin", size, 512 * 1024, 1, str(tmp_path))
+    concurrent = megabytes_per_second(fs, "/data/large.bin", size, 512 * 1024, 8, str(tmp_path))
+
+    assert concurrent >= 3 * sequential
+
+
+if __name__ == "__main__":
+    size = (int(sys.argv[1]) if len(sys.argv) > 1 else 256) * 1024**2
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    bandwidth = float(sys.argv[3]) * 1024**2 if len(sys.argv) > 3 else 0
+    fs = _throttled(size, latency, bandwidth)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for concurrency in CONCURRENCY:
+            rate = megabytes_per_second(fs, "/data/large.bin", size, 4 * 1024**2, concurrency, directory)
+            print(f"{size // 1024**2} MB, {latency * 1000:.0f} ms latency, concurrency {concurrency}: {rate:.1f} MB/s")
@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+
+import pytest
+from chimerax.RemoteBrowser.misc.file_cache import file_version
+from chimerax.RemoteBrowser.ui.QFSSpecModel import FSTreeItem
+
+MODIFIED = datetime(2024, 5, 17, 9, 30, 12, 345678, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "info",
+    [
+        # sshfs
+        {"name": "/data/map.mrc", "type": "file", "size": 1024, "mtime": MODIFIED},
+        # local
+        {"name": "/data/map.mrc", "type": "file", "size": 1024, "mtime": MODIFIED.timestamp(), "created": 1.5},
+        # memory
+        {"name": "/data/map.mrc", "type": "file", "size": 1024, "created": MODIFIED},
+        # s3fs
+        {"name": "bucket/map.mrc", "type": "file", "size": 1024, "ETag": '"0A1B2C3D"', "LastModified": MODIFIED},
+    ],
+)
+def test_tree_and_listing_agree_on_version(info):
+    assert file_version(FSTreeItem.from_info(info).info) == file_version(info)
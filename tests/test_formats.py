@@ -0,0 +1,46 @@
+import json
+import threading
+
+from chimerax.RemoteBrowser.misc.formats import is_openable_directory
+from chimerax.RemoteBrowser.misc.listing_cache import ListingCache
+from chimerax.RemoteBrowser.ui.QFSSpecModel import QFSSpecModel
+from chimerax.RemoteBrowser.ui.runner import ConnectionRunner
+from Qt.QtCore import QModelIndex
+
+SUFFIXES = {".zarr": "OME-Zarr"}
+
+
+def test_directory_opens_while_probed(wait, memfs):
+    memfs.pipe_file("/data/image.zarr/.zattrs", json.dumps({"multiscales": [{"datasets": []}]}).encode())
+    runner = ConnectionRunner(threading.BoundedSemaphore(4), max_threads=2)
+    root = {"name": "/data", "type": "directory", "size": 0}
+    model = QFSSpecModel(memfs, "/data", SUFFIXES, runner, root_info=root)
+    model._show_entries(QModelIndex(), model._root, memfs.ls("/data"), 10)
+    index = model.index(0, 0)
+    item = index.internalPointer()
+
+    model.request_previews([index])
+    assert item.format is None
+    assert is_openable_directory(item.path, item.format, SUFFIXES)
+
+    wait(lambda: item.format is not None)
+    assert item.format == "OME-Zarr"
+    assert is_openable_directory(item.path, item.format, SUFFIXES)
+
+    model.close()
+    runner.close()
+
+
+def test_format_verdicts_expire_and_are_invalidated(tmp_path):
+    cache = ListingCache(str(tmp_path / "listings.sqlite"))
+    cache.put_formats("memory", {"/data/image.zarr": "", "/data/other.zarr": "OME-Zarr", "/elsewhere/a.zarr": "N5"})
+    assert cache.get_formats("memory", ["/data/image.zarr"]) == {"/data/image.zarr": ""}
+
+    # Refreshing the parent probes its directories again
+    cache.invalidate("memory", "/data")
+    assert cache.get_formats("memory", ["/data/image.zarr", "/data/other.zarr", "/elsewhere/a.zarr"]) == {
+        "/elsewhere/a.zarr": "N5",
+    }
+
+    cache.ttl = -1
+    assert not cache.get_formats("memory", ["/elsewhere/a.zarr"])
@@ -0,0 +1,82 @@
+import threading
+
+from chimerax.RemoteBrowser.misc.listing import cached_listing
+from chimerax.RemoteBrowser.misc.listing_cache import ListingCache
+from chimerax.RemoteBrowser.ui.QFSSpecModel import FSRootItem, QFSSpecModel
+from chimerax.RemoteBrowser.ui.runner import ConnectionRunner
+from Qt.QtCore import QModelIndex
+
+
+def _populate(fs, files: int = 50, dirs: int = 5):
+    for i in range(files):
+        fs.pipe_file(f"/data/file_{i:03d}.mrc", b"x" * i)
+    for i in range(dirs):
+        fs.pipe_file(f"/data/dir_{i}/inner.mrc", b"x")
+
+
+def test_children_from_one_listing(memfs):
+    _populate(memfs)
+    root = FSRootItem(memfs, "/data")
+    memfs.calls.clear()
+
+    children = root.make_children(cached_listing(memfs, root.path))
+
+    assert dict(memfs.calls) == {"ls": 1}
+    assert len(children) == 55
+    assert [c.name for c in children] == sorted(c.name for c in children)
+
+    by_name = {c.name: c for c in children}
+    assert by_name["file_007.mrc"].is_file
+    assert by_name["file_007.mrc"].size == 7
+    assert by_name["file_007.mrc"].path == "/data/file_007.mrc"
+    assert by_name["dir_3"].is_dir
+
+
+def test_root_info(memfs):
+    _populate(memfs)
+
+    FSRootItem(memfs, "/data")
+    assert dict(memfs.calls) == {"info": 1}
+
+    memfs.calls.clear()
+    FSRootItem(memfs, "/data", info={"name": "/data", "type": "directory", "size": 0})
+    assert not memfs.calls
+
+
+def test_cached_listing_skips_the_filesystem(memfs, tmp_path):
+    _populate(memfs)
+    cache = ListingCache(str(tmp_path / "listings.sqlite"))
+
+    first = cached_listing(memfs, "/data", cache, "memory")
+    second = cached_listing(memfs, "/data", cache, "memory")
+
+    assert memfs.calls["ls"] == 1
+    assert {e["name"] for e in first} == {e["name"] for e in second}
+
+
+def test_failed_listing_is_retried(wait, memfs, monkeypatch):
+    _populate(memfs)
+    ls = memfs.ls
+
+    def fail_once(path, *args, **kwargs):
+        monkeypatch.setattr(memfs, "ls", ls)
+        raise OSError("Connection reset")
+
+    monkeypatch.setattr(memfs, "ls", fail_once)
+    runner = ConnectionRunner(threading.BoundedSemaphore(4), max_threads=2)
+    model = QFSSpecModel(memfs, "/data", {}, runner, root_info={"name": "/data", "type": "directory", "size": 0})
+    root = QModelIndex()
+
+    model.fetchMore(root)
+    wait(lambda: not model._root.is_loading)
+    assert model.rowCount(root) == 0
+    assert not model._root.children_loaded
+    assert model.canFetchMore(root)
+
+    model.fetchMore(root)
+    wait(lambda: not model._root.is_loading)
+    assert model.rowCount(root) == 55
+    assert not model.canFetchMore(root)
+
+    model.close()
+    runner.close()
@@ -0,0 +1,69 @@
+import threading
+
+from chimerax.RemoteBrowser.misc.listing_cache import ListingCache
+from chimerax.RemoteBrowser.ui.QFSSpecModel import QFSSpecModel
+from chimerax.RemoteBrowser.ui.runner import ConnectionRunner
+from Qt.QtCore import QModelIndex
+
+ENTRIES = [{"name": "/data/a.mrc", "type": "file", "size": 1}]
+
+
+def test_listings_go_stale_after_ttl(tmp_path):
+    cache = ListingCache(str(tmp_path / "listings.sqlite"))
+    assert cache.get("memory", "/data") is None
+
+    cache.put("memory", "/data", ENTRIES)
+    assert cache.get("memory", "/data") == (ENTRIES, False)
+
+    # Stale listings are still served, flagged for revalidation
+    cache.ttl = -1
+    assert cache.get("memory", "/data") == (ENTRIES, True)
+    assert cache.stats == {"hits": 1, "stale_hits": 1, "misses": 1, "hit_rate": 2 / 3}
+
+
+def test_infos_expire_after_ttl(tmp_path):
+    cache = ListingCache(str(tmp_path / "listings.sqlite"))
+    info = {"name": "/data", "type": "directory", "size": 0}
+    cache.put_info("memory", "/data", info)
+    assert cache.get_info("memory", "/data") == info
+
+    cache.ttl = -1
+    assert cache.get_info("memory", "/data") is None
+
+
+def test_invalidate_drops_one_path_or_the_connection(tmp_path):
+    cache = ListingCache(str(tmp_path / "listings.sqlite"))
+    cache.put("memory", "/data", ENTRIES)
+    cache.put("memory", "/other", ENTRIES)
+    cache.put("s3", "/data", ENTRIES)
+
+    cache.invalidate("memory", "/data")
+    assert cache.get("memory", "/data") is None
+    assert cache.get("memory", "/other") is not None
+
+    cache.invalidate("memory")
+    assert cache.get("memory", "/other") is None
+    assert cache.get("s3", "/data") is not None
+
+
+def test_stale_listing_is_shown_then_revalidated(wait, memfs, tmp_path):
+    memfs.pipe_file("/data/b.mrc", b"xx")
+    cache = ListingCache(str(tmp_path / "listings.sqlite"), ttl=-1)
+    cache.put("memory", "/data", ENTRIES)
+    runner = ConnectionRunner(threading.BoundedSemaphore(4), max_threads=2)
+    root = {"name": "/data", "type": "directory", "size": 0}
+    model = QFSSpecModel(memfs, "/data", {}, runner, cache=cache, cache_key="memory", root_info=root)
+
+    def names():
+        return [model.index(row, 0).internalPointer().name for row in range(model.rowCount(QModelIndex()))]
+
+    model.fetchMore(QModelIndex())
+    wait(lambda: not model._root.is_loading)
+    assert names() == ["a.mrc"]
+
+    wait(lambda: names() == ["b.mrc"])
+    assert names() == ["b.mrc"]
+    assert [e["name"] for e in cache.get("memory", "/data")[0]] == ["/data/b.mrc"]
+
+    model.close()
+    runner.close()
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from chimerax.RemoteBrowser.conn.local_connector import MemoryConnector, ThrottledFileSystem
+from fsspec.implementations.memory import MemoryFileSystem
+
+
+def _memory():
+    fs = MemoryFileSystem()
+    fs.store = {}
+    fs.pseudo_dirs = [""]
+    return fs
+
+
+def test_memory_connector_generates_tree(qapp):
+    connector = MemoryConnector(depth=2, directories=2, files=3, file_size=300, large_file_size=1024)
+    connector.input_widget._edit_root.setText("/generated")
+    connector.input_widget._edit_latency.setValue(20)
+    connector.input_widget._edit_bandwidth.setValue(2)
+
+    fs, root = connector.connect()
+    assert root == "/generated"
+    assert fs.latency == 0.02
+    assert fs.bandwidth == 2 * 1024**2
+
+    files = fs.fs.find(root)
+    # 1 + 2 + 4 directories of 3 files, and the large file at the root
+    assert len(files) == 7 * 3 + 1
+    assert fs.fs.cat_file(f"{root}/dir_0001/dir_0000/file_0002.bin") == (bytes(range(256)) * 2)[:300]
+    assert fs.fs.size(f"{root}/large.bin") == 1024
+
+    # An existing tree is left as it is
+    fs.fs.rm(f"{root}/large.bin")
+    connector.populate(fs.fs, root)
+    assert not fs.fs.exists(f"{root}/large.bin")
+    fs.fs.rm(root, recursive=True)
+
+
+def test_throttled_reads_match_the_wrapped_filesystem():
+    memory = _memory()
+    data = bytes(range(256)) * 64
+    memory.pipe_file("/data/file.bin", data)
+    fs = ThrottledFileSystem(memory)
+
+    assert fs.cat_file("/data/file.bin", start=100, end=200) == data[100:200]
+    assert [e["name"] for e in fs.ls("/data")] == ["/data/file.bin"]
+    assert fs.info("/data/file.bin")["size"] == len(data)
+
+    with fs.open("/data/file.bin", block_size=1000) as f:
+        f.seek(5000)
+        assert f.read(3000) == data[5000:8000]
+
+
+def test_throttled_latency_and_shared_bandwidth():
+    memory = _memory()
+    memory.pipe_file("/data/file.bin", b"x" * 100_000)
+    fs = ThrottledFileSystem(memory, latency=0.05)
+
+    start = time.perf_counter()
+    fs.ls("/data")
+    assert time.perf_counter() - start >= 0.05
+
+    # Four concurrent reads of 100 kB at 1 MB/s share the link, the last one ends after 0.4 s
+    fs.latency = 0
+    fs.bandwidth = 1_000_000
+    threads = [threading.Thread(target=fs.cat_file, args=("/data/file.bin",)) for _ in range(4)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.perf_counter() - start >= 0.4
@@ -0,0 +1,64 @@
+import threading
+
+from chimerax.RemoteBrowser.misc.listing import iter_listing
+from chimerax.RemoteBrowser.misc.metrics import IOMetrics, instrument
+from chimerax.RemoteBrowser.ui.metrics_panel import MetricsPanel
+from fsspec.asyn import AsyncFileSystem
+from qt_async_threads import QtAsyncRunner
+
+
+class PagedFileSystem(AsyncFileSystem):
+    """Lists like s3fs: ls goes through the paged _iterdir."""
+
+    cachable = False
+
+    def split_path(self, path):
+        bucket, _, key = path.strip("/").partition("/")
+        return bucket, key, None
+
+    async def _iterdir(self, bucket, prefix=""):
+        for i in range(5):
+            yield {"name": f"{bucket}/{prefix}file_{i}", "type": "file", "size": i}
+
+    async def _ls(self, path, detail=True, **kwargs):
+        bucket, key, _ = self.split_path(path)
+        return [e async for e in self._iterdir(bucket, prefix=key + "/" if key else "")]
+
+
+def _counts(metrics: IOMetrics):
+    return {(row["operation"], row["count"]) for row in metrics.rows()}
+
+
+def test_ls_through_iterdir_is_one_listing():
+    fs, metrics = PagedFileSystem(), IOMetrics()
+    instrument(fs, metrics, "paged")
+
+    assert len(fs.ls("bucket/prefix")) == 5
+    assert _counts(metrics) == {("list", 1)}
+
+
+def test_paged_listing_is_one_listing():
+    fs, metrics = PagedFileSystem(), IOMetrics()
+    instrument(fs, metrics, "paged")
+
+    assert sum(len(page) for page in iter_listing(fs, "bucket/prefix", page_size=2)) == 5
+    assert _counts(metrics) == {("list", 1)}
+
+
+def test_panel_gathers_cache_stats_off_the_gui_thread(wait):
+    threads = []
+
+    def cache_stats():
+        threads.append(threading.current_thread())
+        return {"chunks": {"hit_rate": 0.5}}
+
+    runner = QtAsyncRunner()
+    panel = MetricsPanel(IOMetrics(), cache_stats, runner)
+    panel.refresh()
+    panel.refresh()
+    wait(lambda: panel._caches.text())
+
+    assert panel._caches.text() == "chunks: 50% hits"
+    assert len(threads) == 1
+    assert threads[0] is not threading.main_thread()
+    runner.close()
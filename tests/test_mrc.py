@@ -0,0 +1,49 @@
+import numpy as np
+from chimerax.RemoteBrowser.misc.mrc import MRC_HEADER_SIZE, parse_mrc_header, read_mrc_header
+
+
+def _header(order: str = "<", mode: int = 2, origin=(0.0, 0.0, 0.0), nsymbt: int = 0) -> bytes:
+    ints = np.zeros(MRC_HEADER_SIZE // 4, dtype=f"{order}i4")
+    floats = ints.view(f"{order}f4")
+    ints[0:4] = (40, 30, 20, mode)
+    ints[4:7] = (-20, -15, -10)
+    ints[7:10] = (40, 30, 20)
+    floats[10:13] = (80.0, 90.0, 100.0)
+    ints[16:19] = (1, 2, 3)
+    ints[23] = nsymbt
+    floats[49:52] = origin
+    return ints.tobytes()
+
+
+def test_little_endian_header():
+    header = parse_mrc_header(_header("<", origin=(1.0, 2.0, 3.0), nsymbt=80))
+
+    assert header.size == (40, 30, 20)
+    assert header.dtype == np.dtype("<f4")
+    assert header.voxel_size == (2.0, 3.0, 5.0)
+    assert header.origin == (1.0, 2.0, 3.0)
+    assert header.is_xyz_ordered
+    assert header.data_offset == MRC_HEADER_SIZE + 80
+    assert header.nbytes == 40 * 30 * 20 * 4
+
+
+def test_big_endian_header_with_origin_from_nstart():
+    header = parse_mrc_header(_header(">", mode=1))
+
+    assert header.dtype == np.dtype(">i2")
+    assert header.origin == (-40.0, -45.0, -50.0)
+
+
+def test_unusable_headers():
+    assert parse_mrc_header(_header()[:512]) is None
+    # Mode 4 is complex, which cannot be read voxel by voxel
+    assert parse_mrc_header(_header(mode=4)) is None
+
+
+def test_header_of_a_remote_file(memfs):
+    memfs.pipe_file("/data/map.mrc", _header() + bytes(40 * 30 * 20 * 4))
+
+    header = read_mrc_header(memfs, "/data/map.mrc")
+
+    assert header.size == (40, 30, 20)
+    assert header.data_offset == MRC_HEADER_SIZE
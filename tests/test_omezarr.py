@@ -0,0 +1,107 @@
+import json
+
+import numpy as np
+import zarr
+from chimerax.RemoteBrowser.misc.chunk_cache import ChunkCache
+from chimerax.RemoteBrowser.misc.omezarr import ChunkStore, level_grids, load_omezarr, read_multiscales
+from fsspec.implementations.local import LocalFileSystem
+
+
+def _write_image(directory, size: int = 32, chunk: int = 8) -> np.ndarray:
+    """Two channel OME-Zarr image of size³ voxels at 1 µm with a second level at half the resolution."""
+    data = np.arange(2 * size**3, dtype=np.uint16).reshape(2, size, size, size)
+    store = zarr.DirectoryStore(str(directory))
+    zarr.array(data, chunks=(1, chunk, chunk, chunk), store=store, path="0")
+    zarr.array(data[:, ::2, ::2, ::2], chunks=(1, chunk, chunk, chunk), store=store, path="1")
+
+    axes = [{"name": "c", "type": "channel"}] + [{"name": n, "type": "space"} for n in "zyx"]
+    datasets = [
+        {"path": path, "coordinateTransformations": [{"type": "scale", "scale": [1, s, s, s]}]}
+        for path, s in (("0", 1.0), ("1", 2.0))
+    ]
+    attrs = {"multiscales": [{"version": "0.4", "name": "image", "axes": axes, "datasets": datasets}]}
+    (directory / ".zattrs").write_text(json.dumps(attrs))
+    (directory / ".zgroup").write_text(json.dumps({"zarr_format": 2}))
+    return data
+
+
+def test_read_multiscales(tmp_path):
+    _write_image(tmp_path)
+    image = read_multiscales(ChunkStore(LocalFileSystem(), str(tmp_path)))
+
+    assert image.name == "image"
+    assert [level.path for level in image.levels] == ["0", "1"]
+    assert image.channel == 0
+    assert image.spatial == [1, 2, 3]
+    assert image.size(image.levels[1]) == (16, 16, 16)
+    assert image.factor(image.levels[1]) == (2, 2, 2)
+
+
+def test_region_at(tmp_path):
+    _write_image(tmp_path)
+    image = read_multiscales(ChunkStore(LocalFileSystem(), str(tmp_path)))
+    fine, coarse = image.levels
+
+    assert image.region_at(fine, None) == ((0, 0, 0), (31, 31, 31))
+    assert image.region_at(coarse, ((4, 5, 6), (9, 10, 11))) == ((2, 2, 3), (4, 5, 5))
+    # Regions are clamped to the level, and never end before they start
+    assert image.region_at(coarse, ((-8, 0, 30), (100, 0, 31))) == ((0, 0, 15), (15, 0, 15))
+
+
+def test_choose_level(tmp_path):
+    _write_image(tmp_path)
+    image = read_multiscales(ChunkStore(LocalFileSystem(), str(tmp_path)))
+    fine, coarse = image.levels
+
+    assert image.choose_level(None, 32**3, 2 * 32**3) is fine
+    # Either budget alone rules out the finest level
+    assert image.choose_level(None, 32**3 - 1, 2 * 32**3) is coarse
+    assert image.choose_level(None, 32**3, 2 * 32**3 - 1) is coarse
+    # A small enough region fits at the finest level
+    assert image.choose_level(((0, 0, 0), (15, 15, 15)), 16**3, 2 * 16**3) is fine
+    # The coarsest level is the last resort, even if it does not fit
+    assert image.choose_level(None, 1, 1) is coarse
+
+
+def test_chunk_keys(tmp_path):
+    _write_image(tmp_path)
+    image = read_multiscales(ChunkStore(LocalFileSystem(), str(tmp_path)))
+
+    keys = image.chunk_keys(image.levels[0], ((0, 0, 8), (7, 15, 15)))
+    assert keys == [f"0/{c}.1.{y}.0" for c in range(2) for y in range(2)]
+
+
+def test_level_grids(tmp_path):
+    data = _write_image(tmp_path)
+    store = ChunkStore(LocalFileSystem(), str(tmp_path))
+    image = read_multiscales(store)
+    region = ((8, 8, 8), (23, 15, 31))
+
+    grids = level_grids(store, image, image.levels[1], region, [0, 1])
+
+    assert [grid.channel for grid in grids] == [0, 1]
+    assert grids[0].array is grids[1].array
+    assert grids[1].size == (8, 4, 12)
+    assert grids[1].origin == (8, 8, 8)
+    assert grids[1].step == (2, 2, 2)
+    assert grids[1].name == "image 1 channel 1"
+
+    m = grids[1].read_matrix((0, 0, 0), grids[1].size, (1, 1, 1), None)
+    assert np.array_equal(m, data[1, 8:32:2, 8:16:2, 8:24:2])
+    assert grids[1].finest_region((0, 0, 0), (7, 3, 11)) == region
+
+
+def test_load_omezarr_prefetches_the_first_level(tmp_path):
+    path = tmp_path / "image.zarr"
+    _write_image(path)
+    cache = ChunkCache(None)
+
+    grids, store, image, finer = load_omezarr(LocalFileSystem(), str(path), cache=cache, progressive=True)
+
+    assert [grid.level.path for grid in grids] == ["1", "1"]
+    assert finer == [image.levels[0]]
+    # 2 channels of 2³ chunks, shown without another request
+    assert cache.stats["misses"] == 16
+    fetched = store.chunks_read
+    grids[0].read_matrix((0, 0, 0), grids[0].size, (1, 1, 1), None)
+    assert store.chunks_read == fetched
@@ -0,0 +1,25 @@
+from chimerax.RemoteBrowser.misc.path_index import PathIndex, crawl
+
+
+def test_failed_listing_stays_pending(memfs, tmp_path):
+    for folder in ("a", "b", "c"):
+        memfs.pipe_file(f"/data/{folder}/deep/map_{folder}.mrc", b"x")
+    index = PathIndex(str(tmp_path / "paths.sqlite"))
+
+    ls = memfs.ls
+
+    def flaky_ls(path, detail=True, **kwargs):
+        if path.rstrip("/") == "/data/b":
+            raise OSError("connection reset")
+        return ls(path, detail=detail, **kwargs)
+
+    memfs.ls = flaky_ls
+    assert not crawl(memfs, index, "memory", "/data")
+    assert index.is_interrupted("memory", "/data")
+    assert index.crawled("memory", "/data") is None
+    assert not index.search("memory", "/data", "map_b")
+
+    memfs.ls = ls
+    assert crawl(memfs, index, "memory", "/data")
+    assert not index.is_interrupted("memory", "/data")
+    assert [e["name"] for e in index.search("memory", "/data", "map_b")] == ["/data/b/deep/map_b.mrc"]
@@ -0,0 +1,68 @@
+from chimerax.RemoteBrowser.conn.connector import Connector
+from chimerax.RemoteBrowser.conn.pool import ConnectionPool
+
+
+class _Connector(Connector):
+    FS_TYPE = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self.created = 0
+        self.closed = []
+        self.alive = True
+
+    def create(self):
+        self.created += 1
+        return object()
+
+    def is_alive(self, fs) -> bool:
+        return self.alive
+
+    def close(self, fs):
+        self.closed.append(fs)
+
+
+def test_connections_are_reused_while_idle():
+    connector = _Connector()
+    connector.pool = ConnectionPool(idle_timeout=600)
+
+    fs = connector.acquire("memory", connector.create)
+    connector.disconnect(fs)
+    connector.pool.check()
+
+    assert connector.acquire("memory", connector.create) is fs
+    assert connector.acquire("other", connector.create) is not fs
+    assert connector.created == 2
+    assert not connector.closed
+
+
+def test_dead_and_expired_connections_are_closed():
+    connector = _Connector()
+    connector.pool = ConnectionPool(idle_timeout=600)
+    fs = connector.acquire("memory", connector.create)
+
+    # Connections in use are never checked
+    connector.alive = False
+    connector.pool.check()
+    assert not connector.closed
+
+    connector.disconnect(fs)
+    connector.pool.check()
+    assert connector.closed == [fs]
+    assert connector.pool.keys == []
+
+    connector.pool.idle_timeout = 0
+    fs = connector.acquire("memory", connector.create)
+    connector.disconnect(fs)
+    assert connector.closed[-1] is fs
+
+
+def test_close_all():
+    connector = _Connector()
+    connector.pool = ConnectionPool()
+    fs = connector.acquire("memory", connector.create)
+
+    connector.pool.close_all()
+
+    assert connector.closed == [fs]
+    assert connector.acquire("memory", connector.create) is not fs
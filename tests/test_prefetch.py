@@ -0,0 +1,54 @@
+import threading
+
+from chimerax.RemoteBrowser.ui.QFSSpecModel import QFSSpecModel
+from chimerax.RemoteBrowser.ui.runner import ConnectionRunner
+from Qt.QtCore import QModelIndex
+
+
+def _model(fs, **kwargs):
+    for d in range(3):
+        for f in range(2):
+            fs.pipe_file(f"/data/dir_{d}/file_{f}.mrc", b"x")
+
+    runner = ConnectionRunner(threading.BoundedSemaphore(4), max_threads=2)
+    root = {"name": "/data", "type": "directory", "size": 0}
+    return QFSSpecModel(fs, "/data", {}, runner, prefetch=True, root_info=root, **kwargs), runner
+
+
+def _prefetched(model):
+    return not model._root.is_loading and not model._prefetch_running and not model._prefetch_queue
+
+
+def test_expansion_is_served_from_prefetch(wait, memfs):
+    model, runner = _model(memfs, prefetch_concurrency=2)
+
+    model.fetchMore(QModelIndex())
+    wait(lambda: _prefetched(model))
+    assert set(model._prefetched) == {"/data/dir_0", "/data/dir_1", "/data/dir_2"}
+
+    listings = memfs.calls["ls"]
+    index = model.index(1, 0)
+    model.fetchMore(index)
+    wait(lambda: not index.internalPointer().is_loading)
+
+    assert model.rowCount(index) == 2
+    assert memfs.calls["ls"] == listings
+    assert model.prefetch_stats["hits"] == 1
+    assert "/data/dir_1" not in model._prefetched
+
+    model.close()
+    runner.close()
+
+
+def test_prefetched_entries_are_bounded(wait, memfs):
+    model, runner = _model(memfs, prefetch_max_entries=3)
+
+    model.fetchMore(QModelIndex())
+    wait(lambda: _prefetched(model))
+
+    # Each listing holds two entries, only the latest listing fits
+    assert len(model._prefetched) == 1
+    assert model._prefetched_entries == 2
+
+    model.close()
+    runner.close()
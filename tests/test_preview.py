@@ -0,0 +1,40 @@
+import struct
+
+from chimerax.RemoteBrowser.misc.preview import PREVIEW_BYTES, describe_tiff, read_previews
+
+
+def _tiff(width: int, height: int, ifd_offset: int = 8, order: str = "<") -> bytes:
+    """A TIFF file whose first image file directory is at ifd_offset, with a single float32 page."""
+    entries = [(256, 3, width), (257, 4, height), (258, 3, 32), (339, 3, 3)]
+    ifd = struct.pack(f"{order}H", len(entries))
+    for tag, kind, value in entries:
+        if kind == 3:
+            ifd += struct.pack(f"{order}HHIHH", tag, kind, 1, value, 0)
+        else:
+            ifd += struct.pack(f"{order}HHII", tag, kind, 1, value)
+
+    magic = b"II*\x00" if order == "<" else b"MM\x00*"
+    header = magic + struct.pack(f"{order}I", ifd_offset)
+    return header + bytes(ifd_offset - len(header)) + ifd + bytes(4)
+
+
+def test_describe_tiff():
+    for order in "<>":
+        data = _tiff(64, 32, order=order)
+        assert describe_tiff(data, data[8:]).startswith("64×32 · float32 · ")
+
+    assert describe_tiff(b"not a tiff", b"") == ""
+
+
+def test_previews_of_many_files(memfs):
+    memfs.pipe_file("/data/first.tif", _tiff(64, 32))
+    # Some writers put the first directory after the image data, it takes a second read
+    memfs.pipe_file("/data/last.tif", _tiff(128, 16, ifd_offset=2 * PREVIEW_BYTES))
+    memfs.pipe_file("/data/broken.mrc", b"x" * 100)
+
+    previews = read_previews(memfs, ["/data/first.tif", "/data/last.tif", "/data/broken.mrc", "/data/gone.tif"])
+
+    assert previews["/data/first.tif"].startswith("64×32 · float32 · ")
+    assert previews["/data/last.tif"].startswith("128×16 · float32 · ")
+    assert previews["/data/broken.mrc"] == ""
+    assert previews["/data/gone.tif"] is None
@@ -0,0 +1,54 @@
+"""Cost of QFSSpecModel.parent() as directories grow, as Qt calls it for every painted cell.
+
+Run directly with the Python of ChimeraX for the full benchmark:
+    chimerax -m tests.test_row_lookup [entries ...]
+"""
+
+import sys
+import time
+
+from chimerax.RemoteBrowser.ui.QFSSpecModel import QFSSpecModel
+from Qt.QtCore import QModelIndex
+
+
+def _model(n: int) -> QFSSpecModel:
+    """A model whose root holds n directories of one file each, inserted the way listings are."""
+    root = {"name": "/data", "type": "directory", "size": 0}
+    model = QFSSpecModel(None, "/data", {}, None, max_rows=n, root_info=root)
+    entries = [{"name": f"/data/dir_{i:07d}", "type": "directory", "size": 0} for i in range(n)]
+    model._show_entries(QModelIndex(), model._root, entries, n)
+
+    for row, item in enumerate(model._root.children):
+        entry = {"name": f"{item.path}/map.mrc", "type": "file", "size": 1}
+        model._show_entries(model.index(row, 0), item, [entry], 1)
+
+    return model
+
+
+def seconds_per_parent(model: QFSSpecModel) -> float:
+    """Walk every file of the model like a view does and time the parent() calls, in seconds per call."""
+    n = model.rowCount()
+    children = [model.index(0, 0, model.index(row, 0)) for row in range(n)]
+
+    start = time.perf_counter()
+    parents = [model.parent(child) for child in children]
+    elapsed = time.perf_counter() - start
+
+    assert [p.row() for p in parents] == list(range(n))
+    return elapsed / n
+
+
+def test_parent_cost_is_flat(qapp):
+    small = seconds_per_parent(_model(1_000))
+    large = seconds_per_parent(_model(50_000))
+
+    # A list.index scan would be about 50 times slower per call in the large directory
+    assert large < 5 * small
+
+
+if __name__ == "__main__":
+    from Qt.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    for n in [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000]:
+        print(f"{n} rows: {1e6 * seconds_per_parent(_model(n)):.2f} µs per parent() call")
@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from chimerax.RemoteBrowser.misc.search import iter_search, name_matcher
+
+
+def _populate(fs):
+    for run in range(3):
+        for ts in range(4):
+            fs.pipe_file(f"/data/run_{run}/TS_{ts:02d}/TS_{ts:02d}.mrc", b"x")
+            fs.pipe_file(f"/data/run_{run}/TS_{ts:02d}/TS_{ts:02d}.mdoc", b"x")
+
+
+def _names(batches):
+    return sorted(entry["name"] for batch in batches for entry in batch)
+
+
+def test_name_matcher():
+    assert name_matcher("ts_01")("run_0/TS_01.mrc")
+    assert not name_matcher("run")("run_0/TS_01.mrc")
+    assert name_matcher("*.MRC")("run_0/TS_01.mrc")
+    assert not name_matcher("*.mrc")("run_0/TS_01.mdoc")
+    assert name_matcher("run_0/*")("run_0/TS_01.mrc")
+    assert not name_matcher("run_1/*")("run_0/TS_01.mrc")
+
+
+def test_search_finds_matches_at_every_depth(memfs):
+    _populate(memfs)
+
+    found = _names(iter_search(memfs, "/data", "*.mrc", concurrency=4))
+
+    assert len(found) == 12
+    assert "/data/run_2/TS_03/TS_03.mrc" in found
+
+
+def test_search_depth_and_result_limits(memfs):
+    _populate(memfs)
+
+    assert _names(iter_search(memfs, "/data", "ts_", max_depth=2)) == [
+        f"/data/run_{run}/TS_{ts:02d}" for run in range(3) for ts in range(4)
+    ]
+    assert len(_names(iter_search(memfs, "/data", "*.mrc", max_results=5))) == 5
+
+
+def test_search_stops_when_cancelled(memfs):
+    _populate(memfs)
+    cancel = threading.Event()
+    batches = []
+
+    for batch in iter_search(memfs, "/data", "run_", cancel=cancel):
+        batches.append(batch)
+        cancel.set()
+
+    assert len(batches) == 1
+
+
+def test_search_lists_through_submit(memfs):
+    _populate(memfs)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        found = _names(iter_search(memfs, "/data", "*.mdoc", submit=executor.submit))
+
+    assert len(found) == 12
+    assert memfs.calls["ls"] == 16
@@ -0,0 +1,155 @@
+"""SFTP download throughput and listing latency of the SSHFS connector's filesystem, against an in-process server.
+
+The client reaches the server through a proxy that delays everything it forwards by half the given latency in each
+direction, like the round trip to a remote host. Run directly with the Python of ChimeraX for the full benchmark, by
+default a 256 MB file and a directory of 10000 files at 20 ms:
+    chimerax -m tests.test_sftp_throughput [MB] [files] [latency in ms]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Tuple
+
+import pytest
+
+asyncssh = pytest.importorskip("asyncssh")
+pytest.importorskip("sshfs")
+
+from chimerax.RemoteBrowser.conn.sshfs_connector import SFTPFileSystem  # noqa: E402
+from chimerax.RemoteBrowser.misc.transfer import download  # noqa: E402
+from fsspec.asyn import get_loop, sync  # noqa: E402
+
+CONCURRENCY = (1, 2, 4, 8)
+
+
+class _NoAuthServer(asyncssh.SSHServer):
+    def begin_auth(self, username: str) -> bool:
+        return False
+
+
+async def _forward(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float):
+    """Forward everything from reader to writer, each chunk delay seconds after it arrived and in order."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    async def deliver():
+        while True:
+            due, data = await queue.get()
+            if not data:
+                break
+            await asyncio.sleep(max(due - loop.time(), 0))
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    delivery = asyncio.ensure_future(deliver())
+    try:
+        while data := await reader.read(256 * 1024):
+            queue.put_nowait((loop.time() + delay, data))
+    finally:
+        queue.put_nowait((0, b""))
+        await delivery
+
+
+def sftp_server(latency: float):
+    """Start an SFTP server and a proxy in front of it, on the event loop of fsspec. Returns both, and the port."""
+
+    async def proxy(client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection("127.0.0.1", server_port)
+        await asyncio.gather(
+            _forward(client_reader, server_writer, latency / 2),
+            _forward(server_reader, client_writer, latency / 2),
+            return_exceptions=True,
+        )
+
+    async def listen():
+        server = await asyncssh.listen(
+            "127.0.0.1",
+            0,
+            server_factory=_NoAuthServer,
+            server_host_keys=[asyncssh.generate_private_key("ssh-ed25519")],
+            sftp_factory=True,
+        )
+        return server, await asyncio.start_server(proxy, "127.0.0.1", 0)
+
+    server, forwarder = sync(get_loop(), listen)
+    server_port = server.sockets[0].getsockname()[1]
+    return server, forwarder, forwarder.sockets[0].getsockname()[1]
+
+
+def connect(port: int) -> SFTPFileSystem:
+    return SFTPFileSystem("127.0.0.1", port=port, username="benchmark", known_hosts=None, skip_instance_cache=True)
+
+
+def megabytes_per_second(fs, path: str, size: int, concurrency: int, directory: str) -> float:
+    target = os.path.join(directory, f"download_{concurrency}")
+    start = time.perf_counter()
+    download(fs, path, target, size, chunk_size=4 * 1024**2, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+
+    with open(target, "rb") as f, open(path, "rb") as original:
+        assert f.read() == original.read()
+    os.remove(target)
+    return size / 1024**2 / elapsed
+
+
+def seconds_per_listing(fs, path: str, repeats: int = 3) -> Tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fs.invalidate_cache(path)
+        entries = fs.ls(path, detail=True)
+    return (time.perf_counter() - start) / repeats, len(entries)
+
+
+def _populate(directory: str, size: int, files: int) -> str:
+    large = os.path.join(directory, "large.bin")
+    with open(large, "wb") as f:
+        f.write(bytes(range(256)) * (size // 256))
+
+    listed = os.path.join(directory, "listed")
+    os.mkdir(listed)
+    for i in range(files):
+        with open(os.path.join(listed, f"TS_{i:05d}.mrc"), "wb"):
+            pass
+    return large
+
+
+def test_sftp_download_and_listing(tmp_path):
+    size = 8 * 1024**2
+    large = _populate(str(tmp_path), size, files=200)
+    server, forwarder, port = sftp_server(latency=0.002)
+    fs = connect(port)
+    try:
+        assert megabytes_per_second(fs, large, size, 4, str(tmp_path)) > 0
+        assert fs.cat_file(large, start=1000, end=1010) == (bytes(range(256)) * 4)[1000:1010]
+
+        _, count = seconds_per_listing(fs, str(tmp_path / "listed"), repeats=1)
+        assert count == 200
+    finally:
+        sync(fs.loop, fs._close_sessions)
+        forwarder.close()
+        server.close()
+
+
+if __name__ == "__main__":
+    size = (int(sys.argv[1]) if len(sys.argv) > 1 else 256) * 1024**2
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    latency = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.02
+
+    with tempfile.TemporaryDirectory() as directory:
+        large = _populate(directory, size, files)
+        server, forwarder, port = sftp_server(latency)
+        fs = connect(port)
+
+        seconds, count = seconds_per_listing(fs, os.path.join(directory, "listed"))
+        print(f"Listing {count} files, {latency * 1000:.0f} ms latency: {seconds * 1000:.0f} ms")
+        for concurrency in CONCURRENCY:
+            rate = megabytes_per_second(fs, large, size, concurrency, directory)
+            print(f"{size // 1024**2} MB, {latency * 1000:.0f} ms latency, concurrency {concurrency}: {rate:.1f} MB/s")
+
+        sync(fs.loop, fs._close_sessions)
+        forwarder.close()
+        server.close()
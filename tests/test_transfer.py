@@ -0,0 +1,66 @@
+import os
+import threading
+
+import pytest
+from chimerax.RemoteBrowser.misc.file_cache import FileCache
+from chimerax.RemoteBrowser.misc.transfer import TransferCancelledError, download, fetch_batch
+
+
+def test_failed_batch_leaves_no_partials(memfs, tmp_path):
+    for i in range(4):
+        memfs.pipe_file(f"/data/file_{i}.mrc", b"x" * 10)
+    files = {path: memfs.info(path) for path in memfs.find("/data")}
+    files["/data/gone.mrc"] = {"name": "/data/gone.mrc", "type": "file", "size": 10}
+    cache = FileCache(str(tmp_path / "files"), 1024**2)
+
+    with pytest.raises(FileNotFoundError):
+        fetch_batch(memfs, cache, "memory", files)
+
+    leftovers = [name for _, _, names in os.walk(cache.root) for name in names if name.endswith(".part")]
+    assert not leftovers
+    assert cache.total_bytes == 0
+
+
+def test_cancelled_download_resumes(memfs, tmp_path, monkeypatch):
+    data = bytes(range(256)) * 64
+    memfs.pipe_file("/data/map.mrc", data)
+    target = str(tmp_path / "map.mrc.part")
+    cancel = threading.Event()
+    fetched = []
+    cat_file = memfs.cat_file
+
+    def cancel_after_first(path, start=None, end=None, **kwargs):
+        fetched.append(start)
+        cancel.set()
+        return cat_file(path, start=start, end=end, **kwargs)
+
+    monkeypatch.setattr(memfs, "cat_file", cancel_after_first)
+    with pytest.raises(TransferCancelledError):
+        download(memfs, "/data/map.mrc", target, len(data), chunk_size=4096, concurrency=1, cancel=cancel)
+
+    assert fetched == [0]
+    assert os.path.exists(target + ".chunks")
+
+    # The next attempt only fetches the missing ranges, and reports the resumed bytes as progress first
+    fetched.clear()
+    progress = []
+    download(memfs, "/data/map.mrc", target, len(data), chunk_size=4096, concurrency=2, progress=progress.append)
+
+    assert sorted(fetched) == [4096, 8192, 12288]
+    assert progress[0] == 4096
+    assert sum(progress) == len(data)
+    with open(target, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(target + ".chunks")
+
+
+def test_cancelled_batch_raises(memfs, tmp_path):
+    memfs.pipe_file("/data/file.mrc", b"x")
+    cache = FileCache(str(tmp_path / "files"), 1024**2)
+    cancel = threading.Event()
+    cancel.set()
+
+    with pytest.raises(TransferCancelledError):
+        fetch_batch(memfs, cache, "memory", {"/data/file.mrc": memfs.info("/data/file.mrc")}, cancel=cancel)
+
+    assert cache.lookup("memory", "/data/file.mrc", memfs.info("/data/file.mrc")) is None
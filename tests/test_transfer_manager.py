@@ -0,0 +1,48 @@
+import threading
+import time
+
+from chimerax.RemoteBrowser.misc.file_cache import FileCache
+from chimerax.RemoteBrowser.ui.QFSSpecModel import FSRootItem
+from chimerax.RemoteBrowser.ui.runner import ConnectionRunner
+from chimerax.RemoteBrowser.ui.transfers import TransferManager
+from Qt.QtCore import QPersistentModelIndex
+
+
+def test_transfers_are_queued_on_the_connection_runner(wait, memfs, tmp_path, monkeypatch):
+    for i in range(4):
+        memfs.pipe_file(f"/data/map_{i}.mrc", bytes([i]) * 1000)
+    items = FSRootItem(memfs, "/data").make_children(memfs.ls("/data"))
+
+    lock = threading.Lock()
+    reads = {"running": 0, "peak": 0}
+    cat_file = memfs.cat_file
+
+    def slow_cat_file(*args, **kwargs):
+        with lock:
+            reads["running"] += 1
+            reads["peak"] = max(reads["peak"], reads["running"])
+        time.sleep(0.05)
+        with lock:
+            reads["running"] -= 1
+        return cat_file(*args, **kwargs)
+
+    monkeypatch.setattr(memfs, "cat_file", slow_cat_file)
+    runner = ConnectionRunner(threading.BoundedSemaphore(4), max_threads=4)
+    cache = FileCache(str(tmp_path / "files"), 1024**2)
+    manager = TransferManager(cache, runner, max_transfers=2)
+    finished = []
+    manager.transfer_finished.connect(lambda transfer, target: finished.append(transfer.path))
+
+    for item in items:
+        manager.enqueue(memfs, "memory", item, QPersistentModelIndex())
+    # Still queued behind the first two
+    manager.cancel("memory", "/data/map_3.mrc")
+    wait(lambda: not manager._active)
+
+    assert sorted(finished) == ["/data/map_0.mrc", "/data/map_1.mrc", "/data/map_2.mrc"]
+    assert reads["peak"] == 2
+    assert cache.lookup("memory", "/data/map_3.mrc", items[3].info) is None
+    assert not items[3].being_fetched
+
+    manager.close()
+    runner.close()
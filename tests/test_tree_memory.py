@@ -0,0 +1,94 @@
+"""Memory per tree node for a large synthetic S3 prefix, compared to the nodes before they were packed.
+
+Run directly with the Python of ChimeraX for the full benchmark, by default on 1M entries:
+    chimerax -m tests.test_tree_memory [entries]
+"""
+
+import gc
+import sys
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import PurePosixPath
+
+from chimerax.RemoteBrowser.ui.QFSSpecModel import FSTreeItem
+
+PREFIX = "bucket/tomograms"
+
+
+class _UnpackedItem:
+    """The tree node as it was before nodes were packed: a full info dict, a PurePosixPath and the fs per node."""
+
+    def __init__(self, fs, path: PurePosixPath, parent=None, info=None):
+        self.fs = fs
+        self._path = path
+        self._children = None
+        self._placeholder = None
+        self._pages = None
+        self._pending = []
+        self._listed = []
+        self.parent = parent
+        self.info = info
+        self.is_loading = False
+        self.being_fetched = False
+        self.fetched_bytes = 0
+        self.is_cached = False
+        self.preview = None
+
+
+def _entries(n: int):
+    """Detailed listing entries as s3fs returns them."""
+    modified = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(n):
+        name = f"{PREFIX}/TS_{i:07d}.mrc"
+        yield {
+            "Key": name,
+            "LastModified": modified + timedelta(seconds=i),
+            "ETag": f'"{i:032x}"',
+            "Size": 1024 + i,
+            "StorageClass": "STANDARD",
+            "type": "file",
+            "size": 1024 + i,
+            "name": name,
+        }
+
+
+def _packed(n: int):
+    parent = FSTreeItem(PREFIX, kind="directory")
+    return [FSTreeItem.from_info(e, parent) for e in _entries(n)]
+
+
+def _unpacked(n: int):
+    fs = object()
+    parent = _UnpackedItem(fs, PurePosixPath(PREFIX))
+    return [_UnpackedItem(fs, PurePosixPath(e["name"]), parent, info=e) for e in _entries(n)]
+
+
+def bytes_per_node(build, n: int) -> float:
+    """Memory held by n nodes built by build, in bytes per node. The listing entries are dropped while building."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        nodes = build(n)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    assert len(nodes) == n
+    return used / n
+
+
+def test_packed_nodes_are_four_times_smaller():
+    n = 20_000
+    packed = bytes_per_node(_packed, n)
+    unpacked = bytes_per_node(_unpacked, n)
+
+    assert unpacked / packed >= 4
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    packed = bytes_per_node(_packed, n)
+    unpacked = bytes_per_node(_unpacked, n)
+    print(f"{n} entries: {unpacked:.0f} B per node before, {packed:.0f} B per node packed, {unpacked / packed:.1f}x")